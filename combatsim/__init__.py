@@ -0,0 +1,60 @@
+""" Combat simulator for D&D 5e.
+
+The most used classes and functions can be reached from the package itself,
+such as `combatsim.Monster` or `combatsim.simulate`. They are imported the
+first time they are used, so `import combatsim` and imports of single
+submodules such as `combatsim.dice` don't load the rest of the simulator.
+Worker processes and the CLI only pay for the modules they need.
+"""
+
+import importlib
+
+__version__ = "0.1.0"
+
+# Name -> module that defines it.
+_EXPORTS = {
+    'Creature': 'combatsim.creature',
+    'Monster': 'combatsim.creature',
+    'Character': 'combatsim.creature',
+    'Dice': 'combatsim.dice',
+    'Modifier': 'combatsim.dice',
+    'Armor': 'combatsim.items',
+    'Weapon': 'combatsim.items',
+    'Encounter': 'combatsim.encounter',
+    'EncounterDefinition': 'combatsim.encounter',
+    'EncounterResult': 'combatsim.encounter',
+    'EncounterFile': 'combatsim.encounter_file',
+    'load': 'combatsim.encounter_file',
+    'Grid': 'combatsim.grid',
+    'simulate': 'combatsim.simulation',
+    'run_trials': 'combatsim.simulation',
+    'TrialResult': 'combatsim.simulation',
+    'Histogram': 'combatsim.aggregators',
+    'RunningMean': 'combatsim.aggregators',
+    'KillCounts': 'combatsim.aggregators',
+    'TDigest': 'combatsim.aggregators',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is not None:
+        value = getattr(importlib.import_module(module), name)
+    else:
+        # Submodules that haven't been imported yet, such as `combatsim.sweep`
+        try:
+            value = importlib.import_module(f"{__name__}.{name}")
+        except ModuleNotFoundError as error:
+            if error.name != f"{__name__}.{name}":
+                raise
+            raise AttributeError(
+                f"module {__name__!r} has no attribute {name!r}"
+            ) from None
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
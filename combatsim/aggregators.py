@@ -0,0 +1,223 @@
+""" Online aggregators for streams of trial results.
+
+Aggregators see each `TrialResult` once and keep a fixed amount of state no
+matter how many trials they are given. Aggregators of the same kind can be
+merged, so trials can be split across several workers and combined at the
+end.
+
+Most aggregators take a `key`, which is either the name of a `TrialResult`
+field or a function that takes a result and returns a value. Aggregators
+with field names as keys can be pickled, which is needed to send them to
+other processes or store them in a `combatsim.cache.ResultCache`.
+"""
+
+from collections import Counter
+import math
+import operator
+
+
+def _getter(key):
+    if callable(key):
+        return key
+    return operator.attrgetter(key)
+
+
+class Aggregator:
+    """ Base class for all aggregators. """
+
+    def add(self, result):
+        raise NotImplementedError
+
+    def merge(self, other):
+        """ Folds the state of another aggregator of the same kind into this
+        one. """
+        raise NotImplementedError
+
+
+class RunningMean(Aggregator):
+    """ Mean and variance of a value using Welford's algorithm.
+
+    Attributes:
+        count (int): Number of values seen.
+        mean (float): Mean of all values seen.
+    """
+
+    def __init__(self, key):
+        self.key = _getter(key)
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+
+    def add(self, result):
+        self.add_value(self.key(result))
+
+    def add_value(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+
+    @property
+    def variance(self):
+        if self.count < 2:
+            return 0.0
+        return self._m2 / (self.count - 1)
+
+    @property
+    def stddev(self):
+        return math.sqrt(self.variance)
+
+    def merge(self, other):
+        count = self.count + other.count
+        if count == 0:
+            return
+        delta = other.mean - self.mean
+        self._m2 += other._m2 + delta ** 2 * self.count * other.count / count
+        self.mean += delta * other.count / count
+        self.count = count
+
+
+class Histogram(Aggregator):
+    """ Counts how often each value occurs.
+
+    This is meant for discrete values such as the winning team or the number
+    of rounds. Use `TDigest` for continuous values.
+    """
+
+    def __init__(self, key):
+        self.key = _getter(key)
+        self.counts = Counter()
+
+    def add(self, result):
+        self.counts[self.key(result)] += 1
+
+    @property
+    def total(self):
+        return sum(self.counts.values())
+
+    def frequency(self, value):
+        """ Fraction of results that had the given value. """
+        total = self.total
+        if not total:
+            return 0.0
+        return self.counts[value] / total
+
+    def merge(self, other):
+        self.counts.update(other.counts)
+
+
+class KillCounts(Aggregator):
+    """ Total kills made by each creature, in encounter order. """
+
+    def __init__(self):
+        self.kills = []
+
+    def add(self, result):
+        self._add(result.kills)
+
+    def merge(self, other):
+        self._add(other.kills)
+
+    def _add(self, kills):
+        if len(kills) > len(self.kills):
+            self.kills.extend([0] * (len(kills) - len(self.kills)))
+        for i, count in enumerate(kills):
+            self.kills[i] += count
+
+
+class TDigest(Aggregator):
+    """ Quantile sketch of a value using a merging t-digest.
+
+    Values are buffered and periodically merged into a small number of
+    weighted centroids. Centroids near the tails are kept small so extreme
+    quantiles stay accurate.
+
+    Args:
+        key: Field name or function giving the value to track.
+        compression (int): Roughly the number of centroids kept. Higher values
+            are more accurate and use more memory.
+    """
+
+    def __init__(self, key, compression=100):
+        self.key = _getter(key)
+        self.compression = compression
+        self.count = 0
+        self.min = math.inf
+        self.max = -math.inf
+        self._centroids = []
+        self._buffer = []
+
+    def add(self, result):
+        self.add_value(self.key(result))
+
+    def add_value(self, value, weight=1):
+        self._buffer.append((value, weight))
+        self.count += weight
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if len(self._buffer) >= 5 * self.compression:
+            self._compress()
+
+    def merge(self, other):
+        for mean, weight in other.centroids:
+            self._buffer.append((mean, weight))
+        self.count += other.count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+
+    @property
+    def centroids(self):
+        """ List of (mean, weight) tuples, sorted by mean. """
+        if self._buffer:
+            self._compress()
+        return self._centroids
+
+    def quantile(self, q):
+        """ Estimates the value below which a fraction `q` of values fall. """
+        centroids = self.centroids
+        if not centroids:
+            return None
+        if len(centroids) == 1:
+            return centroids[0][0]
+
+        target = q * self.count
+        previous_center, previous_mean = 0, self.min
+        cumulative = 0
+        for mean, weight in centroids:
+            center = cumulative + weight / 2
+            if target < center:
+                fraction = (target - previous_center) / (center - previous_center)
+                return previous_mean + (mean - previous_mean) * fraction
+            previous_center, previous_mean = center, mean
+            cumulative += weight
+
+        fraction = (target - previous_center) / max(self.count - previous_center, 1)
+        return previous_mean + (self.max - previous_mean) * min(fraction, 1)
+
+    def _scale(self, q):
+        return self.compression / (2 * math.pi) * math.asin(2 * q - 1)
+
+    def _compress(self):
+        points = sorted(self._centroids + self._buffer)
+        self._buffer = []
+        if not points:
+            return
+        total = sum(weight for _, weight in points)
+
+        centroids = []
+        mean, weight = points[0]
+        weight_so_far = 0
+        for next_mean, next_weight in points[1:]:
+            proposed = weight + next_weight
+            q0 = weight_so_far / total
+            q1 = min((weight_so_far + proposed) / total, 1.0)
+            if self._scale(q1) - self._scale(q0) <= 1:
+                mean += (next_mean - mean) * next_weight / proposed
+                weight = proposed
+            else:
+                centroids.append((mean, weight))
+                weight_so_far += weight
+                mean, weight = next_mean, next_weight
+        centroids.append((mean, weight))
+        self._centroids = centroids
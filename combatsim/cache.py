@@ -0,0 +1,247 @@
+""" Persistent cache of simulation results.
+
+Simulating the same encounter with the same seed always gives the same
+results, so results can be stored on disk and looked up again by a
+fingerprint of everything that went into them: the creature templates and
+overrides, tactics, spells, seed, number of trials, aggregators, and the
+version of the simulator.
+
+    cache = ResultCache("results.sqlite")
+    wins, rounds = run_cached(
+        cache, definition, 10000, [Histogram('winner'), RunningMean('rounds')],
+        seed=1
+    )
+"""
+
+import hashlib
+import json
+import operator
+import pickle
+import sqlite3
+import types
+
+import combatsim
+from combatsim.simulation import run_trials
+
+# Attributes that point back at the object that owns them. Following them
+# would walk from a weapon to its owner and back again.
+_SKIPPED_ATTRIBUTES = {'owner', 'encounter', 'grid'}
+
+_MISSING = object()
+
+
+def _code_digest(code):
+    """ Hash of a function's bytecode, constants and names. """
+    digest = hashlib.sha256(code.co_code)
+    for const in code.co_consts:
+        if isinstance(const, types.CodeType):
+            digest.update(_code_digest(const).encode("utf-8"))
+        else:
+            digest.update(repr(const).encode("utf-8"))
+    digest.update(repr(code.co_names).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def _canonical(obj, seen):
+    if obj is None or isinstance(obj, (bool, int, float, str)):
+        return obj
+    if isinstance(obj, bytes):
+        return obj.hex()
+    if isinstance(obj, type):
+        return f"class:{obj.__module__}.{obj.__qualname__}"
+    if isinstance(obj, operator.attrgetter):
+        return repr(obj)
+    if isinstance(obj, types.FunctionType):
+        cells = [c.cell_contents for c in obj.__closure__ or ()]
+        return [
+            f"function:{obj.__module__}.{obj.__qualname__}",
+            _code_digest(obj.__code__),
+            _canonical(cells, seen),
+            _canonical(obj.__defaults__, seen)
+        ]
+
+    if id(obj) in seen:
+        raise ValueError(f"Cannot fingerprint recursive object {obj!r}")
+    seen.add(id(obj))
+    try:
+        if isinstance(obj, (list, tuple)):
+            return [_canonical(o, seen) for o in obj]
+        if isinstance(obj, (set, frozenset)):
+            return sorted(
+                (_canonical(o, seen) for o in obj), key=json.dumps
+            )
+        if isinstance(obj, dict):
+            return {
+                'dict': sorted(
+                    ([_canonical(k, seen), _canonical(v, seen)]
+                     for k, v in obj.items()),
+                    key=json.dumps
+                )
+            }
+        if hasattr(obj, '__dict__'):
+            state = {
+                k: v for k, v in vars(obj).items()
+                if k not in _SKIPPED_ATTRIBUTES and not k.startswith('_')
+            }
+            return {
+                'object': _canonical(type(obj), seen),
+                'state': _canonical(state, seen)
+            }
+    finally:
+        seen.discard(id(obj))
+
+    raise ValueError(f"Cannot fingerprint {obj!r}")
+
+
+def fingerprint(*parts):
+    """ Stable hash of a description of a simulation.
+
+    The parts can be any mix of plain values, containers, classes, functions,
+    and objects such as `Dice`, `Weapon` or `Spell`. Objects are described by
+    their class and public attributes, so two templates built separately but
+    with the same stats have the same fingerprint. Private attributes are
+    treated as caches and left out. The version of the simulator is
+    always included.
+
+    Returns:
+        str: Hex digest of the description.
+    """
+    description = [combatsim.__version__, _canonical(list(parts), set())]
+    encoded = json.dumps(description, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """ On-disk cache of simulation results backed by SQLite.
+
+    Values are pickled. When the total size of the stored values goes over
+    `max_bytes`, the least recently used entries are evicted.
+
+    Args:
+        path (str): Path to the SQLite database. Use ":memory:" for a cache
+            that only lives as long as this object.
+        max_bytes (int): Maximum total size of the pickled values.
+    """
+
+    def __init__(self, path, max_bytes=256 * 1024 * 1024):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._db = sqlite3.connect(path)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            "key TEXT PRIMARY KEY, "
+            "value BLOB NOT NULL, "
+            "size INTEGER NOT NULL, "
+            "accessed INTEGER NOT NULL)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS results_accessed ON results (accessed)"
+        )
+        self._db.commit()
+        self._clock = self._db.execute(
+            "SELECT COALESCE(MAX(accessed), 0) FROM results"
+        ).fetchone()[0]
+
+    def __contains__(self, key):
+        row = self._db.execute(
+            "SELECT 1 FROM results WHERE key = ?", (key,)
+        ).fetchone()
+        return row is not None
+
+    def __len__(self):
+        return self._db.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    @property
+    def size(self):
+        """ Total size in bytes of the values in the cache. """
+        return self._db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM results"
+        ).fetchone()[0]
+
+    def get(self, key, default=None):
+        row = self._db.execute(
+            "SELECT value FROM results WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return default
+        self._db.execute(
+            "UPDATE results SET accessed = ? WHERE key = ?",
+            (self._tick(), key)
+        )
+        self._db.commit()
+        return pickle.loads(row[0])
+
+    def put(self, key, value):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        self._db.execute(
+            "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+            (key, blob, len(blob), self._tick())
+        )
+        self._evict()
+        self._db.commit()
+
+    def get_or_compute(self, key, compute):
+        """ Returns the cached value for `key`, computing it on a miss. """
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        self._db.execute("DELETE FROM results")
+        self._db.commit()
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _tick(self):
+        self._clock += 1
+        return self._clock
+
+    def _evict(self):
+        excess = self.size - self.max_bytes
+        if excess <= 0:
+            return
+
+        rows = self._db.execute(
+            "SELECT key, size FROM results ORDER BY accessed"
+        )
+        evicted = []
+        for key, size in rows:
+            if excess <= 0:
+                break
+            evicted.append((key,))
+            excess -= size
+        self._db.executemany("DELETE FROM results WHERE key = ?", evicted)
+
+
+def run_cached(cache, definition, trials, aggregators, seed, **kwargs):
+    """ Runs a simulation, or loads its aggregates from the cache.
+
+    Takes the same arguments as `combatsim.simulation.run_trials`, except a
+    seed is required because unseeded simulations can't be repeated. Cached
+    aggregates are merged into `aggregators`, so the aggregators passed in
+    end up with the same results whether or not the cache had them.
+
+    Returns:
+        list: The aggregators that were passed in.
+    """
+    if seed is None:
+        raise ValueError("A seed is required to cache simulation results")
+
+    key = fingerprint(definition, trials, aggregators, seed, kwargs)
+    cached = cache.get(key, _MISSING)
+    if cached is _MISSING:
+        run_trials(definition, trials, aggregators, seed=seed, **kwargs)
+        cache.put(key, aggregators)
+    else:
+        for aggregator, part in zip(aggregators, cached):
+            aggregator.merge(part)
+    return aggregators
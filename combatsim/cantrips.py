@@ -6,7 +6,9 @@ Therefore, I will be focussing on things that do damage, or exert some
 positive or negative effects on nearby creatures.
 """
 
-from combatsim.spells import CantripDamage, SavingThrow, Sphere, Spell
+from combatsim.spells import (
+    CantripDamage, Resistance, SavingThrow, Sphere, Spell
+)
 
 # Acid Splash: You hurl a bubble of acid.
 #
@@ -41,17 +43,17 @@ acid_splash = Spell(
 #
 # Until the end of your next turn, you have resistance against bludgeoning,
 # piercing, and slashing damage dealt by weapon attacks.
-#blade_ward = Spell(
-#    "Blade Ward",
-#    casting_time="action",
-#    targeting=Sphere(radius=0),
-#    range_=0,
-#    components={"V", "S"},
-#    effects=[
-#        Resistance(['bludgeoning', 'piercing', 'slashing'], duration=1)
-#    ],
-#    school="abjuration"
-#)
+blade_ward = Spell(
+    "Blade Ward",
+    casting_time="action",
+    targeting=Sphere(radius=0),
+    range_=0,
+    components={"V", "S"},
+    effects=[
+        Resistance(['bludgeoning', 'piercing', 'slashing'], duration=1)
+    ],
+    school="abjuration"
+)
 
 """
 # Booming Blade
@@ -0,0 +1,263 @@
+""" Loads large monster catalogs from JSON, CSV or SQLite.
+
+`combatsim.monster_manual` only holds the handful of monsters available under
+the open games license. Every other monster should be kept in a private
+database, which this module knows how to read. A catalog is a list of monster
+records, each using the same keys as the templates in `monster_manual`,
+except that dice, armor and weapons are written out as plain data::
+
+    {
+        "name": "Bandit", "cr": "1/8", "xp": 25, "type": "humanoid",
+        "level": 2, "strength": 11, "dexterity": 12, "hd": "1d8",
+        "armor": {"name": "Leather", "base_ac": 11},
+        "weapons": [{"name": "Scimitar", "damage": "1d6",
+                     "damage_type": "slashing", "attack_mod": 3,
+                     "damage_mod": 1}],
+        "resistances": [], "vulnerabilities": []
+    }
+
+In CSV files and SQLite tables every record is a row, and columns holding
+lists or objects contain JSON. SQLite catalogs are read from a table named
+`monsters`.
+
+Records are only turned into templates the first time they are looked up.
+The parsed catalog is cached next to the source file in a binary format, so
+loading a catalog of thousands of monsters a second time only costs a single
+unpickle.
+"""
+
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from fractions import Fraction
+import csv
+import json
+import os
+import pickle
+import sqlite3
+
+from combatsim.creature import Monster
+from combatsim.dice import Dice
+from combatsim.items import Armor, Weapon
+
+# Experience points for each challenge rating.
+CR_XP = {
+    "0": 10, "1/8": 25, "1/4": 50, "1/2": 100, "1": 200, "2": 450, "3": 700,
+    "4": 1100, "5": 1800, "6": 2300, "7": 2900, "8": 3900, "9": 5000,
+    "10": 5900, "11": 7200, "12": 8400, "13": 10000, "14": 11500,
+    "15": 13000, "16": 15000, "17": 18000, "18": 20000, "19": 22000,
+    "20": 25000, "21": 33000, "22": 41000, "23": 50000, "24": 62000,
+    "25": 75000, "26": 90000, "27": 105000, "28": 120000, "29": 135000,
+    "30": 155000
+}
+
+_CACHE_VERSION = 1
+_JSON_FIELDS = {
+    'armor', 'weapons', 'resistances', 'vulnerabilities', 'immunities'
+}
+_NUMERIC_FIELDS = {
+    'xp', 'level', 'proficiency', 'strength', 'dexterity', 'constitution',
+    'intelligence', 'wisdom', 'charisma', 'ac', 'max_hp'
+}
+
+
+def normalize_cr(cr):
+    """ Converts a challenge rating such as 0.25, "0.25" or "1/4" to "1/4". """
+    value = Fraction(str(cr)).limit_denominator(8)
+    return str(value)
+
+
+class MonsterCatalog:
+    """ Indexed collection of monster templates.
+
+    Args:
+        records (list): Monster records as plain data. See the module
+            docstring for the format.
+    """
+
+    def __init__(self, records=()):
+        self._records = {}
+        self._by_cr = defaultdict(list)
+        self._by_type = defaultdict(list)
+        self._by_resistance = defaultdict(list)
+        self._xp = []
+        self._bases = {}
+        self._templates = {}
+        for record in records:
+            self.add_record(record)
+
+    @classmethod
+    def load(cls, path, cache=True):
+        """ Loads a catalog from a .json, .csv, .db, .sqlite or .sqlite3 file.
+
+        Args:
+            path (str): The catalog file.
+            cache (bool): Whether to read and write the binary cache that is
+                kept next to the catalog file.
+        """
+        cache_path = path + ".cache"
+        stat = os.stat(path)
+        source = (stat.st_mtime_ns, stat.st_size)
+        if cache:
+            catalog = cls._read_cache(cache_path, source)
+            if catalog is not None:
+                return catalog
+
+        catalog = cls(_read_records(path))
+        if cache:
+            catalog._write_cache(cache_path, source)
+        return catalog
+
+    def add_record(self, record):
+        """ Adds a monster record and indexes it. """
+        record = dict(record)
+        if 'cr' in record:
+            record['cr'] = normalize_cr(record['cr'])
+            record.setdefault('xp', CR_XP.get(record['cr']))
+        key = record['name'].lower()
+        if key in self._records:
+            raise ValueError(f"Duplicate monster `{record['name']}`")
+        self._records[key] = record
+
+        if 'cr' in record:
+            self._by_cr[record['cr']].append(key)
+        if 'type' in record:
+            self._by_type[record['type'].lower()].append(key)
+        for damage_type in record.get('resistances', []):
+            self._by_resistance[damage_type].append(key)
+        if record.get('xp') is not None:
+            insort(self._xp, (record['xp'], key))
+
+    def __len__(self):
+        return len(self._records)
+
+    def __contains__(self, name):
+        return name.lower() in self._records
+
+    def __iter__(self):
+        return iter(self.names())
+
+    def __getitem__(self, name):
+        """ Template for the monster, usable with `Creature.from_base`. """
+        key = name.lower()
+        if key not in self._bases:
+            if key not in self._records:
+                raise KeyError(name)
+            self._bases[key] = _to_base(self._records[key])
+        return self._bases[key]
+
+    def names(self):
+        return [record['name'] for record in self._records.values()]
+
+    def template(self, name, cls=Monster):
+        """ Compiled template for the monster. See `combatsim.template`. """
+        key = (name.lower(), cls)
+        if key not in self._templates:
+            self._templates[key] = cls.compile(self[name])
+        return self._templates[key]
+
+    def by_cr(self, cr):
+        """ Names of all monsters with the given challenge rating. """
+        return self._names(self._by_cr.get(normalize_cr(cr), []))
+
+    def by_type(self, type_):
+        """ Names of all monsters of a type, such as "humanoid". """
+        return self._names(self._by_type.get(type_.lower(), []))
+
+    def by_xp(self, low, high=None):
+        """ Names of all monsters worth between `low` and `high` xp. """
+        if high is None:
+            high = low
+        start = bisect_left(self._xp, (low, ""))
+        end = bisect_right(self._xp, (high, "\uffff"))
+        return self._names(key for _, key in self._xp[start:end])
+
+    def resistant_to(self, damage_type):
+        """ Names of all monsters that resist a damage type. """
+        return self._names(self._by_resistance.get(damage_type, []))
+
+    def _names(self, keys):
+        return [self._records[key]['name'] for key in keys]
+
+    @classmethod
+    def _read_cache(cls, cache_path, source):
+        try:
+            with open(cache_path, "rb") as f:
+                version, cached_source, catalog = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, ValueError):
+            return None
+        if version != _CACHE_VERSION or cached_source != source:
+            return None
+        return catalog
+
+    def _write_cache(self, cache_path, source):
+        # Only the parsed records and indexes are cached, not templates.
+        bases, templates = self._bases, self._templates
+        self._bases, self._templates = {}, {}
+        try:
+            with open(cache_path, "wb") as f:
+                pickle.dump(
+                    (_CACHE_VERSION, source, self), f,
+                    protocol=pickle.HIGHEST_PROTOCOL
+                )
+        except OSError:
+            pass
+        finally:
+            self._bases, self._templates = bases, templates
+
+
+def _read_records(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".json":
+        with open(path) as f:
+            return json.load(f)
+    if extension == ".csv":
+        with open(path, newline="") as f:
+            return [_from_row(row) for row in csv.DictReader(f)]
+    if extension in (".db", ".sqlite", ".sqlite3"):
+        db = sqlite3.connect(path)
+        try:
+            db.row_factory = sqlite3.Row
+            rows = db.execute("SELECT * FROM monsters").fetchall()
+            return [_from_row(dict(row)) for row in rows]
+        finally:
+            db.close()
+    raise ValueError(f"Unknown monster catalog format: {path}")
+
+
+def _from_row(row):
+    """ Converts a CSV or SQLite row into a record. """
+    record = {}
+    for key, value in row.items():
+        if value is None or value == "":
+            continue
+        if key in _JSON_FIELDS:
+            value = json.loads(value)
+        elif key in _NUMERIC_FIELDS:
+            value = int(value)
+        record[key] = value
+    return record
+
+
+def _to_base(record):
+    """ Converts a record into a template with dice, armor and weapons. """
+    base = dict(record)
+    if 'hd' in base:
+        base['hd'] = Dice(base['hd'])
+    if 'armor' in base:
+        armor = base['armor']
+        base['armor'] = Armor(
+            armor['name'], armor['base_ac'], armor.get('max_dex')
+        )
+    base['weapons'] = [
+        Weapon(
+            weapon['name'],
+            Dice(weapon['damage']),
+            weapon['damage_type'],
+            melee=weapon.get('melee', True),
+            properties=weapon.get('properties'),
+            attack_mod=weapon.get('attack_mod'),
+            damage_mod=weapon.get('damage_mod')
+        )
+        for weapon in base.get('weapons', [])
+    ]
+    return base
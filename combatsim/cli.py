@@ -0,0 +1,292 @@
+""" Command line interface for batch simulations.
+
+Runs trials of an encounter file and prints how often each team won::
+
+    combatsim ambush.json -n 100000 --workers 8 --seed 1
+    combatsim ambush.yaml --precision 0.01 --format json
+    combatsim ambush.json -n 1000000 --format binary -o results.bin
+    combatsim ambush.json -n 2000 --profile
+
+Trials are run in chunks, and the same seed gives the same results no matter
+how many workers are used. With `--precision`, the simulation stops as soon
+as every win rate is known well enough, and `-n` becomes the most trials that
+will be run.
+
+The CLI is meant to be called in shell loops and CI jobs, so it only imports
+what a run needs. Worker processes, the profiler and JSON output are only
+loaded when they are asked for.
+"""
+
+import argparse
+import math
+import os
+import sys
+
+from combatsim.aggregators import Histogram, RunningMean
+from combatsim.simulation import simulate
+
+FORMATS = ("table", "json", "binary")
+
+# z-score of a two-sided 95% confidence interval
+_Z = 1.96
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="combatsim",
+        description="Simulate a D&D 5e encounter many times."
+    )
+    parser.add_argument(
+        "encounter", help="JSON or YAML encounter file"
+    )
+    parser.add_argument(
+        "-n", "--trials", type=int,
+        help="number of trials, or the most trials to run with --precision "
+        "(default: the file's trials, or 1000)"
+    )
+    parser.add_argument(
+        "-w", "--workers", type=int, default=1,
+        help="number of worker processes, 0 for one per CPU (default: 1, "
+        "which runs in this process)"
+    )
+    parser.add_argument(
+        "-s", "--seed", type=int,
+        help="seed of the simulation (default: the file's seed, or random)"
+    )
+    parser.add_argument(
+        "--precision", type=float, metavar="MARGIN",
+        help="stop once every win rate is known to within +/- MARGIN at 95%% "
+        "confidence"
+    )
+    parser.add_argument(
+        "--chunk-size", type=int, default=1000,
+        help="trials handed to a worker at a time (default: 1000)"
+    )
+    parser.add_argument(
+        "-f", "--format", choices=FORMATS, default="table",
+        help="a summary table, a summary as JSON, or every trial result in "
+        "the format of combatsim.simulation.ResultWriter (default: table)"
+    )
+    parser.add_argument(
+        "-o", "--output", help="file to write to instead of standard output"
+    )
+    parser.add_argument(
+        "--profile", action="store_true",
+        help="run in this process under cProfile and print the slowest "
+        "functions to standard error"
+    )
+    return parser
+
+
+def margin(histogram):
+    """ Widest 95% confidence interval of the frequencies in a histogram.
+
+    Uses the Agresti-Coull interval, which stays sensible for frequencies of
+    0 and 1 where the normal approximation claims to be exact.
+
+    Returns:
+        float: Half the width of the widest interval.
+    """
+    total = histogram.total + _Z ** 2
+    widest = 0.0
+    for count in histogram.counts.values():
+        p = (count + _Z ** 2 / 2) / total
+        widest = max(widest, _Z * math.sqrt(p * (1 - p) / total))
+    return widest
+
+
+def _run_chunk(definition, seed, start, trials, output=None):
+    """ Runs one chunk of trials, in this process or in a worker. """
+    winners, rounds = Histogram('winner'), RunningMean('rounds')
+    for _ in simulate(
+        definition, trials, seed=seed, aggregators=[winners, rounds],
+        output=output, start=start
+    ):
+        pass
+    return winners, rounds
+
+
+def run(definition, trials, seed, workers=1, chunk_size=1000, precision=None,
+        output=None):
+    """ Runs trials in batches of one chunk per worker.
+
+    Args:
+        definition (EncounterDefinition): The encounter to simulate.
+        trials (int): Number of trials, or the most trials to run when
+            `precision` is given.
+        seed (int): Seed of the simulation.
+        workers (int): Number of worker processes. 1 runs in this process and
+            0 uses one worker per CPU.
+        chunk_size (int): Number of trials in a chunk.
+        precision (float): Stop after the first batch where `margin` of the
+            win rates is at most this.
+        output (file): Binary file every trial result is written to.
+
+    Returns:
+        tuple: (Histogram of winners, RunningMean of rounds)
+    """
+    workers = workers or os.cpu_count() or 1
+    winners, rounds = Histogram('winner'), RunningMean('rounds')
+    pool = parts = None
+    if workers > 1:
+        import multiprocessing
+        pool = multiprocessing.Pool(workers)
+    if output is not None:
+        import tempfile
+        parts = tempfile.TemporaryDirectory(prefix="combatsim-")
+
+    batch = chunk_size * workers
+    try:
+        for first in range(0, trials, batch):
+            tasks = [
+                (
+                    definition, seed, start, min(chunk_size, trials - start),
+                    os.path.join(parts.name, str(start)) if parts else None
+                )
+                for start in range(first, min(first + batch, trials), chunk_size)
+            ]
+            if pool is None:
+                chunks = [_run_chunk(*task) for task in tasks]
+            else:
+                chunks = pool.starmap(_run_chunk, tasks)
+            for (chunk_winners, chunk_rounds), task in zip(chunks, tasks):
+                winners.merge(chunk_winners)
+                rounds.merge(chunk_rounds)
+                if output is not None:
+                    _copy_part(task[-1], output)
+            if precision is not None and margin(winners) <= precision:
+                break
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+        if parts is not None:
+            parts.cleanup()
+    return winners, rounds
+
+
+def _copy_part(path, output):
+    if os.path.exists(path):
+        with open(path, "rb") as part:
+            while True:
+                block = part.read(1 << 20)
+                if not block:
+                    break
+                output.write(block)
+        os.remove(path)
+
+
+def summary(definition, seed, winners, rounds):
+    """ Results of a run as a JSON-ready dict. """
+    return {
+        'name': definition.name,
+        'trials': winners.total,
+        'seed': seed,
+        'wins': {_team(team): count for team, count in _teams(winners)},
+        'win_rates': {
+            _team(team): winners.frequency(team) for team, _ in _teams(winners)
+        },
+        'margin': margin(winners),
+        'mean_rounds': rounds.mean,
+        'stddev_rounds': rounds.stddev,
+    }
+
+
+def _teams(winners):
+    return sorted(winners.counts.items(), key=lambda item: str(item[0]))
+
+
+def _team(team):
+    return "draw" if team is None else str(team)
+
+
+def format_table(data):
+    lines = []
+    if data['name']:
+        lines.append(data['name'])
+    lines.append(f"{data['trials']} trials, seed {data['seed']}")
+    lines.append("")
+    lines.append(f"{'team':<10}{'wins':>10}{'win rate':>12}")
+    for team, wins in data['wins'].items():
+        rate = data['win_rates'][team]
+        lines.append(f"{team:<10}{wins:>10}{rate:>12.1%}")
+    lines.append("")
+    lines.append(
+        f"win rates are within +/- {data['margin']:.1%} (95% confidence)"
+    )
+    lines.append(
+        f"rounds: {data['mean_rounds']:.2f} mean, "
+        f"{data['stddev_rounds']:.2f} stddev"
+    )
+    return "\n".join(lines) + "\n"
+
+
+def main(argv=None):
+    """ Runs the CLI.
+
+    Returns:
+        int: Exit status.
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if args.workers < 0:
+        parser.error("--workers can't be negative")
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be positive")
+
+    from combatsim.encounter_file import EncounterFileError, load
+    try:
+        definition = load(args.encounter)
+    except (OSError, EncounterFileError) as error:
+        parser.exit(2, f"combatsim: {args.encounter}: {error}\n")
+
+    trials = args.trials if args.trials is not None else definition.trials
+    if trials is None:
+        trials = 1000
+    seed = args.seed if args.seed is not None else definition.seed
+    if seed is None:
+        import random
+        seed = random.SystemRandom().getrandbits(32)
+    workers = 1 if args.profile else args.workers
+
+    binary = None
+    if args.format == "binary":
+        binary = open(args.output, "wb") if args.output else sys.stdout.buffer
+
+    profiler = None
+    if args.profile:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    try:
+        winners, rounds = run(
+            definition, trials, seed, workers, args.chunk_size,
+            args.precision, binary
+        )
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        if binary is not None:
+            binary.flush()
+            if args.output:
+                binary.close()
+
+    if profiler is not None:
+        import pstats
+        pstats.Stats(profiler, stream=sys.stderr).sort_stats(
+            "cumulative"
+        ).print_stats(25)
+
+    if binary is None:
+        data = summary(definition, seed, winners, rounds)
+        if args.format == "json":
+            import json
+            text = json.dumps(data, indent=2) + "\n"
+        else:
+            text = format_table(data)
+        if args.output:
+            with open(args.output, "w") as f:
+                f.write(text)
+        else:
+            sys.stdout.write(text)
+    return 0
@@ -1,13 +1,18 @@
 """ Defines a creature that can be used in the simulator. """
 
 import math
+import numbers
 
+from combatsim import dpr
 from combatsim.ability import Ability
+from combatsim.damage import NORMAL, damage_multipliers, damage_type_id
 from combatsim.dice import Dice, Modifier
 from combatsim.tactics import TargetWeakest
 from combatsim.items import Armor, Weapon
 from combatsim.rules_error import RulesError
 from combatsim.event import EventLog
+from combatsim.events import DAMAGE_TAKEN, FORCED_MOVEMENT, WILLING_MOVEMENT
+from combatsim.template import Template
 
 
 class Creature:
@@ -17,6 +22,8 @@ class Creature:
         name (str): The creatures name. This should be unique if you want to
             tell different creatures apart when simulating an encounter.
         xp (int): How much xp this creature is worth.
+        cr (str): Challenge rating, such as "1/4". Used for the xp when none
+            is given.
         level (int): The level of the creature. Level only really makes sense
             for player characters and NPCs. Most creatures from the monster
             manual will be "level 1" but have a meaningful challenge rating.
@@ -44,6 +51,11 @@ class Creature:
         attacks (list): A list of (Dice, Dice) tuples where the first value
             is the dice to roll for the attack with modifiers, and the
             second value is the damage dice to roll on a hit.
+        resistances (list): Damage types that deal half damage.
+        vulnerabilities (list): Damage types that deal double damage.
+        immunities (list): Damage types that deal no damage.
+        damage_multipliers (list): Multiplier for each damage type id, built
+            from the three lists above. See `combatsim.damage`.
     """
 
     @classmethod
@@ -53,9 +65,21 @@ class Creature:
         template.update(kwargs)
         return cls(**template)
 
+    @classmethod
+    def compile(cls, base, **kwargs):
+        """ Compiles a base template for creating many creatures quickly.
+
+        Takes the same arguments as `from_base`.
+
+        Returns:
+            Template: Template that stamps out new creatures of this class.
+        """
+        return Template(cls, base, **kwargs)
+
     def __init__(self, **kwargs):
         self.name = kwargs.get('name', "nameless")
         self.xp = kwargs.get('xp', None)
+        self.cr = kwargs.get('cr', None)
         self.level = kwargs.get('level', 1)
         self.proficiency = kwargs.get(
             'proficiency', 1 + math.ceil(self.level / 4)
@@ -105,8 +129,12 @@ class Creature:
 
         self.tactics = kwargs.get('tactics', TargetWeakest)(self)
         self.team = kwargs.get('team', None)
-        self.resistances = kwargs.get('resistances', [])
-        self.vulnerabilities = kwargs.get('vulnerabilities', [])
+        self.encounter = None
+        self._resistances = list(kwargs.get('resistances', []))
+        self._vulnerabilities = list(kwargs.get('vulnerabilities', []))
+        self._immunities = list(kwargs.get('immunities', []))
+        self._update_damage_multipliers()
+        self.conditions = kwargs.get('conditions', [])
         self.spellcasting = self.attributes[
             kwargs.get('spellcasting', 'wisdom')
         ]
@@ -157,16 +185,116 @@ class Creature:
         Returns:
             bool: True if saved, False otherwise.
         """
-        saving_throw = (Dice("1d20") + self.attributes[attribute]).roll()[0]
+        saving_throw = Dice("1d20").roll()[0] + self.save_bonus(attribute)
         if saving_throw >= dc:
             EventLog.log(f"\t{self} saved against {attribute} with a {saving_throw}")
             return True
         else:
             return False
 
+    @property
+    def resistances(self):
+        """ Damage types this creature takes half damage from.
+
+        Assigning a new list updates `damage_multipliers`. Changing the list
+        in place does not, so use `add_resistances` and `remove_resistances`
+        for that.
+        """
+        return self._resistances
+
+    @resistances.setter
+    def resistances(self, value):
+        self._resistances = value
+        self._update_damage_multipliers()
+
+    @property
+    def vulnerabilities(self):
+        """ Damage types this creature takes double damage from. """
+        return self._vulnerabilities
+
+    @vulnerabilities.setter
+    def vulnerabilities(self, value):
+        self._vulnerabilities = value
+        self._update_damage_multipliers()
+
+    @property
+    def immunities(self):
+        """ Damage types this creature takes no damage from. """
+        return self._immunities
+
+    @immunities.setter
+    def immunities(self, value):
+        self._immunities = value
+        self._update_damage_multipliers()
+
+    def add_resistances(self, damage_types):
+        """ Adds resistances, such as those granted by a spell.
+
+        The same resistance can be added more than once, in which case it
+        lasts until it has been removed as many times.
+        """
+        self._resistances = self._resistances + list(damage_types)
+        self._update_damage_multipliers()
+
+    def remove_resistances(self, damage_types):
+        resistances = list(self._resistances)
+        for damage_type in damage_types:
+            resistances.remove(damage_type)
+        self._resistances = resistances
+        self._update_damage_multipliers()
+
+    def _update_damage_multipliers(self):
+        """ Rebuilds the multiplier for each damage type id. See
+        `combatsim.damage`. """
+        self.damage_multipliers = damage_multipliers(
+            self._resistances, self._vulnerabilities, self._immunities
+        )
+
+    def save_bonus(self, attribute):
+        """ Modifier added to saving throws for an attribute. """
+        return self.attributes[attribute].mod
+
     def is_proficient(self, weapon):
         raise NotImplementedError
 
+    def dpr(self, target, advantage=False, disadvantage=False):
+        """ Average damage this creature deals in a round, worked out exactly.
+
+        With the default tactics, creatures attack once a round with their
+        first weapon, so this is the damage per round of that weapon. See
+        `combatsim.dpr`.
+
+        Args:
+            target (int or Creature): AC to attack, or a creature whose AC
+                and damage multiplier for the weapon are used.
+
+        Returns:
+            float: The average damage, before it is capped by the target's HP.
+        """
+        weapon = self.weapons[0]
+        if isinstance(target, numbers.Integral):
+            return weapon.dpr(target, advantage, disadvantage)
+
+        multipliers = target.damage_multipliers
+        type_id = damage_type_id(weapon.damage_type)
+        multiplier = NORMAL
+        if type_id < len(multipliers):
+            multiplier = multipliers[type_id]
+        if multiplier == NORMAL:
+            return weapon.dpr(target.ac, advantage, disadvantage)
+        outcomes = dpr.damage_distribution(
+            weapon, target.ac, advantage, disadvantage, multiplier
+        )
+        return sum(damage * chance for damage, chance in outcomes.items())
+
+    def dpr_many(self, acs, advantage=False, disadvantage=False):
+        """ `dpr` against each of many ACs at once.
+
+        Returns:
+            numpy.ndarray: Float array with the same shape as `acs`.
+        """
+        return self.weapons[0].dpr_many(acs, advantage, disadvantage)
+
     def is_alive(self):
         return self.hp > 0
 
@@ -204,6 +332,7 @@ class Creature:
         if attack_roll >= target.ac:
             damage, damage_type = attack.damage_roll(crit=crit)
             damage_taken = target.take_damage(damage, damage_type)
+            self.dealt_damage(target, damage_taken)
             EventLog.log(f"{self} hits {target} with {attack.name} doing {damage_taken} damage")
         else:
             EventLog.log(f"{self} misses {target} with {attack.name}")
@@ -247,16 +376,17 @@ class Creature:
         Returns:
             str: A string representing the damage taken after resistances.
         """
-        if type_ in self.resistances:
-            taken = math.floor(value / 2)
+        multipliers = self.damage_multipliers
+        type_id = damage_type_id(type_)
+        if type_id < len(multipliers) and multipliers[type_id] != NORMAL:
+            taken = math.floor(value * multipliers[type_id])
             # TODO (phillip): event log should show that damage was reduced
-        elif type_ in self.vulnerabilities:
-            taken = value * 2
         else:
             taken = value
 
         # Only used to return at the end
         actual_taken = min(self.hp, taken)
+        was_alive = self.hp > 0
 
         self.hp -= taken
         if self.hp < -self.max_hp:
@@ -264,11 +394,28 @@ class Creature:
             pass
 
         self.hp = max(0, self.hp)
+        if self.encounter is not None:
+            self.encounter.hp_changed(self)
+            if was_alive and self.hp == 0:
+                self.encounter.creature_died(self)
+            self.encounter.events.emit(
+                DAMAGE_TAKEN, self, damage=actual_taken, type_=type_
+            )
         return actual_taken
 
+    def dealt_damage(self, target, value):
+        """ Records damage this creature dealt in its current encounter. """
+        if self.encounter is not None:
+            self.encounter.record_damage(self, target, value)
+
     def heal(self, value):
         add = min(self.max_hp - self.hp, value)
+        was_dead = self.hp <= 0
         self.hp += add
+        if self.encounter is not None:
+            if was_dead and self.hp > 0:
+                self.encounter.creature_revived(self)
+            self.encounter.hp_changed(self)
         return add
 
     def equip(self, item):
@@ -276,13 +423,24 @@ class Creature:
             return
         item.equip(self)
 
-    def move(self, pos):
+    def move(self, pos, forced=False):
+        """ Moves the creature to a new position on its grid.
+
+        Args:
+            pos (tuple): The (x, y) position to move to.
+            forced (bool): True if the creature is being moved against its
+                will, for example by being shoved.
+        """
         if self.grid[pos[0], pos[1]] != None:
             raise RulesError("Creature cannot move into a non-empty space")
 
+        start = (self.x, self.y)
         self.grid[self.x, self.y] = None
         self.grid[pos[0], pos[1]] = self
         self.x, self.y = pos
+        if self.encounter is not None:
+            kind = FORCED_MOVEMENT if forced else WILLING_MOVEMENT
+            self.encounter.events.emit(kind, self, start=start, end=pos)
 
     def distance_to(self, other):
         """ Gets distance to another creature. """
@@ -292,6 +450,27 @@ class Creature:
         return int(dist)
 
 
+def roll_saving_throws(creatures, attribute, dc):
+    """ Rolls the same saving throw for many creatures at once.
+
+    All of the d20s are rolled in a single batch, and only a summary of the
+    results is logged.
+
+    Returns:
+        list: True for each creature that saved, False otherwise.
+    """
+    rolls = Dice("1d20").roll_many(len(creatures))
+    saved = [
+        roll + creature.save_bonus(attribute) >= dc
+        for roll, creature in zip(rolls, creatures)
+    ]
+    EventLog.log(
+        f"\t{sum(saved)} of {len(creatures)} creatures saved against "
+        f"{attribute}"
+    )
+    return saved
+
+
 class Monster(Creature):
     """ Represents NPCs or Monsters run by the DM.
 
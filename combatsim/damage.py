@@ -0,0 +1,68 @@
+""" Damage types and how creatures react to them.
+
+Damage types are interned as small integer ids, and every creature keeps a
+list of damage multipliers indexed by those ids. Applying damage is then a
+single list lookup instead of searching through lists of resistances and
+vulnerabilities, and the multipliers of many creatures can be stacked into
+an array to damage all of them at once.
+"""
+
+DAMAGE_TYPES = [
+    "acid", "bludgeoning", "cold", "fire", "force", "lightning", "necrotic",
+    "piercing", "poison", "psychic", "radiant", "slashing", "thunder"
+]
+
+# Damage without a type, such as falling damage.
+UNTYPED = 0
+
+IMMUNE = 0.0
+RESISTANT = 0.5
+NORMAL = 1.0
+VULNERABLE = 2.0
+
+_IDS = {None: UNTYPED}
+_NAMES = [None]
+for _name in DAMAGE_TYPES:
+    _IDS[_name] = len(_NAMES)
+    _NAMES.append(_name)
+
+
+def damage_type_id(damage_type):
+    """ Integer id of a damage type.
+
+    Damage types that aren't in `DAMAGE_TYPES` are given a new id the first
+    time they are seen, so homebrew damage types still work.
+    """
+    try:
+        return _IDS[damage_type]
+    except KeyError:
+        _IDS[damage_type] = len(_NAMES)
+        _NAMES.append(damage_type)
+        return _IDS[damage_type]
+
+
+def damage_type_name(type_id):
+    """ Name of the damage type with the given id. """
+    return _NAMES[type_id]
+
+
+def damage_multipliers(resistances=(), vulnerabilities=(), immunities=()):
+    """ Builds the damage multiplier of every damage type.
+
+    Immunity beats resistance, and resistance beats vulnerability.
+
+    Returns:
+        list: Multiplier for each damage type id.
+    """
+    vulnerable = [damage_type_id(t) for t in vulnerabilities]
+    resistant = [damage_type_id(t) for t in resistances]
+    immune = [damage_type_id(t) for t in immunities]
+
+    multipliers = [NORMAL] * len(_NAMES)
+    for type_id in vulnerable:
+        multipliers[type_id] = VULNERABLE
+    for type_id in resistant:
+        multipliers[type_id] = RESISTANT
+    for type_id in immune:
+        multipliers[type_id] = IMMUNE
+    return multipliers
@@ -0,0 +1,307 @@
+""" How hard an encounter is for a party.
+
+Two estimates are given for every encounter:
+
+* The XP budget of the Dungeon Master's Guide. The XP of the monsters is
+  multiplied by a factor for the number of monsters and compared to the XP
+  thresholds of the party's levels, which rates the encounter as trivial,
+  easy, medium, hard or deadly.
+* A score worked out from the damage per round and HP of both sides. By
+  Lanchester's square law, a side's fighting strength is its total damage
+  per round times its total HP, so the score is the log of the monsters'
+  strength over the party's. A score of 0 is an even fight. The score is
+  turned into the chance that the party loses by a logistic curve, which is
+  calibrated against simulations.
+
+::
+
+    difficulty = estimate(definition, party_team=1)
+    difficulty.rating       # "hard"
+    difficulty.loss_chance  # 0.31
+
+Only weapon attacks count towards damage per round, so spellcasters are
+rated weaker than they fight. `calibrate` fits the curve to simulations of
+encounters that look like the ones being rated, and stores the simulations
+in a `ResultCache` so calibrating again is free.
+
+Estimates work on `Combatant` summaries, which are worked out once for every
+template. Rating a list of combatants takes a few microseconds, so
+thousands of candidate encounters can be rated every second.
+"""
+
+from collections import namedtuple
+import math
+import weakref
+
+from combatsim import dpr
+from combatsim.catalog import CR_XP, normalize_cr
+
+RATINGS = ("trivial", "easy", "medium", "hard", "deadly")
+
+# XP thresholds of a character of each level for an easy, medium, hard and
+# deadly encounter.
+XP_THRESHOLDS = {
+    1: (25, 50, 75, 100), 2: (50, 100, 150, 200), 3: (75, 150, 225, 400),
+    4: (125, 250, 375, 500), 5: (250, 500, 750, 1100),
+    6: (300, 600, 900, 1400), 7: (350, 750, 1100, 1700),
+    8: (450, 900, 1400, 2100), 9: (550, 1100, 1600, 2400),
+    10: (600, 1200, 1900, 2800), 11: (800, 1600, 2400, 3600),
+    12: (1000, 2000, 3000, 4500), 13: (1100, 2200, 3400, 5100),
+    14: (1250, 2500, 3800, 5700), 15: (1400, 2800, 4300, 6400),
+    16: (1600, 3200, 4800, 7200), 17: (2000, 3900, 5900, 8800),
+    18: (2100, 4200, 6300, 9500), 19: (2400, 4900, 7300, 10900),
+    20: (2800, 5700, 8500, 12700),
+}
+
+# Encounter multipliers, and the number of monsters each one starts at.
+_MULTIPLIERS = (0.5, 1, 1.5, 2, 2.5, 3, 4, 5)
+_MONSTER_COUNTS = (1, 2, 3, 7, 11, 15)
+
+
+class Combatant(namedtuple('Combatant', 'name team level xp hp ac attack')):
+    """ What the estimates need to know about a creature.
+
+    Attributes:
+        hp (float): Average max HP.
+        attack (tuple): `combatsim.dpr.attack_profile` of the weapon the
+            creature attacks with.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_creature(cls, creature, hp=None):
+        xp = creature.xp
+        if xp is None and creature.cr is not None:
+            xp = CR_XP.get(normalize_cr(creature.cr))
+        return cls(
+            creature.name,
+            creature.team,
+            creature.level,
+            xp or 0,
+            creature.max_hp if hp is None else hp,
+            creature.ac,
+            dpr.attack_profile(creature.weapons[0])
+        )
+
+
+_templates = weakref.WeakKeyDictionary()
+
+
+def from_template(template):
+    """ `Combatant` of a compiled template, which is worked out once. """
+    combatant = _templates.get(template)
+    if combatant is None:
+        hp = template.max_hp
+        if hp is None:
+            hp = template.prototype._calc_hp(average=True)
+        combatant = Combatant.from_creature(template.prototype, hp)
+        combatant = combatant._replace(team=template.defaults.get('team'))
+        _templates[template] = combatant
+    return combatant
+
+
+def combatants(definition):
+    """ `Combatant` of every combatant of an `EncounterDefinition`. """
+    return [from_template(template) for template in definition.compile()]
+
+
+def xp_thresholds(levels):
+    """ The party's (easy, medium, hard, deadly) XP thresholds. """
+    easy = medium = hard = deadly = 0
+    for level in levels:
+        e, m, h, d = XP_THRESHOLDS[min(max(level, 1), 20)]
+        easy += e
+        medium += m
+        hard += h
+        deadly += d
+    return easy, medium, hard, deadly
+
+
+def encounter_multiplier(monsters, party_size):
+    """ Multiplier applied to the XP of `monsters` monsters. """
+    step = sum(monsters >= count for count in _MONSTER_COUNTS)
+    if party_size < 3:
+        step += 1
+    elif party_size >= 6:
+        step -= 1
+    return _MULTIPLIERS[step]
+
+
+class Calibration(namedtuple('Calibration', 'intercept slope')):
+    """ Logistic curve from a strength score to the chance of losing. """
+    __slots__ = ()
+
+    def loss_chance(self, score):
+        x = self.intercept + self.slope * score
+        if x < -700:
+            return 0.0
+        if x > 700:
+            return 1.0
+        return 1 / (1 + math.exp(-x))
+
+    @classmethod
+    def fit(cls, samples, iterations=25):
+        """ Fits the curve to simulated encounters.
+
+        Args:
+            samples (list): (score, fraction of trials the party lost,
+                trials) tuples.
+
+        Returns:
+            Calibration: The maximum likelihood fit.
+        """
+        intercept, slope = 0.0, 1.0
+        for _ in range(iterations):
+            # Newton's method on the binomial log likelihood
+            g0 = g1 = h00 = h01 = h11 = 0.0
+            for score, lost, trials in samples:
+                p = cls(intercept, slope).loss_chance(score)
+                w = trials * p * (1 - p)
+                g0 += trials * (lost - p)
+                g1 += trials * (lost - p) * score
+                h00 += w
+                h01 += w * score
+                h11 += w * score * score
+            det = h00 * h11 - h01 * h01
+            if abs(det) < 1e-12:
+                break
+            intercept += (h11 * g0 - h01 * g1) / det
+            slope += (h00 * g1 - h01 * g0) / det
+        return cls(intercept, slope)
+
+
+def calibration_encounters():
+    """ The encounters `DEFAULT_CALIBRATION` is fitted to.
+
+    Parties of one or two knights, with or without two commoners, fight 1 to
+    12 bandits or blood hawks, which makes 64 encounters.
+    """
+    from combatsim.creature import Monster
+    from combatsim.encounter import EncounterDefinition
+    from combatsim.monster_manual import bandit, blood_hawk
+    from combatsim.sample_creatures import commoner, knight
+
+    definitions = []
+    for knights in (1, 2):
+        for commoners in (0, 2):
+            for monster in (bandit, blood_hawk):
+                for count in (1, 2, 3, 4, 6, 8, 10, 12):
+                    definition = EncounterDefinition()
+                    for _ in range(knights):
+                        definition.add(Monster, knight, team=1)
+                    for _ in range(commoners):
+                        definition.add(Monster, commoner, team=1)
+                    for _ in range(count):
+                        definition.add(Monster, monster, team=2)
+                    definitions.append(definition)
+    return definitions
+
+
+# Fitted with calibrate(calibration_encounters(), cache, trials=1000, seed=0)
+DEFAULT_CALIBRATION = Calibration(-0.22, 3.03)
+
+
+class Difficulty(namedtuple(
+    'Difficulty', 'xp adjusted_xp thresholds rating score loss_chance'
+)):
+    """ Difficulty of an encounter.
+
+    Attributes:
+        xp (int): Total XP of the monsters.
+        adjusted_xp (float): XP after the encounter multiplier.
+        thresholds (tuple): The party's (easy, medium, hard, deadly) XP
+            thresholds.
+        rating (str): One of `RATINGS`, by XP budget.
+        score (float): Log of the monsters' strength over the party's.
+        loss_chance (float): Calibrated chance that the party loses.
+    """
+    __slots__ = ()
+
+
+def strength_score(party, monsters):
+    """ Log of the monsters' fighting strength over the party's.
+
+    Strength is total damage per round against the other side's average AC,
+    times total HP.
+    """
+    party_ac = round(sum(c.ac for c in party) / len(party))
+    monster_ac = round(sum(c.ac for c in monsters) / len(monsters))
+    party_dpr = sum(dpr.profile_damage(c.attack, monster_ac) for c in party)
+    monster_dpr = sum(dpr.profile_damage(c.attack, party_ac) for c in monsters)
+    party_strength = party_dpr * sum(c.hp for c in party)
+    monster_strength = monster_dpr * sum(c.hp for c in monsters)
+    if not party_strength:
+        return math.inf
+    if not monster_strength:
+        return -math.inf
+    return math.log(monster_strength / party_strength)
+
+
+def rate(party, monsters, calibration=DEFAULT_CALIBRATION):
+    """ Estimates how hard `monsters` are for `party`.
+
+    Args:
+        party (list): `Combatant` of every party member.
+        monsters (list): `Combatant` of every monster.
+
+    Returns:
+        Difficulty: The estimate.
+    """
+    if not party or not monsters:
+        raise ValueError("Both sides need at least one combatant")
+    xp = sum(c.xp for c in monsters)
+    adjusted = xp * encounter_multiplier(len(monsters), len(party))
+    thresholds = xp_thresholds([c.level for c in party])
+    rating = RATINGS[sum(adjusted >= t for t in thresholds)]
+    score = strength_score(party, monsters)
+    return Difficulty(
+        xp, adjusted, thresholds, rating, score,
+        calibration.loss_chance(score)
+    )
+
+
+def _sides(definition, party_team):
+    everyone = combatants(definition)
+    party = [c for c in everyone if c.team == party_team]
+    monsters = [c for c in everyone if c.team != party_team]
+    return party, monsters
+
+
+def estimate(definition, party_team=1, calibration=DEFAULT_CALIBRATION):
+    """ Estimates the difficulty of an `EncounterDefinition`.
+
+    Args:
+        party_team: Team of the party. Everyone else is a monster.
+
+    Returns:
+        Difficulty: The estimate.
+    """
+    return rate(*_sides(definition, party_team), calibration)
+
+
+def calibrate(definitions, cache, trials=1000, seed=0, party_team=1):
+    """ Fits a `Calibration` to simulations of some encounters.
+
+    Simulations are looked up in `cache` before they are run, see
+    `combatsim.cache.run_cached`.
+
+    Args:
+        definitions (list): Encounters like the ones that will be rated.
+        cache (ResultCache): Where simulation results are kept.
+
+    Returns:
+        Calibration: The fitted curve.
+    """
+    from combatsim.aggregators import Histogram
+    from combatsim.cache import run_cached
+
+    samples = []
+    for definition in definitions:
+        score = strength_score(*_sides(definition, party_team))
+        if math.isinf(score):
+            continue
+        winners, = run_cached(
+            cache, definition, trials, [Histogram('winner')], seed
+        )
+        samples.append((score, 1 - winners.frequency(party_team), trials))
+    return Calibration.fit(samples)
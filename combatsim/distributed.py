@@ -0,0 +1,340 @@
+""" Simulations spread over many machines.
+
+A `Coordinator` listens on a TCP port and hands out shards of trials to the
+workers that connect to it. Workers can run on any machine that has the
+simulator installed::
+
+    # On every worker machine, one process per CPU
+    COMBATSIM_AUTHKEY=secret python -m combatsim.distributed \\
+        coordinator.example.com:7000 --processes 8
+
+    # On the coordinator
+    with Coordinator(("0.0.0.0", 7000), authkey=b"secret") as coordinator:
+        wins, rounds = coordinator.run(
+            ambush, 10000000, [Histogram('winner'), RunningMean('rounds')],
+            seed=1
+        )
+        win_rates = sweep.run(coordinator=coordinator).win_rate(1)
+
+A shard is a range of trial indices of a simulation with a fixed seed, so it
+plays out the same wherever it is run, and results are identical to running
+the simulation on a single machine. Workers send back only the aggregators
+of each shard, which the coordinator merges in order.
+
+When a worker disconnects, or takes longer than `timeout` over a shard, its
+shard goes back in the queue and is handed to the next free worker. Results
+that arrive late from a worker that was given up on are ignored.
+
+Messages are pickled and sent with `multiprocessing.connection`, which
+checks that both ends share the same authkey before anything is unpickled.
+Only run workers and coordinators on networks you trust.
+"""
+
+import argparse
+import copy
+from collections import deque
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+import os
+import random
+import sys
+import threading
+import time
+
+from combatsim.pool import context, pack, run_chunk
+
+
+class WorkerError(Exception):
+    """ A task raised an exception on a worker. """
+
+
+def _connect(address, authkey, wait):
+    deadline = time.monotonic() + wait
+    while True:
+        try:
+            return Client(address, authkey=authkey)
+        except ConnectionRefusedError:
+            if time.monotonic() >= deadline:
+                raise
+            time.sleep(0.5)
+
+
+def work(address, authkey, wait=0):
+    """ Connects to a coordinator and runs its tasks until told to stop.
+
+    Args:
+        address (tuple): (host, port) of the coordinator.
+        authkey (bytes): Key shared with the coordinator.
+        wait (float): Seconds to keep trying to connect while the
+            coordinator isn't listening yet.
+    """
+    with _connect(address, authkey, wait) as conn:
+        while True:
+            try:
+                message = conn.recv()
+            except EOFError:
+                return
+            if message[0] == 'stop':
+                return
+            _, index, func, args = message
+            try:
+                reply = ('result', index, func(*args))
+            except Exception as error:
+                reply = ('error', index, repr(error))
+            try:
+                conn.send(reply)
+            except OSError:
+                # The coordinator gave up on this worker.
+                return
+
+
+class Coordinator:
+    """ Hands out tasks to workers connected over TCP.
+
+    Args:
+        address (tuple): (host, port) to listen on. Port 0 picks a free port.
+        authkey (bytes): Key workers must have to connect. A random key is
+            made if none is given, which only workers started with
+            `start_workers` know.
+        timeout (float): Seconds a worker may take over one task before it
+            is treated as lost. None waits forever.
+
+    Attributes:
+        address (tuple): Address the coordinator listens on.
+        lost (int): Number of tasks that were handed out again because their
+            worker was lost.
+    """
+
+    def __init__(self, address=("localhost", 0), authkey=None, timeout=None):
+        self.authkey = authkey if authkey is not None else os.urandom(16)
+        self.timeout = timeout
+        self.lost = 0
+        self._listener = Listener(address, authkey=self.authkey)
+        self.address = self._listener.address
+        self._lock = threading.Condition()
+        self._queue = deque()
+        self._tasks = {}
+        self._results = {}
+        self._error = None
+        self._closing = False
+        self._workers = []
+        self._processes = []
+        self._accepter = threading.Thread(target=self._accept, daemon=True)
+        self._accepter.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @property
+    def workers(self):
+        """ Number of workers that are connected. """
+        with self._lock:
+            return sum(thread.is_alive() for thread in self._workers)
+
+    def start_workers(self, count):
+        """ Starts `count` worker processes on this machine. """
+        ctx = context()
+        for _ in range(count):
+            process = ctx.Process(
+                target=work, args=(self.address, self.authkey), daemon=True
+            )
+            process.start()
+            self._processes.append(process)
+
+    def map(self, func, tasks):
+        """ Runs `func(*args)` for every args in `tasks` on the workers.
+
+        `func` is pickled by name, so it must be importable on the workers.
+        Waits for workers to connect if there are none.
+
+        Returns:
+            list: The result of each task, in order.
+
+        Raises:
+            WorkerError: If a task raised an exception.
+            RuntimeError: If the coordinator is closed before every task is
+                done.
+        """
+        tasks = list(tasks)
+        with self._lock:
+            if self._tasks:
+                raise RuntimeError("The coordinator is already running tasks")
+            self._tasks = {i: (func, args) for i, args in enumerate(tasks)}
+            self._queue.extend(self._tasks)
+            self._results = {}
+            self._error = None
+            self._lock.notify_all()
+            try:
+                while len(self._results) < len(tasks) and self._error is None:
+                    if self._closing:
+                        raise RuntimeError(
+                            "The coordinator was closed while running tasks"
+                        )
+                    self._lock.wait()
+                if self._error is not None:
+                    raise WorkerError(self._error)
+                return [self._results[i] for i in range(len(tasks))]
+            finally:
+                self._tasks = {}
+                self._queue.clear()
+
+    def run(self, definition, trials, aggregators, seed=None,
+            shard_size=1000):
+        """ Runs a simulation on the workers, like `run_trials`.
+
+        The aggregators are copied for every shard, so they should be empty
+        and picklable.
+
+        Returns:
+            list: The aggregators that were passed in, merged with every
+            shard.
+        """
+        if seed is None:
+            seed = random.SystemRandom().getrandbits(32)
+        packed = pack(definition)
+        shards = self.map(run_chunk, [
+            (
+                packed, seed, start, min(shard_size, trials - start),
+                copy.deepcopy(aggregators)
+            )
+            for start in range(0, trials, shard_size)
+        ])
+        for shard in shards:
+            for aggregator, part in zip(aggregators, shard):
+                aggregator.merge(part)
+        return aggregators
+
+    def close(self):
+        """ Stops the workers and the listener. """
+        with self._lock:
+            self._closing = True
+            self._lock.notify_all()
+        # Closing the listener doesn't wake a thread blocked in accept().
+        try:
+            Client(self.address, authkey=self.authkey).close()
+        except OSError:
+            pass
+        self._accepter.join()
+        self._listener.close()
+        for thread in list(self._workers):
+            thread.join()
+        for process in self._processes:
+            process.join()
+
+    def _accept(self):
+        while True:
+            try:
+                conn = self._listener.accept()
+            except (OSError, EOFError, AuthenticationError):
+                if self._closing:
+                    return
+                continue
+            thread = threading.Thread(
+                target=self._serve, args=(conn,), daemon=True
+            )
+            with self._lock:
+                if self._closing:
+                    conn.close()
+                    return
+                self._workers.append(thread)
+            thread.start()
+
+    def _next(self):
+        """ Waits for a task to hand out, or returns None when closing. """
+        with self._lock:
+            while not self._queue and not self._closing:
+                self._lock.wait()
+            if self._closing:
+                return None
+            index = self._queue.popleft()
+            return index, self._tasks[index]
+
+    def _serve(self, conn):
+        with conn:
+            while True:
+                task = self._next()
+                if task is None:
+                    try:
+                        conn.send(('stop',))
+                    except OSError:
+                        pass
+                    return
+                index, (func, args) = task
+                try:
+                    conn.send(('task', index, func, args))
+                    if self.timeout is not None and not conn.poll(self.timeout):
+                        raise TimeoutError
+                    kind, index, value = conn.recv()
+                except (EOFError, OSError):
+                    self._requeue(index)
+                    return
+                self._finish(index, kind, value)
+
+    def _requeue(self, index):
+        with self._lock:
+            if index in self._tasks and index not in self._results:
+                self.lost += 1
+                self._queue.appendleft(index)
+                self._lock.notify_all()
+
+    def _finish(self, index, kind, value):
+        with self._lock:
+            if index not in self._tasks or index in self._results:
+                return
+            if kind == 'error':
+                self._error = f"Task {index} failed: {value}"
+            else:
+                self._results[index] = value
+            self._lock.notify_all()
+
+
+def _address(text):
+    host, _, port = text.rpartition(":")
+    return host or "localhost", int(port)
+
+
+def main(argv=None):
+    """ Runs workers that connect to a coordinator.
+
+    The authkey is read from the COMBATSIM_AUTHKEY environment variable.
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m combatsim.distributed",
+        description="Run simulation workers for a coordinator."
+    )
+    parser.add_argument("address", type=_address, help="coordinator HOST:PORT")
+    parser.add_argument(
+        "-p", "--processes", type=int, default=1,
+        help="number of worker processes, 0 for one per CPU (default: 1)"
+    )
+    parser.add_argument(
+        "--wait", type=float, default=60,
+        help="seconds to wait for the coordinator to start (default: 60)"
+    )
+    args = parser.parse_args(argv)
+    authkey = os.environ.get("COMBATSIM_AUTHKEY")
+    if not authkey:
+        parser.error("COMBATSIM_AUTHKEY must be set")
+    authkey = authkey.encode("utf-8")
+
+    processes = args.processes or os.cpu_count() or 1
+    if processes == 1:
+        work(args.address, authkey, args.wait)
+        return 0
+    ctx = context()
+    workers = [
+        ctx.Process(target=work, args=(args.address, authkey, args.wait))
+        for _ in range(processes)
+    ]
+    for process in workers:
+        process.start()
+    for process in workers:
+        process.join()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
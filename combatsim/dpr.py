@@ -0,0 +1,193 @@
+""" Analytic damage per round.
+
+Working out the average damage of an attack by simulating it is slow and
+noisy. The functions here work it out exactly, following the same rules as
+`Weapon.attack_roll` and `Weapon.damage_roll`:
+
+* An attack hits when the d20 plus the weapon's attack bonus is at least the
+  target's AC. Advantage keeps the higher of two d20s and disadvantage the
+  lower, and having both cancels out.
+* A natural 20 that hits is a critical hit, which rolls the damage dice
+  twice. Like the simulator, a natural 20 doesn't hit automatically and a
+  natural 1 doesn't miss automatically.
+* Damage is the sum of the dice plus the weapon's damage bonus.
+
+::
+
+    longsword.dpr(15)
+    longsword.dpr_many(range(10, 21))
+    knight.dpr(goblin)  # Uses the goblin's AC and damage multipliers
+
+Results are cached by the stats of the weapon and the target's AC, so
+weapons shared by many creatures stamped from the same template are only
+worked out once. `expected_damage_many` works out many ACs at once with
+NumPy, which is an optional dependency installed with the `numpy` extra.
+"""
+
+from functools import lru_cache
+import math
+
+from combatsim.damage import NORMAL
+
+
+@lru_cache(maxsize=None)
+def d20_chances(advantage=False, disadvantage=False):
+    """ Chance of rolling each number on an attack's d20.
+
+    Returns:
+        tuple: 20 probabilities, where the first one is for a natural 1.
+    """
+    if advantage and disadvantage:
+        advantage = disadvantage = False
+    if advantage:
+        # P(max of two d20s = r) = (r^2 - (r - 1)^2) / 400
+        return tuple((2 * r - 1) / 400 for r in range(1, 21))
+    if disadvantage:
+        return tuple((41 - 2 * r) / 400 for r in range(1, 21))
+    return (1 / 20,) * 20
+
+
+@lru_cache(maxsize=4096)
+def hit_chance(attack_bonus, ac, advantage=False, disadvantage=False):
+    """ Chance that an attack hits, and that it is a critical hit.
+
+    Returns:
+        tuple: (chance to hit, chance to crit). Crits count as hits.
+    """
+    chances = d20_chances(advantage, disadvantage)
+    lowest = max(1, ac - attack_bonus)
+    if lowest > 20:
+        return 0.0, 0.0
+    return sum(chances[lowest - 1:]), chances[19]
+
+
+@lru_cache(maxsize=1024)
+def dice_distribution(groups, modifier=0):
+    """ Exact distribution of the total of some dice.
+
+    Args:
+        groups (tuple): (count, faces) pairs, as in `Dice.dice`.
+        modifier (int): Added to the total.
+
+    Returns:
+        tuple: (lowest total, probabilities of every total from the lowest
+        up to the highest)
+    """
+    probabilities = [1.0]
+    lowest = modifier
+    for count, faces in groups:
+        face = 1 / faces
+        for _ in range(count):
+            rolled = [0.0] * (len(probabilities) + faces - 1)
+            for total, chance in enumerate(probabilities):
+                chance *= face
+                for roll in range(faces):
+                    rolled[total + roll] += chance
+            probabilities = rolled
+            lowest += 1
+    return lowest, tuple(probabilities)
+
+
+def attack_profile(weapon):
+    """ Everything about a weapon that its damage per round depends on.
+
+    Returns:
+        tuple: (damage dice groups, modifier of each group, attack bonus,
+        damage bonus)
+    """
+    damage = weapon.damage
+    return (
+        tuple(tuple(group) for group in damage.dice),
+        sum(damage.modifiers),
+        weapon.attack_bonus,
+        weapon.damage_bonus,
+    )
+
+
+@lru_cache(maxsize=4096)
+def _expected(profile, ac, advantage, disadvantage):
+    groups, group_modifier, attack_bonus, damage_bonus = profile
+    hit, crit = hit_chance(attack_bonus, ac, advantage, disadvantage)
+    dice = sum(
+        count * (faces + 1) / 2 + group_modifier for count, faces in groups
+    )
+    return (
+        (hit - crit) * (dice + damage_bonus)
+        + crit * (2 * dice + damage_bonus)
+    )
+
+
+@lru_cache(maxsize=1024)
+def _distribution(profile, ac, advantage, disadvantage, multiplier):
+    groups, group_modifier, attack_bonus, damage_bonus = profile
+    hit, crit = hit_chance(attack_bonus, ac, advantage, disadvantage)
+    outcomes = {0: 1 - hit}
+    for chance, rolled in ((hit - crit, groups), (crit, groups * 2)):
+        if not chance:
+            continue
+        modifier = group_modifier * len(rolled) + damage_bonus
+        lowest, probabilities = dice_distribution(rolled, modifier)
+        for offset, probability in enumerate(probabilities):
+            damage = lowest + offset
+            if multiplier != NORMAL:
+                damage = math.floor(damage * multiplier)
+            outcomes[damage] = outcomes.get(damage, 0) + chance * probability
+    return outcomes
+
+
+def expected_damage(weapon, ac, advantage=False, disadvantage=False):
+    """ Average damage of one attack with `weapon` against `ac`. """
+    return _expected(attack_profile(weapon), ac, advantage, disadvantage)
+
+
+def profile_damage(profile, ac, advantage=False, disadvantage=False):
+    """ `expected_damage` of an `attack_profile`.
+
+    This skips looking up the weapon's bonuses, for callers that keep the
+    profiles of many weapons around.
+    """
+    return _expected(profile, ac, advantage, disadvantage)
+
+
+def damage_distribution(
+    weapon, ac, advantage=False, disadvantage=False, multiplier=NORMAL
+):
+    """ Exact distribution of the damage of one attack against `ac`.
+
+    Args:
+        multiplier (float): Damage multiplier of the target, such as
+            `combatsim.damage.RESISTANT`. Damage is rounded down after it is
+            multiplied, the same as in `Creature.take_damage`.
+
+    Returns:
+        dict: Chance of each amount of damage, where a miss does 0.
+    """
+    return dict(_distribution(
+        attack_profile(weapon), ac, advantage, disadvantage, multiplier
+    ))
+
+
+def expected_damage_many(weapon, acs, advantage=False, disadvantage=False):
+    """ Average damage of one attack against each of many ACs at once.
+
+    Args:
+        acs (array_like): ACs of any shape.
+
+    Returns:
+        numpy.ndarray: Float array with the same shape as `acs`.
+    """
+    import numpy
+
+    groups, group_modifier, attack_bonus, damage_bonus = attack_profile(weapon)
+    chances = numpy.array(d20_chances(advantage, disadvantage))
+    rolls = numpy.arange(1, 21) + attack_bonus
+    hits = rolls >= numpy.asarray(acs)[..., numpy.newaxis]
+    hit = hits @ chances
+    crit = hits[..., -1] * chances[-1]
+    dice = sum(
+        count * (faces + 1) / 2 + group_modifier for count, faces in groups
+    )
+    return (
+        (hit - crit) * (dice + damage_bonus)
+        + crit * (2 * dice + damage_bonus)
+    )
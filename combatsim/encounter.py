@@ -1,59 +1,345 @@
-from collections import defaultdict
+from collections import defaultdict, deque
+
+from combatsim.events import EventBus
+from combatsim.grid import Grid
+from combatsim.targeting import TargetIndex
+from combatsim.timing import END, START, EffectScheduler
+from combatsim.turns import TurnOrder, tiebreak
+
+
+class EncounterResult:
+    """ Outcome of a single encounter.
+
+    Attributes:
+        winner: The team left standing. This is None if every creature died,
+            or if the last creature standing does not belong to a team.
+        rounds (int): Number of combat rounds that were fought.
+        survivors (list): Creatures that are still alive at the end.
+        damage_dealt (dict): Total damage dealt, keyed by creature.
+        kills (dict): Number of creatures killed, keyed by creature.
+    """
+
+    def __init__(self, winner, rounds, survivors, damage_dealt, kills):
+        self.winner = winner
+        self.rounds = rounds
+        self.survivors = survivors
+        self.damage_dealt = damage_dealt
+        self.kills = kills
+
+    def __str__(self):
+        return (
+            f"EncounterResult(winner={self.winner}, rounds={self.rounds}, "
+            f"survivors={self.survivors})"
+        )
+
+    __repr__ = __str__
+
+
+class Opponents:
+    """ Reusable view of every creature in an encounter except one.
+
+    Each creature gets one of these when it joins an encounter, so tactics can
+    iterate over the other combatants every turn without a new list being
+    built for them.
+    """
+
+    def __init__(self, creatures, actor, encounter=None):
+        self.creatures = creatures
+        self.actor = actor
+        self.encounter = encounter
+
+    def __iter__(self):
+        actor = self.actor
+        for creature in self.creatures:
+            if creature is not actor:
+                yield creature
+
+    def weakest_enemy(self):
+        """ Living enemy of the actor with the lowest HP, or None.
+
+        This is a lookup in the encounter's `TargetIndex` rather than a scan
+        over every creature.
+        """
+        encounter = self.encounter
+        return encounter.targets.best_enemy(encounter._side(self.actor))
+
+
+class EncounterDefinition:
+    """ Recipe for building the same encounter over and over.
+
+    Simulations need a fresh set of creatures for every trial. A definition
+    keeps the templates and overrides for each combatant and builds a new
+    `Encounter` from them every time it is called::
+
+        duel = EncounterDefinition()
+        duel.add(Monster, knight, team=1)
+        duel.add(Monster, bandit, team=2)
+        result = duel().run()
+
+    Every combatant is compiled into a `combatsim.template.Template` the first
+    time the definition is called, so later encounters are stamped out from
+    precomputed stat blocks.
+
+    Attributes:
+        combatants (list): (class, template, overrides) tuples, where the
+            template and overrides are passed to `class.from_base`.
+        grid (tuple): (width, height) of a grid that is made for every
+            encounter, or None to fight without a grid. Combatants are placed
+            on it with a `pos` override.
+    """
+
+    def __init__(self, combatants=None, grid=None):
+        self.combatants = list(combatants or [])
+        self.grid = grid
+        self._templates = None
+
+    def add(self, cls, base, **overrides):
+        """ Adds a combatant built with `cls.from_base(base, **overrides)`. """
+        self.combatants.append((cls, base, overrides))
+        self._templates = None
+        return self
+
+    def compile(self):
+        """ Compiles the templates of every combatant if they aren't yet.
+
+        Returns:
+            list: The `Template` of each combatant.
+        """
+        if self._templates is None:
+            self._templates = [
+                cls.compile(base, **overrides)
+                for cls, base, overrides in self.combatants
+            ]
+        return self._templates
+
+    def __call__(self):
+        templates = self.compile()
+        if self.grid is None:
+            return Encounter([t.stamp() for t in templates])
+        grid = Grid(*self.grid)
+        return Encounter([t.stamp(grid=grid) for t in templates])
 
-from combatsim.tactics import Healer
-from combatsim.event import EventLog
 
 class Encounter:
+    """ Runs combat between a group of creatures.
+
+    The encounter keeps a count of living creatures on each side. Creatures
+    without a team are each considered to be their own side. These counts are
+    updated by the creatures themselves as they die or are revived, which
+    means checking whether the encounter is over does not require looking at
+    every creature.
+
+    Attributes:
+        creatures (list): All creatures taking part in the encounter.
+        combat_round (int): The current round of combat.
+        alive (dict): Number of living creatures on each side.
+        damage_dealt (dict): Total damage dealt, keyed by creature.
+        kills (dict): Number of creatures killed, keyed by creature.
+        events (EventBus): Dispatches events that happen to the creatures.
+        timing (EffectScheduler): Ends effects at the start or end of turns.
+        turns (TurnOrder): Living creatures in initiative order.
+        slots (dict): Position of each creature in the initiative order.
+        targets (TargetIndex): Living creatures of each side ordered by HP.
+    """
 
     def __init__(self, creatures):
-        self.creatures = creatures
+        self.creatures = []
         self.combat_round = 0
+        self.timing = EffectScheduler()
+        self.events = EventBus(self.timing)
+        self.turns = TurnOrder()
+        self.slots = self.turns.slots
+        self.reactions = deque()
+        self.targets = TargetIndex()
+        self.alive = defaultdict(int)
+        self.damage_dealt = defaultdict(int)
+        self.kills = defaultdict(int)
+        self._sides = 0
+        self._opponents = {}
+        for creature in creatures:
+            self.add(creature)
 
-    def run(self):
-        print("==== Combatants ====")
-        event_log = EventLog.get_log()
-        event_log.encounter = self
-        for creature in self.creatures:
-            print(f"{creature}: {creature.hp}")
+    def add(self, creature):
+        """ Adds a creature to this encounter. """
+        self.creatures.append(creature)
+        self._opponents[creature] = Opponents(self.creatures, creature, self)
+        self.targets.add(creature, self._side(creature))
+        creature.encounter = self
+        if creature.is_alive():
+            self.creature_revived(creature)
+            if self.combat_round > 0:
+                # Creatures summoned during combat roll their own initiative
+                self.turns.add(creature, creature.initiative.roll()[0])
+
+    def run(self, reporter=None):
+        """ Runs the encounter until only one side is left standing.
+
+        By default the encounter runs headless. Pass in a reporter (such as
+        `combatsim.report.ConsoleReporter`) to display what happened.
+
+        Args:
+            reporter: Object with `start(encounter)` and
+                `end(encounter, result)` methods.
+
+        Returns:
+            EncounterResult: The outcome of the encounter.
+        """
+        if reporter:
+            reporter.start(self)
+
+        for init, creature in self.roll_initiative():
+            self.turns.add(creature, init)
+            if not creature.is_alive():
+                self.turns.remove(creature)
+        self.slots = self.turns.slots
 
-        print("\n==== BEGIN ENCOUNTER ====")
-        initiative = self.roll_initiative()
         while not self.encounter_over():
             self.combat_round += 1
-            for init, creature in initiative:
-                if creature.hp > 0:
-                    creature.tactics.act(
-                        [c for c in self.creatures if c != creature]
-                    )
-        print(event_log)
-
-        print("\n==== END ENCOUNTER ====")
-        for creature in self.creatures:
-            print(f"\t{creature}: {creature.hp}")
+            self.events.start_round(self.combat_round)
+            for turn in self.turns:
+                creature = turn.creature
+                self.timing.advance(self.combat_round, turn.slot, START)
+                if creature.is_alive():
+                    creature.tactics.act(self._opponents[creature])
+                    self.take_reactions()
+                self.timing.advance(self.combat_round, turn.slot, END)
+                if self.encounter_over():
+                    break
+
+        result = self.result()
+        if reporter:
+            reporter.end(self, result)
+        return result
+
+    def result(self):
+        """ Summarizes the current state of the encounter.
+
+        Returns:
+            EncounterResult: The outcome of the encounter so far.
+        """
+        survivors = [c for c in self.creatures if c.is_alive()]
+        winner = None
+        if survivors and self.encounter_over():
+            winner = survivors[0].team
+        return EncounterResult(
+            winner,
+            self.combat_round,
+            survivors,
+            dict(self.damage_dealt),
+            dict(self.kills)
+        )
 
     def encounter_over(self):
         """ Returns true if all creatures on all but one team are dead. """
-        teams = defaultdict(int)
-        for creature in self.creatures:
-            if not creature.is_alive():
-                continue
-            teams[creature.team] += 1
-        return len(teams) <= 1 and teams[None] <= 1
+        return self._sides <= 1
+
+    def creature_died(self, creature):
+        """ Called by a creature when it drops to 0 HP. """
+        side = self._side(creature)
+        self.alive[side] -= 1
+        if self.alive[side] == 0:
+            self._sides -= 1
+        self.turns.remove(creature)
+
+    def creature_revived(self, creature):
+        """ Called by a creature when it goes from 0 HP back above 0 HP. """
+        side = self._side(creature)
+        if self.alive[side] == 0:
+            self._sides += 1
+        self.alive[side] += 1
+        self.turns.restore(creature)
+
+    def ready(self, creature, kind, action, trigger=None):
+        """ Readies an action that is taken as a reaction to an event.
+
+        The first time a `kind` event happens to `trigger`, or to any
+        creature if `trigger` is None, `action` is called with that creature
+        and the event data. Reactions are taken once the action that caused
+        them is over, before the next creature's turn. A readied action that
+        hasn't been triggered is lost at the start of the creature's next
+        turn.
+
+        Returns:
+            Subscription: Can be cancelled to drop the readied action.
+        """
+        def triggered(target, **data):
+            self.reactions.append((creature, action, target, data))
+
+        subscription = self.events.subscribe(kind, trigger, triggered, once=True)
+        self.timing.schedule(
+            self.next_turn(creature, START), subscription.cancel
+        )
+        return subscription
+
+    def take_reactions(self):
+        """ Takes every reaction that has been triggered so far. """
+        while self.reactions:
+            creature, action, target, data = self.reactions.popleft()
+            if creature.is_alive():
+                action(target, **data)
+
+    def hp_changed(self, creature):
+        """ Called by a creature when it takes damage or is healed. """
+        self.targets.update(creature)
+
+    def next_turn(self, creature, phase=END, turns=1):
+        """ Point in time of the start or end of one of a creature's turns.
+
+        This is used for effects that last "until the end of your next turn"
+        and similar. Creatures that haven't been placed in the initiative
+        order yet are treated as acting first.
+
+        Args:
+            creature (Creature): The creature whose turn it is.
+            phase (int): `combatsim.timing.START` or `END` of the turn.
+            turns (int): 1 for the creature's next turn, 2 for the turn after
+                that, and so on.
+
+        Returns:
+            tuple: (round, slot, phase) for use with `self.timing`.
+        """
+        slot = self.slots.get(creature, 0)
+        round_, slot, phase = self.timing.next_turn(
+            self.combat_round, slot, phase
+        )
+        return (round_ + turns - 1, slot, phase)
+
+    def record_damage(self, source, target, amount):
+        """ Records damage dealt by `source` to `target`.
+
+        Args:
+            source (Creature): The creature that dealt the damage.
+            target (Creature): The creature that took the damage.
+            amount (int): Damage actually taken by the target.
+        """
+        self.damage_dealt[source] += amount
+        if amount > 0 and not target.is_alive():
+            self.kills[source] += 1
 
     def roll_initiative(self):
         """ Rolls initiative for all creatures in the encounter.
 
         Returns:
-            list: All creatures sorted in initiative order where the creature
-            with the highest initiative roll is at index 0.
+            list: (initiative, creature) for all creatures sorted in
+            initiative order, where the creature with the highest initiative
+            roll is at index 0. Ties go to the creature with the higher
+            dexterity.
         """
         initiative = [(c.initiative.roll()[0], c) for c in self.creatures]
-        initiative.sort(key=lambda x: x[0], reverse=True)
+        initiative.sort(key=lambda x: (x[0], tiebreak(x[1])), reverse=True)
         return initiative
 
+    @staticmethod
+    def _side(creature):
+        """ Team of the creature, or the creature itself if it has no team. """
+        if creature.team is None:
+            return creature
+        return creature.team
+
 
 if __name__ == "__main__":
     from combatsim.creature import Monster
+    from combatsim.report import ConsoleReporter
     from combatsim.sample_creatures import simple_cleric, commoner, knight, mage
     e = Encounter([
         Monster.from_base(simple_cleric, level=5, team=1),
@@ -62,4 +348,4 @@ if __name__ == "__main__":
         Monster.from_base(knight, level=12, team=2, strength=18),
         Monster.from_base(mage, level=2, team=2)
     ])
-    e.run()
+    e.run(ConsoleReporter())
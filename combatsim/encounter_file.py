@@ -0,0 +1,406 @@
+""" Declarative encounter files.
+
+Encounters can be written as JSON or YAML files instead of Python code::
+
+    {
+        "name": "Ambush",
+        "grid": [20, 20],
+        "weapons": {
+            "shortbow": {"damage": "1d6", "type": "piercing", "melee": false}
+        },
+        "combatants": [
+            {"template": "knight", "class": "character", "team": 1,
+             "pos": [0, 0]},
+            {"template": "mage", "team": 1, "spells": ["acid_splash"]},
+            {"template": "bandit", "team": 2, "count": 3,
+             "weapons": ["shortbow"], "armor": {"base_ac": 12}}
+        ]
+    }
+
+Templates are looked up in `combatsim.monster_manual` and
+`combatsim.sample_creatures`, spells in `combatsim.spells` and
+`combatsim.cantrips`, and tactics in `combatsim.tactics`. Only names those
+modules define are found, not names they import. Weapons and armor
+are either written out in full or refer to an entry in the file's own
+`weapons` and `armor` sections. Any other combatant key overrides the same
+key of the template.
+
+Files are checked against a schema before anything is built, and every
+problem is reported with its location in the file. A loaded file is an
+`EncounterDefinition`, so its templates are compiled the first time an
+encounter is built. It pickles as the file's data rather than as compiled
+templates, which keeps it small when it is sent to worker processes.
+
+YAML files need PyYAML, which is installed with the `yaml` extra.
+"""
+
+import importlib
+import json
+import os
+import types
+
+from combatsim.creature import Character, Monster
+from combatsim.dice import Dice
+from combatsim.encounter import EncounterDefinition
+from combatsim.items import Armor, Weapon
+from combatsim.spells import Spell
+from combatsim.tactics import BaseTactics
+
+CLASSES = {'monster': Monster, 'character': Character}
+
+ABILITIES = (
+    'strength', 'dexterity', 'constitution', 'intelligence', 'wisdom',
+    'charisma'
+)
+
+_TEMPLATE_MODULES = ('combatsim.monster_manual', 'combatsim.sample_creatures')
+_SPELL_MODULES = ('combatsim.spells', 'combatsim.cantrips')
+
+_INT = (int,)
+_TEAM = (int, str)
+_STR = (str,)
+
+# Combatant keys that are passed to the creature as they are.
+_SCALARS = {
+    'name': _STR, 'level': _INT, 'xp': _INT, 'proficiency': _INT,
+    'max_hp': _INT, 'hp': _INT, 'ac': _INT, 'team': _TEAM, 'cr': _STR,
+    'type': _STR,
+}
+_SCALARS.update({ability: _INT for ability in ABILITIES})
+
+_STRING_LISTS = ('resistances', 'vulnerabilities', 'immunities', 'conditions')
+
+_WEAPON_FIELDS = {
+    'name': _STR, 'damage': _STR, 'type': _STR, 'melee': (bool,),
+    'attack_mod': _INT, 'damage_mod': _INT,
+}
+_ARMOR_FIELDS = {'name': _STR, 'base_ac': _INT, 'max_dex': _INT}
+
+
+class EncounterFileError(ValueError):
+    """ An encounter file doesn't match the schema. """
+
+
+def _check(condition, where, message):
+    if not condition:
+        raise EncounterFileError(f"{where}: {message}")
+
+
+def _check_type(value, types, where):
+    # bool is a subclass of int, but True is never meant as a number
+    valid = isinstance(value, types) and not (
+        isinstance(value, bool) and bool not in types
+    )
+    names = " or ".join(t.__name__ for t in types)
+    _check(valid, where, f"expected {names}, got {value!r}")
+
+
+def _check_fields(data, fields, where, required=()):
+    _check(isinstance(data, dict), where, f"expected an object, got {data!r}")
+    for key in required:
+        _check(key in data, where, f"missing '{key}'")
+    for key, value in data.items():
+        _check(key in fields, where, f"unknown key '{key}'")
+        _check_type(value, fields[key], f"{where}.{key}")
+
+
+def _check_dice(value, where):
+    _check_type(value, _STR, where)
+    try:
+        Dice(value)
+    except Exception as error:
+        raise EncounterFileError(f"{where}: {error}") from None
+
+
+def _lookup(modules, name):
+    """ Finds a name defined in one of `modules`, skipping what they import.
+    """
+    if name.startswith('_'):
+        return None
+    for module in modules:
+        value = vars(importlib.import_module(module)).get(name)
+        if value is None or isinstance(value, types.ModuleType):
+            continue
+        if isinstance(value, (type, types.FunctionType)) and \
+                value.__module__ != module:
+            continue
+        return value
+    return None
+
+
+def _is_tactics(value):
+    return (
+        isinstance(value, type) and issubclass(value, BaseTactics)
+        and callable(getattr(value, 'act', None))
+    )
+
+
+def _check_item(item, fields, section, named, where, required=()):
+    if isinstance(item, str):
+        _check(item in named, where, f"no {section} named '{item}'")
+    else:
+        _check_fields(item, fields, where, required)
+
+
+def validate(data):
+    """ Checks that `data` is a valid encounter.
+
+    Raises:
+        EncounterFileError: Describes the first problem that was found.
+    """
+    _check(isinstance(data, dict), "encounter", "expected an object")
+    known = {
+        'version', 'name', 'grid', 'trials', 'seed', 'weapons', 'armor',
+        'combatants'
+    }
+    for key in data:
+        _check(key in known, "encounter", f"unknown key '{key}'")
+    _check(data.get('version', 1) == 1, "version", "only version 1 is known")
+    if 'name' in data:
+        _check_type(data['name'], _STR, "name")
+    for key in ('trials', 'seed'):
+        if key in data:
+            _check_type(data[key], _INT, key)
+    if data.get('grid') is not None:
+        grid = data['grid']
+        _check(
+            isinstance(grid, list) and len(grid) == 2, "grid",
+            "expected [width, height]"
+        )
+        for i, size in enumerate(grid):
+            _check_type(size, _INT, f"grid[{i}]")
+            _check(size > 0, f"grid[{i}]", "must be positive")
+
+    weapons = data.get('weapons', {})
+    _check(isinstance(weapons, dict), "weapons", "expected an object")
+    for name, weapon in weapons.items():
+        where = f"weapons.{name}"
+        _check_fields(weapon, _WEAPON_FIELDS, where, ('damage', 'type'))
+        _check_dice(weapon['damage'], f"{where}.damage")
+    armor = data.get('armor', {})
+    _check(isinstance(armor, dict), "armor", "expected an object")
+    for name, piece in armor.items():
+        _check_fields(piece, _ARMOR_FIELDS, f"armor.{name}", ('base_ac',))
+
+    combatants = data.get('combatants')
+    _check(
+        isinstance(combatants, list) and combatants, "combatants",
+        "expected a list with at least one combatant"
+    )
+    for i, combatant in enumerate(combatants):
+        _validate_combatant(
+            combatant, weapons, armor, data.get('grid'), f"combatants[{i}]"
+        )
+
+
+def _validate_combatant(combatant, weapons, armor, grid, where):
+    _check(
+        isinstance(combatant, dict), where,
+        f"expected an object, got {combatant!r}"
+    )
+    for key, value in combatant.items():
+        at = f"{where}.{key}"
+        if key in _SCALARS:
+            _check_type(value, _SCALARS[key], at)
+        elif key == 'template':
+            _check_type(value, _STR, at)
+            _check(
+                isinstance(_lookup(_TEMPLATE_MODULES, value), dict), at,
+                f"unknown template '{value}'"
+            )
+        elif key == 'class':
+            _check(value in CLASSES, at, f"unknown creature class '{value}'")
+        elif key == 'count':
+            _check_type(value, _INT, at)
+            _check(value > 0, at, "must be positive")
+        elif key == 'hd':
+            _check_dice(value, at)
+        elif key == 'spellcasting':
+            _check(value in ABILITIES, at, f"unknown ability '{value}'")
+        elif key == 'pos':
+            _check(
+                isinstance(value, list) and len(value) == 2, at,
+                "expected [x, y]"
+            )
+            _check(grid is not None, at, "needs a grid")
+            for n, coordinate in enumerate(value):
+                _check_type(coordinate, _INT, f"{at}[{n}]")
+                _check(
+                    0 <= coordinate < grid[n], f"{at}[{n}]",
+                    f"not within [0, {grid[n]})"
+                )
+        elif key == 'tactics':
+            _check_type(value, _STR, at)
+            _check(
+                _is_tactics(_lookup(('combatsim.tactics',), value)), at,
+                f"unknown tactics '{value}'"
+            )
+        elif key == 'spells':
+            _check(isinstance(value, list), at, "expected a list")
+            for n, name in enumerate(value):
+                _check_type(name, _STR, f"{at}[{n}]")
+                _check(
+                    isinstance(_lookup(_SPELL_MODULES, name), Spell),
+                    f"{at}[{n}]", f"unknown spell '{name}'"
+                )
+        elif key == 'spell_slots':
+            _check(isinstance(value, list), at, "expected a list")
+            for n, slots in enumerate(value):
+                _check_type(slots, _INT, f"{at}[{n}]")
+        elif key in _STRING_LISTS:
+            _check(isinstance(value, list), at, "expected a list")
+            for n, name in enumerate(value):
+                _check_type(name, _STR, f"{at}[{n}]")
+        elif key == 'weapons':
+            _check(isinstance(value, list), at, "expected a list")
+            for n, weapon in enumerate(value):
+                _check_item(
+                    weapon, _WEAPON_FIELDS, "weapon", weapons, f"{at}[{n}]",
+                    ('damage', 'type')
+                )
+                if isinstance(weapon, dict):
+                    _check_dice(weapon['damage'], f"{at}[{n}].damage")
+        elif key == 'armor':
+            _check_item(value, _ARMOR_FIELDS, "armor", armor, at, ('base_ac',))
+        else:
+            _check(False, where, f"unknown key '{key}'")
+
+
+def _weapon(data, named):
+    name = "Weapon"
+    if isinstance(data, str):
+        name, data = data, named[data]
+    return Weapon(
+        data.get('name', name),
+        Dice(data['damage']),
+        data['type'],
+        melee=data.get('melee', True),
+        attack_mod=data.get('attack_mod'),
+        damage_mod=data.get('damage_mod')
+    )
+
+
+def _armor(data, named):
+    name = "Armor"
+    if isinstance(data, str):
+        name, data = data, named[data]
+    return Armor(data.get('name', name), data['base_ac'], data.get('max_dex'))
+
+
+def _combatant(data, weapons, armor):
+    """ Turns a combatant from a file into (class, base, overrides, count). """
+    options = dict(data)
+    base = {}
+    if 'template' in options:
+        base = _lookup(_TEMPLATE_MODULES, options.pop('template'))
+    cls = CLASSES[options.pop('class', 'monster')]
+    count = options.pop('count', 1)
+
+    overrides = {}
+    for key, value in options.items():
+        if key == 'hd':
+            value = Dice(value)
+        elif key == 'pos':
+            value = tuple(value)
+        elif key == 'tactics':
+            value = _lookup(('combatsim.tactics',), value)
+        elif key == 'spells':
+            value = [_lookup(_SPELL_MODULES, name) for name in value]
+        elif key == 'weapons':
+            value = [_weapon(weapon, weapons) for weapon in value]
+        elif key == 'armor':
+            value = _armor(value, armor)
+        elif isinstance(value, list):
+            value = list(value)
+        overrides[key] = value
+    return cls, base, overrides, count
+
+
+class EncounterFile(EncounterDefinition):
+    """ Encounter definition built from the data of an encounter file.
+
+    Args:
+        data (dict): Parsed contents of the file.
+
+    Attributes:
+        data (dict): The data the definition was built from.
+        name (str): Name of the encounter, if the file has one.
+        trials (int): Suggested number of trials, or None.
+        seed (int): Suggested seed, or None.
+    """
+
+    def __init__(self, data):
+        validate(data)
+        grid = data.get('grid')
+        super().__init__(grid=tuple(grid) if grid else None)
+        self.data = data
+        self.name = data.get('name')
+        self.trials = data.get('trials')
+        self.seed = data.get('seed')
+
+        weapons = data.get('weapons', {})
+        armor = data.get('armor', {})
+        for combatant in data['combatants']:
+            cls, base, overrides, count = _combatant(combatant, weapons, armor)
+            for _ in range(count):
+                self.add(cls, base, **overrides)
+
+    def __reduce__(self):
+        return (EncounterFile, (self.data,))
+
+
+def parse(text, format="json"):
+    """ Parses and validates the text of an encounter file.
+
+    Args:
+        text (str): Contents of the file.
+        format (str): "json" or "yaml".
+
+    Returns:
+        EncounterFile: The encounter.
+    """
+    if format == "json":
+        try:
+            data = json.loads(text)
+        except ValueError as error:
+            raise EncounterFileError(f"invalid JSON: {error}") from None
+    elif format == "yaml":
+        try:
+            import yaml
+        except ImportError:
+            raise EncounterFileError(
+                "PyYAML is needed to read YAML encounter files"
+            ) from None
+        try:
+            data = yaml.safe_load(text)
+        except yaml.YAMLError as error:
+            raise EncounterFileError(f"invalid YAML: {error}") from None
+    else:
+        raise ValueError(f"Unknown encounter file format: {format}")
+    return EncounterFile(data)
+
+
+_loaded = {}
+
+
+def load(path):
+    """ Loads an encounter file, picking the format from its extension.
+
+    Files are only read and compiled once. Loading a file again returns the
+    same definition unless the file has changed.
+
+    Returns:
+        EncounterFile: The encounter.
+    """
+    stat = os.stat(path)
+    key = os.path.abspath(path)
+    cached = _loaded.get(key)
+    if cached is not None and cached[0] == (stat.st_mtime_ns, stat.st_size):
+        return cached[1]
+
+    extension = os.path.splitext(path)[1].lower()
+    format = "yaml" if extension in (".yaml", ".yml") else "json"
+    with open(path) as f:
+        definition = parse(f.read(), format)
+    _loaded[key] = ((stat.st_mtime_ns, stat.st_size), definition)
+    return definition
@@ -1,2 +1,130 @@
+""" Kinds of events and the bus that dispatches them.
+
+Spell effects and tactics can subscribe to events that happen to a specific
+creature. For example, Booming Blade subscribes to `WILLING_MOVEMENT` on its
+target, and only that subscription is looked at when the target moves.
+"""
+
+from combatsim.timing import START, EffectScheduler
+
 WILLING_MOVEMENT = "WillingMovement"  # Creature moves willingly
 FORCED_MOVEMENT = "ForcedMovement"  # Creature is forced to move
+DAMAGE_TAKEN = "DamageTaken"  # Creature takes damage
+
+
+class Subscription:
+    """ A handler subscribed to one kind of event.
+
+    Attributes:
+        kind (str): Kind of event, such as `WILLING_MOVEMENT`.
+        creature (Creature): Creature whose events are handled, or None for
+            events of every creature.
+        handler (callable): Called with the creature and the event data as
+            keyword arguments.
+        expires (int): Round at whose start the subscription ends, or None if
+            it lasts until it is cancelled.
+        once (bool): If true, the subscription ends after its first event.
+        active (bool): False once the subscription has ended.
+        timer (Timer): Ends the subscription when it expires, or None.
+    """
+
+    def __init__(self, bus, kind, creature, handler, expires=None, once=False):
+        self.bus = bus
+        self.kind = kind
+        self.creature = creature
+        self.handler = handler
+        self.expires = expires
+        self.once = once
+        self.active = True
+        self.timer = None
+
+    def cancel(self):
+        """ Ends the subscription. Cancelling twice does nothing. """
+        if self.active:
+            self.active = False
+            if self.timer is not None:
+                self.timer.cancel()
+            self.bus._remove(self)
+
+
+class EventBus:
+    """ Dispatches events to the handlers subscribed to them.
+
+    Subscriptions are indexed by kind of event and by creature, so emitting an
+    event only visits the handlers for that kind of event on that creature,
+    plus any handlers for that kind on every creature. Subscriptions with a
+    duration are ended by a timer on an `EffectScheduler`, so expiring them
+    only visits the subscriptions that are actually ending.
+
+    Attributes:
+        round (int): The current combat round.
+        timing (EffectScheduler): Scheduler that ends subscriptions with a
+            duration. An encounter shares its own scheduler with its bus.
+    """
+
+    def __init__(self, timing=None):
+        self.round = 0
+        self.timing = EffectScheduler() if timing is None else timing
+        self._subscriptions = {}
+
+    def subscribe(self, kind, creature, handler, duration=None, once=False):
+        """ Subscribes a handler to events of one kind.
+
+        Args:
+            kind (str): Kind of event, such as `WILLING_MOVEMENT`.
+            creature (Creature): Only handle events of this creature. None
+                handles events of every creature.
+            handler (callable): Called as `handler(creature, **data)`.
+            duration (int): Number of rounds the subscription lasts. It ends
+                at the start of round `round + duration`. None lasts until
+                the subscription is cancelled.
+            once (bool): End the subscription after its first event.
+
+        Returns:
+            Subscription: Can be used to cancel the subscription.
+        """
+        expires = None if duration is None else self.round + duration
+        subscription = Subscription(
+            self, kind, creature, handler, expires=expires, once=once
+        )
+        key = (kind, creature)
+        if key not in self._subscriptions:
+            self._subscriptions[key] = {}
+        self._subscriptions[key][subscription] = None
+        if expires is not None:
+            subscription.timer = self.timing.schedule(
+                (expires, 0, START), subscription.cancel
+            )
+        return subscription
+
+    def subscribers(self, kind, creature):
+        """ Number of active subscriptions that would see an event. """
+        return (
+            len(self._subscriptions.get((kind, creature), ())) +
+            len(self._subscriptions.get((kind, None), ()))
+        )
+
+    def emit(self, kind, creature, **data):
+        """ Calls every handler subscribed to this event. """
+        for key in ((kind, creature), (kind, None)):
+            subscriptions = self._subscriptions.get(key)
+            if not subscriptions:
+                continue
+            for subscription in list(subscriptions):
+                if not subscription.active:
+                    continue
+                if subscription.once:
+                    subscription.cancel()
+                subscription.handler(creature, **data)
+
+    def start_round(self, round_):
+        """ Moves to a new round, ending subscriptions that expire in it. """
+        self.round = round_
+        self.timing.advance(round_, 0, START)
+
+    def _remove(self, subscription):
+        key = (subscription.kind, subscription.creature)
+        subscriptions = self._subscriptions[key]
+        del subscriptions[subscription]
+        if not subscriptions:
+            del self._subscriptions[key]
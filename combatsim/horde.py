@@ -0,0 +1,352 @@
+""" Vectorized hordes of identical creatures.
+
+Simulating a thousand bandits one creature at a time spends nearly all of its
+time in Python: every bandit rolls its own d20, looks for its own target and
+applies its own damage. A `Horde` keeps the hit points of all of its members
+in a NumPy array and resolves a whole round of their attacks at once::
+
+    bandits = Horde(Monster.compile(bandit), 1000, team=2)
+    encounter = Encounter(party + [bandits])
+
+To the rest of the simulator a horde is a single combatant. It rolls one
+initiative for the whole group, and anything that attacks the horde hits the
+member with the fewest hit points. On the horde's turn every living member
+attacks with its first weapon. All of the d20s and damage dice are rolled in
+one batch, and the damage is scattered onto the enemies with array
+operations.
+
+NumPy is an optional dependency, installed with the `numpy` extra.
+"""
+
+import math
+import random
+
+import numpy
+
+from combatsim.creature import Creature
+from combatsim.damage import NORMAL, damage_type_id
+from combatsim.dice import Dice
+from combatsim.event import EventLog
+from combatsim.events import DAMAGE_TAKEN
+from combatsim.tactics import BaseTactics
+
+# Ways a horde can spread its attacks over its enemies.
+WEAKEST = "weakest"
+RANDOM = "random"
+
+
+def roll_dice(rng, dice, count):
+    """ Rolls `dice` `count` times with a NumPy random generator.
+
+    Returns:
+        numpy.ndarray: `count` totals, each rolled like `sum(dice.roll())`.
+    """
+    modifier = sum(dice.modifiers)
+    totals = numpy.full(count, modifier * len(dice.dice), dtype=numpy.int64)
+    for num, faces in dice.dice:
+        totals += rng.integers(1, faces + 1, size=(count, num)).sum(axis=1)
+    return totals
+
+
+def _roll_hp(template, count, rng):
+    """ Rolls the max HP of every member of a horde. """
+    if template.max_hp is not None:
+        return numpy.full(count, template.max_hp, dtype=numpy.int64)
+
+    prototype = template.prototype
+    if type(prototype)._calc_hp is not Creature._calc_hp:
+        # Characters and other creatures with their own rules for hit points
+        # are rolled one at a time.
+        return numpy.array(
+            [prototype._calc_hp() for _ in range(count)], dtype=numpy.int64
+        )
+
+    dice = (prototype.hd + prototype.constitution) * prototype.level
+    return numpy.maximum(roll_dice(rng, dice, count), 1)
+
+
+class HordeTactics(BaseTactics):
+    """ Every living member of the horde attacks its enemies. """
+
+    def act(self, creatures):
+        self.actor.attack_round(self.enemies(creatures))
+
+
+class Horde:
+    """ Many identical creatures that act together.
+
+    Args:
+        template (Template): Compiled creature every member is made from.
+        count (int): Number of members.
+        team: Team of the horde.
+        name (str): Name of the horde. Defaults to the template's name and
+            the number of members.
+        targeting (str): `WEAKEST` to focus every attack on the enemy with
+            the fewest hit points, the same as `TargetWeakest`, or `RANDOM`
+            to pick a random living enemy for every attack.
+        seed (int): Seed of the horde's random generator. By default it is
+            seeded from `random`, so seeded simulations stay reproducible.
+
+    Attributes:
+        hps (numpy.ndarray): Current HP of each member.
+        max_hps (numpy.ndarray): Max HP of each member.
+        alive (int): Number of living members.
+    """
+
+    def __init__(
+        self, template, count, team=None, name=None, targeting=WEAKEST,
+        seed=None
+    ):
+        if targeting not in (WEAKEST, RANDOM):
+            raise ValueError(f"Unknown targeting: {targeting}")
+
+        if seed is None:
+            seed = random.getrandbits(64)
+        self.rng = numpy.random.default_rng(seed)
+
+        self.template = template
+        self.name = name or f"{template.name} x{count}"
+        self.team = team
+        self.targeting = targeting
+        self.encounter = None
+        self.ac = template.ac
+        self.initiative = template.prototype.initiative
+        self.dexterity = template.prototype.dexterity
+        self.damage_multipliers = list(template._damage_multipliers)
+        self.tactics = HordeTactics(self)
+        self.x, self.y = None, None
+
+        self.max_hps = _roll_hp(template, count, self.rng)
+        self.hps = self.max_hps.copy()
+        self.alive = count
+
+    def __str__(self):
+        return self.name
+
+    __repr__ = __str__
+
+    def __len__(self):
+        return len(self.hps)
+
+    @property
+    def hp(self):
+        """ HP of the weakest living member, which is the one attacks hit. """
+        weakest = self._weakest()
+        return 0 if weakest is None else int(self.hps[weakest])
+
+    @property
+    def max_hp(self):
+        """ Max HP of the weakest living member. """
+        weakest = self._weakest()
+        return 0 if weakest is None else int(self.max_hps[weakest])
+
+    @property
+    def total_hp(self):
+        """ HP of all members added together. """
+        return int(self.hps.sum())
+
+    def is_alive(self):
+        return self.alive > 0
+
+    def save_bonus(self, attribute):
+        return self.template.saves[attribute]
+
+    def saving_throw(self, attribute, dc):
+        """ Rolls a saving throw for the weakest living member. """
+        return Dice("1d20").roll()[0] + self.save_bonus(attribute) >= dc
+
+    def take_damage(self, value, type_=None):
+        """ Damages the weakest living member of the horde.
+
+        Returns:
+            int: The damage taken after resistances.
+        """
+        weakest = self._weakest()
+        if weakest is None:
+            return 0
+
+        multiplier = self._multiplier(damage_type_id(type_))
+        if multiplier != NORMAL:
+            value = math.floor(value * multiplier)
+
+        taken = numpy.zeros(len(self.hps), dtype=numpy.int64)
+        taken[weakest] = value
+        return self._apply_damage(taken, type_)
+
+    def heal(self, value):
+        """ Heals the weakest living member of the horde. """
+        weakest = self._weakest()
+        if weakest is None:
+            return 0
+
+        add = min(int(self.max_hps[weakest] - self.hps[weakest]), value)
+        self.hps[weakest] += add
+        if self.encounter is not None:
+            self.encounter.hp_changed(self)
+        return add
+
+    def dealt_damage(self, target, value):
+        """ Records damage this horde dealt in its current encounter. """
+        if self.encounter is not None:
+            self.encounter.record_damage(self, target, value)
+
+    def attack_round(self, enemies):
+        """ Every living member attacks with its first weapon.
+
+        Members attack one after another, so with `WEAKEST` targeting an
+        enemy takes attacks until it drops and the rest go to the next
+        weakest enemy. Damage to creatures outside of a horde is applied as
+        a single hit of untyped damage, after their resistances.
+
+        Args:
+            enemies (list): Creatures and hordes the members can attack.
+
+        Returns:
+            int: The total damage dealt.
+        """
+        enemies = [e for e in enemies if e.is_alive()]
+        if not enemies or not self.alive or not self.template.attacks:
+            return 0
+
+        name, attack_bonus, dice, damage_bonus, type_ = self.template.attacks[0]
+        count = self.alive
+        rolls = self.rng.integers(1, 21, size=count)
+        totals = rolls + attack_bonus
+        damage = roll_dice(self.rng, dice, count) + damage_bonus
+        crits = rolls == 20
+        # A critical hit rolls the damage dice twice
+        damage[crits] += roll_dice(self.rng, dice, int(crits.sum()))
+
+        hp, ac, multipliers, segments = self._targets(enemies, type_)
+        if self.targeting == WEAKEST:
+            taken = _focus_fire(totals, damage, hp, ac, multipliers)
+        else:
+            taken = _scatter(self.rng, totals, damage, hp, ac, multipliers)
+
+        total = 0
+        for enemy, start, stop in segments:
+            if isinstance(enemy, Horde):
+                dealt = enemy._apply_damage(taken[start:stop], type_)
+            elif taken[start]:
+                dealt = enemy.take_damage(int(taken[start]))
+            else:
+                continue
+            self.dealt_damage(enemy, dealt)
+            total += dealt
+
+        EventLog.log(
+            f"{self} attack with {name} and deal {total} damage"
+        )
+        return total
+
+    def _weakest(self):
+        """ Index of the living member with the fewest HP, or None. """
+        if not self.alive:
+            return None
+        living = numpy.where(self.hps > 0, self.hps, numpy.iinfo(numpy.int64).max)
+        return int(living.argmin())
+
+    def _multiplier(self, type_id):
+        if type_id < len(self.damage_multipliers):
+            return self.damage_multipliers[type_id]
+        return NORMAL
+
+    def _apply_damage(self, taken, type_=None):
+        """ Subtracts damage from each member.
+
+        Args:
+            taken (numpy.ndarray): Damage to each member, after resistances.
+
+        Returns:
+            int: Damage actually taken, not counting damage past 0 HP.
+        """
+        actual = int(numpy.minimum(taken, self.hps).sum())
+        was_alive = self.alive > 0
+        self.hps -= taken
+        numpy.maximum(self.hps, 0, out=self.hps)
+        self.alive = int(numpy.count_nonzero(self.hps))
+
+        if self.encounter is not None:
+            self.encounter.hp_changed(self)
+            if was_alive and not self.alive:
+                self.encounter.creature_died(self)
+            self.encounter.events.emit(
+                DAMAGE_TAKEN, self, damage=actual, type_=type_
+            )
+        return actual
+
+    @staticmethod
+    def _targets(enemies, type_):
+        """ Stacks the HP, AC and damage multiplier of every enemy.
+
+        Returns:
+            tuple: (hp, ac, multipliers, segments) where segments holds an
+            (enemy, start, stop) slice of the arrays for each enemy.
+        """
+        type_id = damage_type_id(type_)
+        hp, ac, multipliers, segments = [], [], [], []
+        start = 0
+        for enemy in enemies:
+            if isinstance(enemy, Horde):
+                members = enemy.hps
+            else:
+                members = numpy.array([enemy.hp], dtype=numpy.int64)
+            stop = start + len(members)
+            hp.append(members)
+            ac.append(numpy.full(len(members), enemy.ac))
+            multiplier = NORMAL
+            if type_id < len(enemy.damage_multipliers):
+                multiplier = enemy.damage_multipliers[type_id]
+            multipliers.append(numpy.full(len(members), multiplier))
+            segments.append((enemy, start, stop))
+            start = stop
+
+        return (
+            numpy.concatenate(hp),
+            numpy.concatenate(ac),
+            numpy.concatenate(multipliers),
+            segments
+        )
+
+
+def _focus_fire(totals, damage, hp, ac, multipliers):
+    """ Damage to each target when every attack goes to the weakest target.
+
+    Attacks are used up in order. The weakest target takes attacks until the
+    running total of its damage reaches its HP, and the remaining attacks move
+    on to the next weakest target.
+    """
+    taken = numpy.zeros(len(hp), dtype=numpy.int64)
+    start = 0
+    for target in numpy.argsort(hp, kind="stable"):
+        if start == len(totals):
+            break
+        if hp[target] <= 0:
+            continue
+
+        hits = totals[start:] >= ac[target]
+        dealt = numpy.floor(
+            numpy.where(hits, damage[start:], 0) * multipliers[target]
+        ).astype(numpy.int64)
+        spent = numpy.cumsum(dealt)
+        killing_blow = numpy.searchsorted(spent, hp[target])
+        if killing_blow < len(spent):
+            taken[target] = hp[target]
+            start += killing_blow + 1
+        else:
+            taken[target] = spent[-1]
+            start = len(totals)
+    return taken
+
+
+def _scatter(rng, totals, damage, hp, ac, multipliers):
+    """ Damage to each target when every attack picks a random target. """
+    living = numpy.flatnonzero(hp > 0)
+    targets = living[rng.integers(0, len(living), size=len(totals))]
+    hits = totals >= ac[targets]
+    dealt = numpy.floor(
+        numpy.where(hits, damage, 0) * multipliers[targets]
+    ).astype(numpy.int64)
+    taken = numpy.zeros(len(hp), dtype=numpy.int64)
+    numpy.add.at(taken, targets, dealt)
+    return numpy.minimum(taken, hp)
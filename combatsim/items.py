@@ -1,3 +1,4 @@
+from combatsim import dpr
 from combatsim.dice import Dice
 
 # TODO (phillip): When equipping an item, consider the following:
@@ -94,13 +95,7 @@ class Weapon(Item):
             advantage = False
             disadvantage = False
 
-        # Determine modification
-        if self.attack_mod:
-            dice_mod = self.attack_mod
-        else:
-            dice_mod = self._get_ability()
-            if self.owner.is_proficient(self):
-                dice_mod += self.owner.proficiency
+        dice_mod = self.attack_bonus
 
         # Roll the d20
         dice = Dice("1d20")
@@ -121,12 +116,46 @@ class Weapon(Item):
         if crit:
             dice = dice * 2
 
-        if self.damage_mod:
-            dice_mod = self.damage_mod
-        else:
-            dice_mod = self._get_ability()
+        return sum(dice.roll()) + self.damage_bonus, self.damage_type
 
-        return sum(dice.roll()) + dice_mod, self.damage_type
+    def hit_chance(self, ac, advantage=False, disadvantage=False):
+        """ Chance to hit `ac` and chance to crit, see `combatsim.dpr`. """
+        return dpr.hit_chance(self.attack_bonus, ac, advantage, disadvantage)
+
+    def dpr(self, ac, advantage=False, disadvantage=False):
+        """ Average damage of one attack against `ac`, worked out exactly.
+        """
+        return dpr.expected_damage(self, ac, advantage, disadvantage)
+
+    def dpr_many(self, acs, advantage=False, disadvantage=False):
+        """ Average damage of one attack against each of many ACs.
+
+        Returns:
+            numpy.ndarray: Float array with the same shape as `acs`.
+        """
+        return dpr.expected_damage_many(self, acs, advantage, disadvantage)
+
+    def damage_distribution(self, ac, advantage=False, disadvantage=False):
+        """ Chance of each amount of damage of one attack against `ac`. """
+        return dpr.damage_distribution(self, ac, advantage, disadvantage)
+
+    @property
+    def attack_bonus(self):
+        """ Modifier added to attack rolls with this weapon. """
+        if self.attack_mod is not None:
+            return self.attack_mod
+
+        bonus = self._get_ability().mod
+        if self.owner.is_proficient(self):
+            bonus += self.owner.proficiency
+        return bonus
+
+    @property
+    def damage_bonus(self):
+        """ Modifier added to damage rolls with this weapon. """
+        if self.damage_mod is not None:
+            return self.damage_mod
+        return self._get_ability().mod
 
     def _get_ability(self):
         if 'finesse' in self.properties:
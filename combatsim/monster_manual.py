@@ -12,6 +12,8 @@ from combatsim.dice import Dice
 # TODO (phillip): Implement range for light crossbow
 bandit = {
     'name': "Bandit",
+    'cr': "1/8",
+    'type': "humanoid",
     'xp': 25,
     'level': 2,
     'strength': 11,
@@ -31,6 +33,8 @@ bandit = {
 # TODO (phillip): Implement pack tactics
 blood_hawk = {
     'name': "Blood Hawk",
+    'cr': "1/8",
+    'type': "beast",
     'xp': 25,
     'level': 2,
     'strength': 6,
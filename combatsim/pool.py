@@ -0,0 +1,176 @@
+""" Persistent pool of warm worker processes.
+
+Starting a worker can cost more than the short simulations it is started
+for. A new worker has to import the simulator, then unpickle and compile
+the templates of every encounter it is sent. `WorkerPool` pays each of these
+costs once:
+
+* Workers are forked from a fork server that has already imported the
+  simulator, the template modules and the spells, so every worker starts
+  with them loaded and shares their memory with the other workers
+  copy-on-write.
+* Workers stay alive between jobs.
+* Every worker keeps the definitions it has been sent, keyed by a digest of
+  their pickle, so templates are compiled once per worker instead of once
+  per chunk. Definitions given to the pool up front are compiled as soon as
+  a worker starts.
+
+Only modules are shared through the fork server. It is started once per
+process and only preloads modules by name, so compiled templates can't be
+put in it. Each worker unpickles and compiles its own copy of every
+definition after it starts.
+
+::
+
+    with WorkerPool(workers=8, definitions=[ambush]) as pool:
+        for seed in range(100):
+            wins, = pool.run(ambush, 500, [Histogram('winner')], seed=seed)
+
+Platforms without a fork server spawn their workers instead, which only
+keeps the definition cache.
+"""
+
+from collections import OrderedDict
+import copy
+import hashlib
+import multiprocessing
+import os
+import pickle
+import random
+
+from combatsim.simulation import run_trials
+
+# Modules the fork server imports before it forks any worker.
+PRELOAD = (
+    'combatsim.simulation', 'combatsim.aggregators',
+    'combatsim.encounter_file', 'combatsim.monster_manual',
+    'combatsim.sample_creatures', 'combatsim.spells', 'combatsim.cantrips',
+)
+
+# Number of definitions a worker keeps compiled.
+CACHE_SIZE = 64
+
+_definitions = OrderedDict()
+
+
+def context(method=None):
+    """ Multiprocessing context to start simulation workers with.
+
+    Args:
+        method (str): Start method. Defaults to "forkserver" with `PRELOAD`
+            preloaded, or "spawn" where there is no fork server.
+    """
+    if method is None:
+        methods = multiprocessing.get_all_start_methods()
+        method = "forkserver" if "forkserver" in methods else "spawn"
+    ctx = multiprocessing.get_context(method)
+    if method == "forkserver":
+        ctx.set_forkserver_preload(list(PRELOAD))
+    return ctx
+
+
+def pack(definition):
+    """ Pickles a definition once so it can be sent to workers many times.
+
+    Args:
+        definition (callable): Builds an encounter, usually an
+            `EncounterDefinition`.
+
+    Returns:
+        tuple: (key, pickle) where the key is a digest of the pickle.
+    """
+    payload = pickle.dumps(definition, pickle.HIGHEST_PROTOCOL)
+    return hashlib.blake2b(payload, digest_size=16).hexdigest(), payload
+
+
+def unpack(packed):
+    """ Returns the definition of `pack`, compiled, from this process's cache.
+    """
+    key, payload = packed
+    definition = _definitions.get(key)
+    if definition is not None:
+        _definitions.move_to_end(key)
+        return definition
+
+    definition = pickle.loads(payload)
+    if hasattr(definition, 'compile'):
+        definition.compile()
+    _definitions[key] = definition
+    if len(_definitions) > CACHE_SIZE:
+        _definitions.popitem(last=False)
+    return definition
+
+
+def run_chunk(packed, seed, start, trials, aggregators):
+    """ Runs trials `start` to `start + trials` of a packed definition.
+
+    Returns:
+        list: The aggregators that were passed in.
+    """
+    return run_trials(
+        unpack(packed), trials, aggregators, seed=seed, start=start
+    )
+
+
+def _run_task(task):
+    return run_chunk(*task)
+
+
+def _warm(definitions):
+    for packed in definitions:
+        unpack(packed)
+
+
+class WorkerPool:
+    """ Worker processes that are reused for many simulations.
+
+    Args:
+        workers (int): Number of worker processes. Defaults to the number of
+            CPUs.
+        definitions (list): Definitions every worker compiles when it starts.
+        method (str): Start method, see `context`.
+    """
+
+    def __init__(self, workers=None, definitions=(), method=None):
+        self.workers = workers or os.cpu_count() or 1
+        self._pool = context(method).Pool(
+            self.workers,
+            initializer=_warm,
+            initargs=([pack(definition) for definition in definitions],)
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def run(self, definition, trials, aggregators, seed=None,
+            chunk_size=1000):
+        """ Runs a simulation on the pool, like `run_trials`.
+
+        The aggregators are copied for every chunk, so they should be empty
+        and picklable. Chunks are merged into them in order.
+
+        Returns:
+            list: The aggregators that were passed in.
+        """
+        if seed is None:
+            seed = random.SystemRandom().getrandbits(32)
+        packed = pack(definition)
+        tasks = [
+            (
+                packed, seed, start, min(chunk_size, trials - start),
+                copy.deepcopy(aggregators)
+            )
+            for start in range(0, trials, chunk_size)
+        ]
+        for chunk in self._pool.imap(_run_task, tasks):
+            for aggregator, part in zip(aggregators, chunk):
+                aggregator.merge(part)
+        return aggregators
+
+    def close(self):
+        """ Waits for running chunks and stops the workers. """
+        self._pool.close()
+        self._pool.join()
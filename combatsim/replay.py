@@ -0,0 +1,295 @@
+""" Recording and replaying single trials.
+
+When a simulation produces a result that looks wrong, the trial behind it can
+be recorded and replayed on its own instead of rerunning the simulation::
+
+    record = record_trial(definition, seed=1234, index=5071)
+    record.save("trial.replay")
+
+    # After changing the code
+    record = TrialRecord.load("trial.replay")
+    divergence = diff(definition, record)
+
+A record holds the trial's seed, every die rolled by `Dice` and the event log
+of the trial. Rolls are stored as varints, with the size of each die stored
+as a change from the die before it. Most rolls are of the same kind of die
+as the one before them, so most rolls take up a single byte.
+"""
+
+import random
+import struct
+
+from combatsim import dice
+from combatsim.event import EventLog
+from combatsim.simulation import trial_seed
+
+_MAGIC = b"CSRP"
+_HEADER = struct.Struct("<4sQII")
+
+
+class ReplayDivergence(Exception):
+    """ A replayed trial rolled different dice than the recording. """
+
+    def __init__(self, draw, message):
+        super().__init__(f"Draw {draw}: {message}")
+        self.draw = draw
+
+
+def _write_varint(out, value):
+    while value > 0x7f:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data, pos):
+    result = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7f) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _zigzag(value):
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def _unzigzag(value):
+    return value // 2 if value % 2 == 0 else -(value + 1) // 2
+
+
+def encode_draws(draws):
+    """ Packs (faces, roll) pairs into bytes.
+
+    Each roll is written as a varint of `2 * (roll - 1)`. When the die is a
+    different size than the one before it, the roll is written as
+    `2 * change + 1` instead, followed by the roll.
+    """
+    out = bytearray()
+    previous = 0
+    for faces, roll in draws:
+        if faces != previous:
+            _write_varint(out, _zigzag(faces - previous) * 2 + 1)
+            _write_varint(out, roll - 1)
+            previous = faces
+        else:
+            _write_varint(out, (roll - 1) * 2)
+    return bytes(out)
+
+
+def decode_draws(data):
+    """ Unpacks bytes written by `encode_draws`.
+
+    Returns:
+        list: (faces, roll) pairs.
+    """
+    draws = []
+    faces = 0
+    pos = 0
+    while pos < len(data):
+        value, pos = _read_varint(data, pos)
+        if value % 2:
+            faces += _unzigzag(value // 2)
+            value, pos = _read_varint(data, pos)
+            draws.append((faces, value + 1))
+        else:
+            draws.append((faces, value // 2 + 1))
+    return draws
+
+
+class RecordingSource:
+    """ Rolls dice with `random` and remembers every roll. """
+
+    def __init__(self):
+        self.draws = []
+
+    def roll(self, faces):
+        value = random.randint(1, faces)
+        self.draws.append((faces, value))
+        return value
+
+    def roll_many(self, faces, count):
+        # The same call as `Dice.roll_many` makes without a source, so that
+        # batched rolls come out the same as in a simulation.
+        values = random.choices(range(1, faces + 1), k=count)
+        self.draws.extend((faces, value) for value in values)
+        return values
+
+
+class ReplaySource:
+    """ Hands out the rolls of a recording in order.
+
+    Args:
+        draws (list): (faces, roll) pairs from `decode_draws`.
+        strict (bool): If true, raise `ReplayDivergence` as soon as a die of
+            the wrong size is rolled or the recording runs out. Otherwise the
+            rest of the trial is rolled with `random`.
+
+    Attributes:
+        position (int): Number of rolls handed out so far.
+        diverged (int): Index of the first roll that didn't match the
+            recording, or None.
+    """
+
+    def __init__(self, draws, strict=True):
+        self.draws = draws
+        self.strict = strict
+        self.position = 0
+        self.diverged = None
+
+    def roll(self, faces):
+        position = self.position
+        self.position += 1
+        if self.diverged is None:
+            if position >= len(self.draws):
+                self._diverge(position, "ran past the end of the recording")
+            elif self.draws[position][0] != faces:
+                self._diverge(
+                    position,
+                    f"rolled a d{faces} but the recording has a "
+                    f"d{self.draws[position][0]}"
+                )
+            else:
+                return self.draws[position][1]
+        return random.randint(1, faces)
+
+    def roll_many(self, faces, count):
+        return [self.roll(faces) for _ in range(count)]
+
+    def _diverge(self, position, message):
+        if self.strict:
+            raise ReplayDivergence(position, message)
+        self.diverged = position
+
+
+class TrialRecord:
+    """ Everything needed to replay one trial.
+
+    Attributes:
+        seed (int): Seed of the trial. `random` is seeded with it before the
+            encounter is built.
+        draws (bytes): Encoded dice rolls, see `encode_draws`.
+        events (list): Messages of the trial's event log as strings.
+    """
+
+    def __init__(self, seed, draws, events=()):
+        self.seed = seed
+        self.draws = draws
+        self.events = list(events)
+
+    def __len__(self):
+        """ Number of dice rolled in the trial. """
+        return len(decode_draws(self.draws))
+
+    def save(self, path):
+        events = "\n".join(self.events).encode("utf-8")
+        with open(path, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, self.seed, len(self.draws), len(events)))
+            f.write(self.draws)
+            f.write(events)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, seed, draws_size, events_size = _HEADER.unpack_from(data)
+        if magic != _MAGIC:
+            raise ValueError(f"{path} is not a trial record")
+        start = _HEADER.size
+        draws = data[start:start + draws_size]
+        events = data[start + draws_size:start + draws_size + events_size]
+        events = events.decode("utf-8").split("\n") if events else []
+        return cls(seed, draws, events)
+
+
+def _run(make_encounter, seed, source):
+    """ Runs a trial with dice from `source`, capturing its event log. """
+    previous = dice.set_source(source)
+    log_encounter, log_events = EventLog.encounter, EventLog.events
+    try:
+        random.seed(seed)
+        encounter = make_encounter()
+        EventLog(encounter)
+        result = encounter.run()
+        events = [str(event) for event in EventLog.events]
+    finally:
+        dice.set_source(previous)
+        EventLog.encounter, EventLog.events = log_encounter, log_events
+    return result, events
+
+
+def record(make_encounter, seed):
+    """ Runs one trial and records it.
+
+    Args:
+        make_encounter (callable): Builds the encounter, the same as in
+            `combatsim.simulation.simulate`.
+        seed (int): Seed of the trial.
+
+    Returns:
+        tuple: (EncounterResult, TrialRecord)
+    """
+    source = RecordingSource()
+    result, events = _run(make_encounter, seed, source)
+    return result, TrialRecord(seed, encode_draws(source.draws), events)
+
+
+def record_trial(make_encounter, seed, index):
+    """ Records trial `index` of a simulation run with `seed`.
+
+    The trial plays out exactly as it did in the simulation.
+
+    Returns:
+        TrialRecord: The recorded trial.
+    """
+    return record(make_encounter, trial_seed(seed, index))[1]
+
+
+def replay(make_encounter, trial, strict=True):
+    """ Runs a recorded trial again with the recorded dice.
+
+    Args:
+        make_encounter (callable): Builds the encounter.
+        trial (TrialRecord): The recorded trial.
+        strict (bool): See `ReplaySource`.
+
+    Returns:
+        tuple: (EncounterResult, list of event strings)
+    """
+    source = ReplaySource(decode_draws(trial.draws), strict)
+    return _run(make_encounter, trial.seed, source)
+
+
+def first_divergence(expected, actual):
+    """ Finds the first event that differs between two event logs.
+
+    Returns:
+        tuple: (index, expected event, actual event), where a missing event
+        is None, or None if the logs are the same.
+    """
+    for index, (a, b) in enumerate(zip(expected, actual)):
+        if a != b:
+            return (index, a, b)
+    if len(expected) != len(actual):
+        index = min(len(expected), len(actual))
+        a = expected[index] if index < len(expected) else None
+        b = actual[index] if index < len(actual) else None
+        return (index, a, b)
+    return None
+
+
+def diff(make_encounter, trial):
+    """ Replays a recorded trial with the current code and compares the logs.
+
+    Rolls that no longer line up with the recording are rolled at random, so
+    the replay keeps going past the point where it diverged.
+
+    Returns:
+        tuple: The first divergent event, see `first_divergence`, or None if
+        the trial played out the same way.
+    """
+    _, events = replay(make_encounter, trial, strict=False)
+    return first_divergence(trial.events, events)
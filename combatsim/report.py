@@ -0,0 +1,35 @@
+""" Reporters that display what happened during an encounter. """
+
+from combatsim.event import EventLog
+
+
+class ConsoleReporter:
+    """ Prints the combatants, the event log, and the final HP of everyone.
+
+    This is the output that used to be printed by every encounter. Encounters
+    now run headless unless they are given a reporter. The event log is only
+    kept while the encounter runs, and whatever was logging before is put
+    back when it ends.
+    """
+
+    def __init__(self):
+        self.event_log = None
+        self._previous = None
+
+    def start(self, encounter):
+        self._previous = EventLog.encounter, EventLog.events
+        self.event_log = EventLog(encounter)
+        print("==== Combatants ====")
+        for creature in encounter.creatures:
+            print(f"{creature}: {creature.hp}")
+
+        print("\n==== BEGIN ENCOUNTER ====")
+
+    def end(self, encounter, result):
+        print(self.event_log)
+        EventLog.encounter, EventLog.events = self._previous
+        self._previous = None
+
+        print("\n==== END ENCOUNTER ====")
+        for creature in encounter.creatures:
+            print(f"\t{creature}: {creature.hp}")
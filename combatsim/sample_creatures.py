@@ -2,7 +2,8 @@
 
 from combatsim.dice import Dice
 from combatsim.tactics import Healer, Mage
-from combatsim.spells import acid_splash, cure_wounds, drain
+from combatsim.cantrips import acid_splash
+from combatsim.spells import cure_wounds, drain
 from combatsim.items import Weapon
 
 simple_cleric = {
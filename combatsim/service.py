@@ -0,0 +1,293 @@
+""" Asynchronous simulation service.
+
+The service runs simulations in the background for interactive tools such as
+a balancing UI. Requests are JSON objects describing an encounter, jobs are
+queued and their trials are run in chunks on a pool of worker processes.
+Aggregated results are published after every chunk, so callers can show
+progress and partial win rates while a job is still running::
+
+    async with SimulationService(workers=4) as service:
+        job = await service.submit({
+            'trials': 10000,
+            'seed': 1,
+            'combatants': [
+                {'template': "knight", 'team': 1},
+                {'template': "bandit", 'team': 2, 'count': 3},
+            ]
+        })
+        async for update in service.updates(job):
+            print(update['completed'], update['win_rates'])
+
+Requests use the format of `combatsim.encounter_file`. Each combatant names
+its template from `combatsim.monster_manual` or `combatsim.sample_creatures`,
+and any other keys of a combatant override the template.
+
+Workers are started warm, see `combatsim.pool`, and each worker compiles the
+templates of a job once rather than for every chunk it runs.
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import random
+
+from combatsim.aggregators import Histogram, RunningMean
+from combatsim.encounter_file import EncounterFile
+from combatsim.pool import context, pack, run_chunk
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+CANCELLED = "cancelled"
+FAILED = "failed"
+
+
+def definition_from_json(data):
+    """ Builds an encounter definition from a JSON request.
+
+    Args:
+        data (str, dict or list): The request, which is an encounter in the
+            format of `combatsim.encounter_file`, or just its list of
+            combatants.
+
+    Returns:
+        EncounterFile: The encounter described by the request.
+    """
+    if isinstance(data, str):
+        data = json.loads(data)
+    if isinstance(data, list):
+        data = {'combatants': data}
+    return EncounterFile(data)
+
+
+def _run_chunk(packed, seed, start, trials):
+    """ Runs one chunk of a job in a worker process. """
+    return run_chunk(
+        packed, seed, start, trials,
+        [Histogram('winner'), RunningMean('rounds')]
+    )
+
+
+class Job:
+    """ A simulation request and its progress.
+
+    Attributes:
+        id (int): Id of the job in its service.
+        definition (EncounterDefinition): The encounter being simulated.
+        trials (int): Number of trials requested.
+        seed (int): Seed of the simulation.
+        status (str): One of `QUEUED`, `RUNNING`, `DONE`, `CANCELLED` or
+            `FAILED`.
+        completed (int): Number of trials finished so far.
+        error (str): Why the job failed, if it did.
+    """
+
+    def __init__(self, id_, definition, trials, seed):
+        self.id = id_
+        self.definition = definition
+        self.packed = pack(definition)
+        self.trials = trials
+        self.seed = seed
+        self.status = QUEUED
+        self.completed = 0
+        self.error = None
+        self.winners = Histogram('winner')
+        self.rounds = RunningMean('rounds')
+        self._changed = asyncio.Event()
+        self._futures = []
+
+    @property
+    def finished(self):
+        return self.status in (DONE, CANCELLED, FAILED)
+
+    def snapshot(self):
+        """ Progress and partial results of the job as a JSON-ready dict. """
+        return {
+            'job': self.id,
+            'status': self.status,
+            'completed': self.completed,
+            'trials': self.trials,
+            'win_rates': {
+                str(team): count / self.completed
+                for team, count in self.winners.counts.items()
+            } if self.completed else {},
+            'mean_rounds': self.rounds.mean,
+            'error': self.error,
+        }
+
+    def _publish(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+
+class SimulationService:
+    """ Queues simulation jobs and runs them on a process pool.
+
+    Args:
+        workers (int): Number of worker processes. Defaults to the number of
+            CPUs.
+        chunk_size (int): Number of trials sent to a worker at a time.
+        max_jobs (int): Number of jobs that run at the same time. The rest
+            wait in the queue.
+        executor (Executor): Pool to run chunks on instead of a new
+            `ProcessPoolExecutor` started from `combatsim.pool.context`.
+    """
+
+    def __init__(self, workers=None, chunk_size=1000, max_jobs=4, executor=None):
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.max_jobs = max_jobs
+        self.jobs = {}
+        self._executor = executor
+        self._owns_executor = executor is None
+        self._queue = None
+        self._runners = []
+        self._ids = itertools.count(1)
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def start(self):
+        if self._executor is None:
+            from concurrent.futures import ProcessPoolExecutor
+            self._executor = ProcessPoolExecutor(
+                self.workers, mp_context=context()
+            )
+        self._queue = asyncio.Queue()
+        self._runners = [
+            asyncio.ensure_future(self._runner()) for _ in range(self.max_jobs)
+        ]
+
+    async def close(self):
+        """ Cancels every unfinished job and shuts down the workers. """
+        for job in self.jobs.values():
+            self.cancel(job.id)
+        for runner in self._runners:
+            runner.cancel()
+        await asyncio.gather(*self._runners, return_exceptions=True)
+        self._runners = []
+        if self._owns_executor and self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    async def submit(self, request):
+        """ Queues a simulation request.
+
+        Args:
+            request (str or dict): JSON object with `combatants`, and
+                optionally `trials` (default 1000) and `seed`.
+
+        Returns:
+            int: Id of the new job.
+        """
+        if isinstance(request, str):
+            request = json.loads(request)
+        definition = definition_from_json(request)
+        trials = definition.trials or 1000
+        seed = definition.seed
+        if seed is None:
+            seed = random.SystemRandom().getrandbits(32)
+
+        job = Job(next(self._ids), definition, trials, seed)
+        self.jobs[job.id] = job
+        await self._queue.put(job)
+        return job.id
+
+    def status(self, job_id):
+        """ Latest snapshot of a job, see `Job.snapshot`. """
+        return self.jobs[job_id].snapshot()
+
+    def cancel(self, job_id):
+        """ Cancels a job. Chunks that are already running are discarded.
+
+        Returns:
+            bool: True if the job was cancelled, False if it had already
+            finished.
+        """
+        job = self.jobs[job_id]
+        if job.finished:
+            return False
+        job.status = CANCELLED
+        for future in job._futures:
+            future.cancel()
+        job._publish()
+        return True
+
+    async def updates(self, job_id):
+        """ Yields a snapshot of the job every time it makes progress.
+
+        The first snapshot is the job's current state, and the last one is
+        its final state.
+        """
+        job = self.jobs[job_id]
+        while True:
+            changed = job._changed
+            yield job.snapshot()
+            if job.finished:
+                return
+            await changed.wait()
+
+    async def result(self, job_id):
+        """ Waits for a job to finish and returns its final snapshot. """
+        snapshot = None
+        async for snapshot in self.updates(job_id):
+            pass
+        return snapshot
+
+    async def _runner(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                if not job.finished:
+                    await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job):
+        loop = asyncio.get_running_loop()
+        job.status = RUNNING
+        job._publish()
+
+        chunks = iter(range(0, job.trials, self.chunk_size))
+        pending = set()
+        window = self.workers or os.cpu_count() or 1
+        try:
+            while not job.finished:
+                # Keep a few chunks in flight so one big job can use every
+                # worker, without flooding the pool ahead of other jobs.
+                for start in itertools.islice(chunks, window - len(pending)):
+                    count = min(self.chunk_size, job.trials - start)
+                    future = loop.run_in_executor(
+                        self._executor, _run_chunk,
+                        job.packed, job.seed, start, count
+                    )
+                    job._futures.append(future)
+                    pending.add(future)
+                if not pending:
+                    job.status = DONE
+                    break
+
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for future in done:
+                    if future.cancelled() or job.finished:
+                        continue
+                    winners, rounds = future.result()
+                    job.winners.merge(winners)
+                    job.rounds.merge(rounds)
+                    job.completed += winners.total
+                job._futures = list(pending)
+                job._publish()
+        except Exception as error:
+            job.status = FAILED
+            job.error = repr(error)
+        finally:
+            for future in pending:
+                future.cancel()
+            job._publish()
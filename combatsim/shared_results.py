@@ -0,0 +1,237 @@
+""" Per-trial results collected in shared memory.
+
+Aggregators only send their summaries back from worker processes. When every
+trial's result is needed, sending results back through a pipe means pickling
+each one, and at high trial rates that costs more than the trials. Instead,
+`SharedResults` keeps a NumPy record array in shared memory with one row per
+trial. Workers write the result of trial `i` straight into row `i`, and the
+parent reads and aggregates the array in place once the trials are done::
+
+    results = run_shared(ambush, 1000000, seed=1, workers=8)
+    with results:
+        print(results.win_counts(), results.rounds.mean())
+        damage = results.damage.mean(axis=0)
+
+Each chunk of trials owns its own range of rows, so workers never write to
+the same memory and no locking is needed. Rows start out with -1 rounds,
+which marks trials that haven't been run.
+
+Only the creatures an encounter starts with have columns, so creatures that
+join during a fight aren't recorded. Teams must be integers, and a winner of
+None is stored as -1, the same as in `combatsim.simulation.ResultWriter`.
+
+NumPy is an optional dependency, installed with the `numpy` extra.
+"""
+
+from collections import OrderedDict
+from multiprocessing import shared_memory
+import weakref
+
+import numpy
+
+from combatsim.aggregators import Aggregator
+from combatsim.simulation import TrialResult
+
+NO_WINNER = -1
+
+# Number of arrays made by other processes that a worker keeps attached.
+ATTACHED = 8
+
+_owned = weakref.WeakValueDictionary()
+_attached = OrderedDict()
+
+
+def result_dtype(creatures):
+    """ NumPy record type of one trial with `creatures` creatures. """
+    return numpy.dtype([
+        ('seed', '<u8'),
+        ('winner', '<i4'),
+        ('rounds', '<i4'),
+        ('hp', '<i4', (creatures,)),
+        ('damage', '<i4', (creatures,)),
+        ('kills', '<i4', (creatures,)),
+    ])
+
+
+class SharedResults(Aggregator):
+    """ Aggregator that writes every result into a shared record array.
+
+    Pickled copies, such as the ones sent to worker processes, attach to the
+    same memory instead of copying the array. Merging does nothing, because
+    every copy has already written its rows.
+
+    Args:
+        trials (int): Number of rows.
+        creatures (int): Number of creatures recorded in every row.
+        start (int): Index of the trial that goes in the first row.
+
+    Attributes:
+        records (numpy.ndarray): Record array with a `result_dtype` row for
+            every trial.
+        name (str): Name of the shared memory block.
+    """
+
+    def __init__(self, trials, creatures, start=0, name=None):
+        self.trials = trials
+        self.creatures = creatures
+        self.start = start
+        dtype = result_dtype(creatures)
+        if name is None:
+            self._shm = shared_memory.SharedMemory(
+                create=True, size=max(1, trials * dtype.itemsize)
+            )
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+        self.name = self._shm.name
+        self.records = numpy.ndarray(trials, dtype, buffer=self._shm.buf)
+        if name is None:
+            self.records['rounds'] = -1
+            _owned[self.name] = self
+        else:
+            _attached[self.name] = self
+            while len(_attached) > ATTACHED:
+                _attached.popitem(last=False)[1].close()
+
+    @classmethod
+    def attach(cls, name, trials, creatures, start=0):
+        """ Returns this process's view of a block made by another process.
+        """
+        owned = _owned.get(name)
+        if owned is not None:
+            return owned
+        attached = _attached.get(name)
+        if attached is not None:
+            _attached.move_to_end(name)
+            return attached
+        return cls(trials, creatures, start, name)
+
+    def __reduce__(self):
+        return (
+            SharedResults.attach,
+            (self.name, self.trials, self.creatures, self.start)
+        )
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.unlink()
+
+    def add(self, result):
+        row = self.records[result.index - self.start]
+        n = min(len(result.hp), self.creatures)
+        row['seed'] = result.seed
+        row['winner'] = NO_WINNER if result.winner is None else result.winner
+        row['rounds'] = result.rounds
+        row['hp'][:n] = result.hp[:n]
+        row['damage'][:n] = result.damage[:n]
+        row['kills'][:n] = result.kills[:n]
+
+    def merge(self, other):
+        if other.name != self.name:
+            raise ValueError("Can only merge views of the same results")
+
+    @property
+    def completed(self):
+        """ Rows of the trials that have been run. """
+        return self.records[self.records['rounds'] >= 0]
+
+    @property
+    def winner(self):
+        return self.completed['winner']
+
+    @property
+    def rounds(self):
+        return self.completed['rounds']
+
+    @property
+    def hp(self):
+        return self.completed['hp']
+
+    @property
+    def damage(self):
+        return self.completed['damage']
+
+    @property
+    def kills(self):
+        return self.completed['kills']
+
+    def win_counts(self):
+        """ Number of wins of each team, with None for no winner. """
+        teams, counts = numpy.unique(self.winner, return_counts=True)
+        return {
+            None if team == NO_WINNER else int(team): int(count)
+            for team, count in zip(teams, counts)
+        }
+
+    def win_rate(self, team):
+        """ Fraction of the trials run that `team` won. """
+        winner = self.winner
+        if not len(winner):
+            return 0.0
+        code = NO_WINNER if team is None else team
+        return float(numpy.count_nonzero(winner == code)) / len(winner)
+
+    def results(self):
+        """ Yields a `TrialResult` for every trial that has been run. """
+        for offset in numpy.flatnonzero(self.records['rounds'] >= 0):
+            row = self.records[offset]
+            winner = int(row['winner'])
+            yield TrialResult(
+                self.start + int(offset),
+                int(row['seed']),
+                None if winner == NO_WINNER else winner,
+                int(row['rounds']),
+                tuple(row['hp'].tolist()),
+                tuple(row['damage'].tolist()),
+                tuple(row['kills'].tolist())
+            )
+
+    def close(self):
+        """ Detaches this process from the memory. """
+        if _attached.get(self.name) is self:
+            del _attached[self.name]
+        if _owned.get(self.name) is self:
+            del _owned[self.name]
+        self.records = None
+        self._shm.close()
+
+    def unlink(self):
+        """ Detaches and frees the memory. Call this once, in the process
+        that made it. """
+        self.close()
+        self._shm.unlink()
+
+
+def run_shared(definition, trials, seed=None, workers=None, chunk_size=1000,
+               pool=None):
+    """ Runs a simulation on worker processes into `SharedResults`.
+
+    Args:
+        definition (EncounterDefinition): The encounter to simulate.
+        trials (int): Number of trials.
+        seed (int): Seed of the simulation.
+        workers (int): Number of workers of the pool that is made if `pool`
+            isn't given.
+        chunk_size (int): Number of trials handed to a worker at a time.
+        pool (WorkerPool): Pool to run on, which is left running.
+
+    Returns:
+        SharedResults: The results. Call `unlink` when done with them.
+    """
+    from combatsim.pool import WorkerPool
+
+    results = SharedResults(trials, len(definition.compile()))
+    try:
+        if pool is None:
+            with WorkerPool(workers, definitions=[definition]) as pool:
+                pool.run(definition, trials, [results], seed, chunk_size)
+        else:
+            pool.run(definition, trials, [results], seed, chunk_size)
+    except BaseException:
+        results.unlink()
+        raise
+    return results
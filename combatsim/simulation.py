@@ -0,0 +1,207 @@
+""" Runs many trials of an encounter as a stream of compact results.
+
+Every trial is reduced to a `TrialResult` as soon as it finishes, so nothing
+about the creatures or the event log is kept around between trials. Results
+are handed to aggregators from `combatsim.aggregators` and can optionally be
+appended to a binary file, which means a sweep of any length runs in constant
+memory::
+
+    wins = Histogram('winner')
+    rounds = RunningMean('rounds')
+    for result in simulate(make_encounter, 1000000, seed=1,
+                           aggregators=[wins, rounds], output="sweep.bin"):
+        pass
+"""
+
+from collections import namedtuple
+import random
+import struct
+
+_MASK = 0xFFFFFFFFFFFFFFFF
+_HEADER = struct.Struct("<IQiIH")
+_NO_WINNER = -1
+
+
+class TrialResult(namedtuple(
+    'TrialResult', 'index seed winner rounds hp damage kills'
+)):
+    """ Compact record of a single trial.
+
+    Attributes:
+        index (int): Number of the trial within the simulation.
+        seed (int): Seed the random number generator had for this trial.
+            Seeding with this value and rebuilding the encounter replays the
+            trial exactly.
+        winner: The winning team, or None if there was no winner.
+        rounds (int): Number of rounds that were fought.
+        hp (tuple): Final HP of each creature, in encounter order.
+        damage (tuple): Damage dealt by each creature, in encounter order.
+        kills (tuple): Kills made by each creature, in encounter order.
+    """
+    __slots__ = ()
+
+    @classmethod
+    def from_encounter(cls, index, seed, encounter, result):
+        creatures = encounter.creatures
+        return cls(
+            index,
+            seed,
+            result.winner,
+            result.rounds,
+            tuple(c.hp for c in creatures),
+            tuple(result.damage_dealt.get(c, 0) for c in creatures),
+            tuple(result.kills.get(c, 0) for c in creatures)
+        )
+
+
+def trial_seed(seed, index):
+    """ Derives the seed of a single trial from the seed of a simulation. """
+    return ((seed << 32) + index) & _MASK
+
+
+def simulate(
+    make_encounter,
+    trials,
+    seed=None,
+    aggregators=None,
+    output=None,
+    flush_every=1000,
+    start=0
+):
+    """ Runs trials of an encounter, yielding one `TrialResult` per trial.
+
+    Args:
+        make_encounter (callable): Called with no arguments to build a fresh
+            `Encounter` for every trial.
+        trials (int): Number of trials to run.
+        seed (int): Seed for the simulation. Every trial is seeded from this
+            value, so the same seed always produces the same results. A random
+            seed is picked if none is given. The state of `random` is the
+            same after every trial as it was before it.
+        aggregators (list): Aggregators that are fed every result.
+        output (str): Path of a binary file that results are appended to.
+        flush_every (int): Number of results buffered before they are written
+            to `output`.
+        start (int): Index of the first trial. This makes it possible to split
+            a simulation into shards that produce the same trials.
+
+    Yields:
+        TrialResult: The result of each trial, in order.
+    """
+    if seed is None:
+        seed = random.SystemRandom().getrandbits(32)
+    if aggregators is None:
+        aggregators = []
+
+    writer = ResultWriter(output, flush_every) if output else None
+    try:
+        for index in range(start, start + trials):
+            s = trial_seed(seed, index)
+            # Trials are seeded through the global generator that dice roll
+            # from, so the caller's random state is put back before yielding.
+            state = random.getstate()
+            try:
+                random.seed(s)
+                encounter = make_encounter()
+                result = TrialResult.from_encounter(
+                    index, s, encounter, encounter.run()
+                )
+            finally:
+                random.setstate(state)
+            for aggregator in aggregators:
+                aggregator.add(result)
+            if writer:
+                writer.write(result)
+            yield result
+    finally:
+        if writer:
+            writer.close()
+
+
+def run_trials(make_encounter, trials, aggregators, **kwargs):
+    """ Runs a simulation to completion, keeping only the aggregates.
+
+    Takes the same arguments as `simulate`.
+
+    Returns:
+        list: The aggregators that were passed in.
+    """
+    for _ in simulate(make_encounter, trials, aggregators=aggregators, **kwargs):
+        pass
+    return aggregators
+
+
+class ResultWriter:
+    """ Appends trial results to a binary file.
+
+    Each record is a fixed header (index, seed, winner, rounds and number of
+    creatures) followed by the HP, damage and kills of every creature as
+    32-bit integers. Teams must be integers to be written, and a winner of
+    None is stored as -1.
+
+    Args:
+        path (str): File to append to. It is created if it doesn't exist.
+        flush_every (int): Number of records to buffer before writing.
+    """
+
+    def __init__(self, path, flush_every=1000):
+        self.path = path
+        self.flush_every = flush_every
+        self._file = open(path, "ab")
+        self._buffer = bytearray()
+        self._pending = 0
+
+    def write(self, result):
+        creatures = len(result.hp)
+        winner = _NO_WINNER if result.winner is None else result.winner
+        self._buffer += _HEADER.pack(
+            result.index, result.seed, winner, result.rounds, creatures
+        )
+        self._buffer += struct.pack(
+            f"<{3 * creatures}i", *result.hp, *result.damage, *result.kills
+        )
+        self._pending += 1
+        if self._pending >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        self._file.write(self._buffer)
+        self._file.flush()
+        self._buffer = bytearray()
+        self._pending = 0
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_results(path):
+    """ Reads back results written by a `ResultWriter`.
+
+    Yields:
+        TrialResult: Every record in the file, in the order it was written.
+    """
+    with open(path, "rb") as f:
+        while True:
+            header = f.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                return
+            index, seed, winner, rounds, creatures = _HEADER.unpack(header)
+            values = struct.unpack(
+                f"<{3 * creatures}i", f.read(12 * creatures)
+            )
+            yield TrialResult(
+                index,
+                seed,
+                None if winner == _NO_WINNER else winner,
+                rounds,
+                values[:creatures],
+                values[creatures:2 * creatures],
+                values[2 * creatures:]
+            )
@@ -0,0 +1,250 @@
+""" Parameter sweeps over the stats of an encounter's combatants.
+
+A sweep runs the same encounter for every combination of a few varied stats
+and collects the results in an array with one axis per stat::
+
+    duel = EncounterDefinition()
+    duel.add(Monster, knight, team=1)
+    duel.add(Monster, mage, team=2)
+
+    sweep = Sweep(duel, trials=10000, seed=1)
+    sweep.vary(0, 'strength', range(10, 21))
+    sweep.vary(1, 'level', range(1, 11))
+    win_rates = sweep.run().win_rate(1)  # 11 x 10 array
+
+Every cell is split into chunks of trials, and the chunks are handed out to
+a pool of worker processes as they become free, so a slow cell doesn't leave
+the other workers idle. Each worker compiles a template once for every
+combination of values it sees for a combatant, so combatants that aren't
+varied are compiled once per worker.
+
+All cells use the same seed, which means the same trial index rolls the same
+dice in every cell. Differences between cells then come from the stats that
+were varied rather than from luck.
+
+NumPy is an optional dependency, installed with the `numpy` extra.
+"""
+
+import copy
+import itertools
+import random
+from functools import partial
+
+import numpy
+
+from combatsim.aggregators import Histogram
+from combatsim.encounter import Encounter
+from combatsim.simulation import simulate
+
+
+class Axis:
+    """ One stat of one combatant that is varied over a sweep.
+
+    Attributes:
+        combatant (int): Index of the combatant in the definition.
+        key (str): Template key that is overridden, such as 'strength'.
+        values (list): Values the key takes, in order along the axis.
+    """
+
+    def __init__(self, combatant, key, values):
+        self.combatant = combatant
+        self.key = key
+        self.values = list(values)
+
+    def __len__(self):
+        return len(self.values)
+
+    def __repr__(self):
+        return f"Axis({self.combatant}, {self.key!r}, {self.values!r})"
+
+
+class SweepResult:
+    """ Aggregated results of every cell of a sweep.
+
+    Attributes:
+        axes (list): The `Axis` of each dimension.
+        aggregators (numpy.ndarray): Object array holding the merged
+            aggregator of every cell.
+    """
+
+    def __init__(self, axes, aggregators):
+        self.axes = axes
+        self.aggregators = aggregators
+
+    @property
+    def shape(self):
+        return self.aggregators.shape
+
+    def map(self, func):
+        """ Applies `func` to the aggregator of every cell.
+
+        Returns:
+            numpy.ndarray: Float array with the same shape as the sweep.
+        """
+        values = [func(aggregator) for aggregator in self.aggregators.flat]
+        return numpy.array(values, dtype=float).reshape(self.shape)
+
+    def win_rate(self, team):
+        """ Fraction of trials `team` won in each cell.
+
+        This needs the default `Histogram('winner')` aggregator.
+        """
+        return self.map(lambda histogram: histogram.frequency(team))
+
+
+def _build(templates):
+    return Encounter([template.stamp() for template in templates])
+
+
+class Sweep:
+    """ Grid of overrides to simulate an encounter over.
+
+    Args:
+        definition (EncounterDefinition): The encounter to sweep over.
+        trials (int): Number of trials in every cell.
+        aggregator (Aggregator): Aggregator that is copied for every cell.
+            Defaults to `Histogram('winner')`. It is sent to the workers, so
+            it must be picklable.
+        seed (int): Seed shared by every cell. A random seed is picked when
+            the sweep is run if none is given.
+    """
+
+    def __init__(self, definition, trials, aggregator=None, seed=None):
+        self.definition = definition
+        self.trials = trials
+        self.aggregator = aggregator or Histogram('winner')
+        self.seed = seed
+        self.axes = []
+        self._templates = {}
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_templates'] = {}
+        return state
+
+    def vary(self, combatant, key, values):
+        """ Adds an axis that sets `key` of a combatant to each of `values`.
+
+        Args:
+            combatant (int): Index of the combatant in the definition.
+        """
+        if not 0 <= combatant < len(self.definition.combatants):
+            raise ValueError(f"The encounter has no combatant {combatant}")
+        self.axes.append(Axis(combatant, key, values))
+        return self
+
+    @property
+    def shape(self):
+        return tuple(len(axis) for axis in self.axes)
+
+    def cells(self):
+        """ Index of every cell in the sweep, in row-major order. """
+        return itertools.product(*(range(len(axis)) for axis in self.axes))
+
+    def make_encounter(self, cell):
+        """ Builds a callable that makes the encounter of one cell.
+
+        Templates are shared between all cells that use the same values for
+        a combatant.
+        """
+        templates = []
+        for i, (cls, base, overrides) in enumerate(self.definition.combatants):
+            varied = tuple(
+                (n, cell[n]) for n, axis in enumerate(self.axes)
+                if axis.combatant == i
+            )
+            template = self._templates.get((i, varied))
+            if template is None:
+                options = dict(overrides)
+                for n, index in varied:
+                    options[self.axes[n].key] = self.axes[n].values[index]
+                template = cls.compile(base, **options)
+                self._templates[(i, varied)] = template
+            templates.append(template)
+        return partial(_build, templates)
+
+    def run_cell(self, cell, start=0, trials=None):
+        """ Runs trials `start` to `start + trials` of one cell.
+
+        Returns:
+            Aggregator: A copy of the sweep's aggregator fed every result.
+        """
+        if trials is None:
+            trials = self.trials - start
+        aggregator = copy.deepcopy(self.aggregator)
+        results = simulate(
+            self.make_encounter(cell), trials, seed=self.seed,
+            aggregators=[aggregator], start=start
+        )
+        for _ in results:
+            pass
+        return aggregator
+
+    def run(self, workers=None, chunk_size=1000, coordinator=None):
+        """ Runs every cell of the sweep.
+
+        Args:
+            workers (int): Number of worker processes. Defaults to the number
+                of CPUs. With 1 worker everything runs in this process.
+            chunk_size (int): Number of trials handed to a worker at a time.
+            coordinator (Coordinator): Runs the chunks on the workers of a
+                `combatsim.distributed.Coordinator` instead, and `workers` is
+                ignored.
+
+        Returns:
+            SweepResult: The merged aggregator of every cell.
+        """
+        if self.seed is None:
+            self.seed = random.SystemRandom().getrandbits(32)
+
+        tasks = [
+            (cell, start, min(chunk_size, self.trials - start))
+            for cell in self.cells()
+            for start in range(0, self.trials, chunk_size)
+        ]
+        if coordinator is not None:
+            from combatsim.pool import pack
+            packed = pack(self)
+            chunks = coordinator.map(
+                _run_packed_task, [(packed,) + task for task in tasks]
+            )
+        elif workers == 1:
+            chunks = [self.run_cell(*task) for task in tasks]
+        else:
+            import multiprocessing
+            chunks = [None] * len(tasks)
+            with multiprocessing.Pool(
+                workers, initializer=_init_worker, initargs=(self,)
+            ) as pool:
+                for index, aggregator in pool.imap_unordered(
+                    _run_task, enumerate(tasks)
+                ):
+                    chunks[index] = aggregator
+
+        # Chunks are merged in order so the result doesn't depend on which
+        # worker finished first.
+        aggregators = numpy.empty(self.shape, dtype=object)
+        for (cell, start, _), aggregator in zip(tasks, chunks):
+            if start == 0:
+                aggregators[cell] = aggregator
+            else:
+                aggregators[cell].merge(aggregator)
+        return SweepResult(self.axes, aggregators)
+
+
+_sweep = None
+
+
+def _init_worker(sweep):
+    global _sweep
+    _sweep = sweep
+
+
+def _run_task(task):
+    index, (cell, start, trials) = task
+    return index, _sweep.run_cell(cell, start, trials)
+
+
+def _run_packed_task(packed, cell, start, trials):
+    from combatsim.pool import unpack
+    return unpack(packed).run_cell(cell, start, trials)
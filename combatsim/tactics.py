@@ -28,6 +28,17 @@ class BaseTactics:
 class TargetWeakest(BaseTactics):
 
     def act(self, creatures):
+        self.actor.attack(self.weakest(creatures), self.actor.weapons[0])
+
+    def weakest(self, creatures):
+        """ Living enemy with the lowest HP.
+
+        Inside an encounter this is looked up in the encounter's target index.
+        Otherwise every creature is checked.
+        """
+        if getattr(creatures, 'encounter', None) is not None:
+            return creatures.weakest_enemy()
+
         target = None
         for creature in self.enemies(creatures):
             if not creature.is_alive():
@@ -37,8 +48,7 @@ class TargetWeakest(BaseTactics):
                 target = creature
             elif creature.hp > 0 and creature.hp < target.hp:
                 target = creature
-
-        self.actor.attack(target, self.actor.weapons[0])
+        return target
 
 
 class Mage(TargetWeakest):
@@ -58,10 +68,14 @@ class Healer(TargetWeakest):
             return super().act(creatures)
 
         if self.actor.hp < self.actor.max_hp:
-            return self.actor.cast(self.actor.spells[0], 1, target=self.actor)
+            return self.actor.cast(
+                self.actor.spells[0], 1, targets=[self.actor]
+            )
 
         for creature in self.allies(creatures):
             if creature.hp < creature.max_hp:
-                return self.actor.cast(self.actor.spells[0], 1, target=creature)
+                return self.actor.cast(
+                    self.actor.spells[0], 1, targets=[creature]
+                )
 
         return super().act(creatures)
@@ -0,0 +1,109 @@
+""" Index of the best target on each side of an encounter.
+
+`TargetWeakest` used to look at every enemy on every turn to find the one with
+the lowest HP, which makes a round of combat quadratic in the number of
+combatants. The encounter now keeps a heap of living creatures for each side,
+and creatures tell the encounter whenever their HP changes so the heaps stay
+up to date.
+
+Heap entries are never removed in place. Updating a creature pushes a new
+entry and marks the old one as stale, and stale entries are thrown away when
+they reach the top of the heap.
+"""
+
+import heapq
+from operator import attrgetter
+
+
+class TargetIndex:
+    """ Living creatures of each side, ordered by `key`.
+
+    Ties are broken by the order the creatures were added in, which is the
+    same creature `TargetWeakest` would have picked by scanning the
+    encounter's creatures.
+
+    Args:
+        key (callable): Priority of a creature as a target. Lower values are
+            better targets. Defaults to the creature's HP.
+    """
+
+    def __init__(self, key=None):
+        self.key = key or attrgetter('hp')
+        self._heaps = {}
+        self._sides = {}
+        self._order = {}
+        self._versions = {}
+
+    def __contains__(self, creature):
+        return creature in self._sides
+
+    def add(self, creature, side):
+        """ Adds a creature to the heap of its side. """
+        self._sides[creature] = side
+        self._order[creature] = len(self._order)
+        self._versions[creature] = 0
+        self._heaps.setdefault(side, [])
+        self._push(creature)
+
+    def update(self, creature):
+        """ Moves a creature after its HP or other priorities changed. """
+        if creature not in self._sides:
+            return
+        self._versions[creature] += 1
+        self._push(creature)
+
+    def best(self, side):
+        """ Best living target on a side, or None if they are all dead. """
+        entry = self._top(side)
+        return None if entry is None else entry[-1]
+
+    def best_enemy(self, side):
+        """ Best living target on any side except `side`. """
+        best = None
+        for other in self._heaps:
+            if other == side:
+                continue
+            entry = self._top(other)
+            if entry is not None and (best is None or entry[:2] < best[:2]):
+                best = entry
+        return None if best is None else best[-1]
+
+    def _push(self, creature):
+        if not creature.is_alive():
+            return
+        heap = self._heaps[self._sides[creature]]
+        heapq.heappush(heap, (
+            self.key(creature),
+            self._order[creature],
+            self._versions[creature],
+            creature
+        ))
+        # Compact the heap when stale entries start to pile up
+        if len(heap) > 64 and len(heap) > 4 * len(self._order):
+            self._rebuild(self._sides[creature])
+
+    def _top(self, side):
+        """ Top entry of a side's heap after dropping stale entries. """
+        heap = self._heaps.get(side, ())
+        while heap:
+            key, order, version, creature = heap[0]
+            if version != self._versions[creature] or not creature.is_alive():
+                heapq.heappop(heap)
+            elif key != self.key(creature):
+                # HP was changed without telling the index
+                self._versions[creature] += 1
+                heapq.heapreplace(heap, (
+                    self.key(creature), order, self._versions[creature],
+                    creature
+                ))
+            else:
+                return heap[0]
+        return None
+
+    def _rebuild(self, side):
+        heap = [
+            entry for entry in self._heaps[side]
+            if entry[2] == self._versions[entry[-1]]
+        ]
+        heapq.heapify(heap)
+        self._heaps[side] = heap
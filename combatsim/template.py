@@ -0,0 +1,156 @@
+""" Compiled creature templates for fast instantiation.
+
+Building a creature with `Creature.from_base` copies the template, builds six
+abilities, equips armor and weapons and works out every derived stat again.
+That's fine for a single encounter, but a simulation does it for every
+creature in every trial.
+
+A `Template` does all of that work once. It builds a single prototype
+creature, precomputes its stat block, and then stamps out new creatures that
+share everything with the prototype except their own HP, spell slots, team
+and position::
+
+    bandits = Monster.compile(bandit)
+    horde = [bandits.stamp(team=2) for _ in range(100)]
+
+Abilities, armor, weapons and spells are shared between every creature
+stamped from the same template, so they must not be modified on a stamped
+creature.
+"""
+
+import copy
+import random
+
+from combatsim.dice import set_source
+
+# Attributes that every stamped creature gets its own copy of.
+_PER_INSTANCE = {
+    'hp', 'max_hp', 'spell_slots', 'team', 'encounter', 'tactics', 'grid',
+    'x', 'y', 'weapons', '_resistances', '_vulnerabilities', '_immunities',
+    'damage_multipliers', 'conditions'
+}
+
+# Template keys that describe a single creature rather than the template.
+_STAMP_KEYS = ('team', 'pos', 'grid', 'hp', 'max_hp')
+
+
+class Template:
+    """ Immutable, precomputed stat block of a creature.
+
+    Args:
+        cls (type): The creature class to build, such as `Monster`.
+        base (dict): Template such as `combatsim.monster_manual.bandit`.
+        **overrides: Values that replace the ones in the template, the same
+            as in `Creature.from_base`.
+
+    Attributes:
+        name (str): Name of the creature.
+        ac (int): Armor class.
+        saves (dict): Saving throw modifier for each ability.
+        attacks (tuple): (name, attack bonus, damage dice, damage bonus,
+            damage type) tuples, one for each weapon.
+        max_hp (int): Fixed max HP, or None if it is rolled for every creature.
+    """
+
+    def __init__(self, cls, base, **overrides):
+        template = base.copy()
+        template.update(overrides)
+        self.cls = cls
+        self.defaults = {
+            key: template.pop(key) for key in _STAMP_KEYS if key in template
+        }
+        self.max_hp = self.defaults.pop('max_hp', None)
+
+        # Building the prototype rolls its hit points. The random state is
+        # restored, and the dice source is set aside, so that compiling a
+        # template never changes the outcome of a seeded or replayed trial.
+        state = random.getstate()
+        source = set_source(None)
+        try:
+            prototype = cls(**template)
+        finally:
+            random.setstate(state)
+            set_source(source)
+        self.prototype = prototype
+
+        self.name = prototype.name
+        self.ac = prototype.ac
+        self.saves = {
+            name: ability.mod for name, ability in prototype.attributes.items()
+        }
+
+        # Weapons get their bonuses fixed so attacks don't need to look at
+        # the abilities of the creature holding them.
+        self.weapons = []
+        for weapon in prototype.weapons:
+            compiled = copy.copy(weapon)
+            compiled.attack_mod = weapon.attack_bonus
+            compiled.damage_mod = weapon.damage_bonus
+            self.weapons.append(compiled)
+        self.attacks = tuple(
+            (w.name, w.attack_mod, w.damage, w.damage_mod, w.damage_type)
+            for w in self.weapons
+        )
+
+        self._tactics = type(prototype.tactics)
+        self._spell_slots = tuple(prototype.spell_slots)
+        self._resistances = tuple(prototype.resistances)
+        self._vulnerabilities = tuple(prototype.vulnerabilities)
+        self._immunities = tuple(prototype.immunities)
+        self._damage_multipliers = tuple(prototype.damage_multipliers)
+        self._conditions = tuple(prototype.conditions)
+        self._shared = {
+            key: value for key, value in vars(prototype).items()
+            if key not in _PER_INSTANCE
+        }
+
+    def __str__(self):
+        return f"Template({self.name})"
+
+    __repr__ = __str__
+
+    def __call__(self, **kwargs):
+        return self.stamp(**kwargs)
+
+    def stamp(self, **kwargs):
+        """ Creates a new creature from this template.
+
+        Keyword Arguments:
+            team: Team of the new creature.
+            pos (tuple): (x, y) position of the creature on `grid`.
+            grid (Grid): Grid the creature is placed on.
+            hp (int): Current HP. Defaults to the max HP.
+            name (str): Name of the creature. Defaults to the template's name.
+
+        Returns:
+            Creature: A creature of the template's class.
+        """
+        options = self.defaults.copy()
+        options.update(kwargs)
+
+        creature = self.cls.__new__(self.cls)
+        creature.__dict__.update(self._shared)
+        if 'name' in options:
+            creature.name = options['name']
+        creature.weapons = list(self.weapons)
+        creature._resistances = list(self._resistances)
+        creature._vulnerabilities = list(self._vulnerabilities)
+        creature._immunities = list(self._immunities)
+        creature.damage_multipliers = list(self._damage_multipliers)
+        creature.conditions = list(self._conditions)
+        creature.spell_slots = list(self._spell_slots)
+        creature.team = options.get('team', None)
+        creature.encounter = None
+
+        if self.max_hp is None:
+            creature.max_hp = creature._calc_hp()
+        else:
+            creature.max_hp = self.max_hp
+        creature.hp = options.get('hp', creature.max_hp)
+        creature.tactics = self._tactics(creature)
+
+        creature.grid = options.get('grid', None)
+        creature.x, creature.y = options.get('pos', (None, None))
+        if creature.x is not None and creature.y is not None:
+            creature.grid[creature.x, creature.y] = creature
+        return creature
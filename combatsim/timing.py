@@ -0,0 +1,101 @@
+""" Schedules things that happen at the start or end of a creature's turn.
+
+Many spells and conditions last "until the end of your next turn" or "until
+the start of your next turn". Every point in combat where that can happen is
+described by a (round, slot, phase) tuple, where the slot is the position of
+a creature in the initiative order and the phase is either `START` or `END`
+of that creature's turn.
+
+Timers are kept in a timing wheel: one bucket per point in time, plus a heap
+of the points that have buckets. Advancing the clock only touches the buckets
+that are due, so expiring effects costs O(expired) no matter how many other
+effects are still running.
+"""
+
+import heapq
+
+START = 0
+END = 1
+
+
+class Timer:
+    """ A callback scheduled by an `EffectScheduler`.
+
+    Attributes:
+        when (tuple): The (round, slot, phase) the callback is called at.
+        callback (callable): Called with no arguments.
+        active (bool): False once the timer has fired or been cancelled.
+    """
+
+    def __init__(self, when, callback):
+        self.when = when
+        self.callback = callback
+        self.active = True
+
+    def cancel(self):
+        self.active = False
+
+
+class EffectScheduler:
+    """ Timing wheel keyed by (round, slot, phase).
+
+    Attributes:
+        now (tuple): The last point in time the scheduler advanced to.
+    """
+
+    def __init__(self):
+        self.now = (0, 0, START)
+        self._buckets = {}
+        self._heap = []
+
+    def __len__(self):
+        return sum(
+            1 for bucket in self._buckets.values()
+            for timer in bucket if timer.active
+        )
+
+    def schedule(self, when, callback):
+        """ Calls `callback` once the scheduler advances to `when`.
+
+        Returns:
+            Timer: Can be used to cancel the callback.
+        """
+        timer = Timer(when, callback)
+        if when not in self._buckets:
+            self._buckets[when] = []
+            heapq.heappush(self._heap, when)
+        self._buckets[when].append(timer)
+        return timer
+
+    def advance(self, round_, slot, phase):
+        """ Moves the clock forward, calling every timer that is now due.
+
+        Returns:
+            int: Number of callbacks that were called.
+        """
+        self.now = (round_, slot, phase)
+        fired = 0
+        while self._heap and self._heap[0] <= self.now:
+            when = heapq.heappop(self._heap)
+            for timer in self._buckets.pop(when):
+                if timer.active:
+                    timer.active = False
+                    timer.callback()
+                    fired += 1
+        return fired
+
+    def next_turn(self, round_, slot, phase):
+        """ Point in time of the next turn of the creature in `slot`.
+
+        A turn counts as the next one only if it hasn't started yet. So when a
+        creature casts a spell during its own turn, its next turn is the one
+        in the following round.
+
+        Args:
+            round_ (int): The current round.
+            slot (int): Initiative slot of the creature.
+            phase (int): `START` or `END` of the turn.
+        """
+        if (round_, slot, START) <= self.now:
+            round_ += 1
+        return (round_, slot, phase)
@@ -0,0 +1,157 @@
+""" Initiative order that can change in the middle of combat.
+
+Creatures take their turns in a doubly linked list ordered by initiative, so
+creatures can be removed when they die and summoned creatures can join the
+order without the rest of it being rebuilt. Walking the order is safe while
+creatures are being added and removed.
+
+Every creature in the order has a slot, which is used by
+`combatsim.timing.EffectScheduler` to tell turns apart. Slots only ever
+increase along the order. Creatures placed at the start of combat get the
+slots 0, 1, 2, and so on, and creatures that join later get a slot between
+their neighbours.
+"""
+
+import math
+
+
+def tiebreak(creature):
+    """ Dexterity score, which breaks ties in initiative. """
+    dexterity = getattr(creature, 'dexterity', None)
+    return 0 if dexterity is None else int(dexterity.value)
+
+
+class Turn:
+    """ A creature's place in the initiative order. """
+
+    __slots__ = ('creature', 'initiative', 'slot', 'prev', 'next', 'active')
+
+    def __init__(self, creature, initiative, slot):
+        self.creature = creature
+        self.initiative = initiative
+        self.slot = slot
+        self.prev = None
+        self.next = None
+        self.active = False
+
+    @property
+    def key(self):
+        """ Sort key. Higher initiative, then higher dexterity, goes first. """
+        return (self.initiative, tiebreak(self.creature))
+
+    def __repr__(self):
+        return f"Turn({self.creature}, {self.initiative}, slot={self.slot})"
+
+
+class TurnOrder:
+    """ Creatures in initiative order.
+
+    Attributes:
+        slots (dict): Slot of every creature that has been in the order.
+    """
+
+    def __init__(self):
+        self.slots = {}
+        self._turns = {}
+        self._head = Turn(None, None, None)
+        self._tail = Turn(None, None, None)
+        self._head.next = self._tail
+        self._tail.prev = self._head
+        self._length = 0
+        self._last_slot = -1
+
+    def __len__(self):
+        return self._length
+
+    def __contains__(self, creature):
+        turn = self._turns.get(creature)
+        return turn is not None and turn.active
+
+    def __iter__(self):
+        """ Yields the turns of the current round.
+
+        Creatures removed during the round are skipped, and creatures added
+        after the turn being taken get their turn later in the same round.
+        """
+        turn = self._head.next
+        while turn is not self._tail:
+            if turn.active:
+                yield turn
+            turn = turn.next
+
+    def creatures(self):
+        return [turn.creature for turn in self]
+
+    def add(self, creature, initiative):
+        """ Adds a creature in initiative order.
+
+        Creatures tied on initiative and dexterity go after the creatures
+        that were already in the order.
+
+        Returns:
+            Turn: The creature's place in the order.
+        """
+        if creature in self:
+            raise ValueError(f"{creature} is already in the initiative order")
+
+        turn = Turn(creature, initiative, None)
+        after = self._place(turn)
+        turn.slot = self._slot_between(after, after.next)
+        self._link(turn, after)
+        return turn
+
+    def remove(self, creature):
+        """ Takes a creature out of the order, such as when it dies. """
+        turn = self._turns.get(creature)
+        if turn is None or not turn.active:
+            return
+        turn.prev.next = turn.next
+        turn.next.prev = turn.prev
+        # The removed turn keeps its own links so a walk that is currently
+        # on it can carry on to the next turn.
+        turn.active = False
+        self._length -= 1
+
+    def restore(self, creature):
+        """ Puts a removed creature back, such as when it is revived.
+
+        The creature keeps its old slot unless creatures that joined in the
+        meantime took its place.
+        """
+        turn = self._turns.get(creature)
+        if turn is None or turn.active:
+            return
+        after = self._place(turn)
+        before_slot = None if after is self._head else after.slot
+        after_slot = None if after.next is self._tail else after.next.slot
+        if (
+            (before_slot is not None and turn.slot <= before_slot)
+            or (after_slot is not None and turn.slot >= after_slot)
+        ):
+            turn.slot = self._slot_between(after, after.next)
+        self._link(turn, after)
+
+    def _place(self, turn):
+        """ Turn that `turn` should be linked after. """
+        after = self._tail.prev
+        while after is not self._head and after.key < turn.key:
+            after = after.prev
+        return after
+
+    def _link(self, turn, after):
+        turn.prev = after
+        turn.next = after.next
+        after.next.prev = turn
+        after.next = turn
+        turn.active = True
+        self._turns[turn.creature] = turn
+        self.slots[turn.creature] = turn.slot
+        self._last_slot = max(self._last_slot, turn.slot)
+        self._length += 1
+
+    def _slot_between(self, before, after):
+        if after is self._tail:
+            return math.floor(self._last_slot) + 1
+        if before is self._head:
+            return after.slot - 1
+        return (before.slot + after.slot) / 2
@@ -1,9 +1,39 @@
+import copy
+
 import pytest
 
 from combatsim.creature import Monster
 from combatsim.encounter import Encounter
+from combatsim.encounter_file import EncounterFile
 from combatsim.event import EventLog
 
+DUEL = {
+    'combatants': [
+        {'template': "knight", 'team': 1},
+        {'template': "bandit", 'team': 2, 'count': 2},
+    ]
+}
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--benchmark", action="store_true",
+        help="run timing tests, which can fail on a busy machine"
+    )
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers", "benchmark: timing test, only run with --benchmark"
+    )
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--benchmark"):
+        return
+    skip = pytest.mark.skip(reason="timing test, run with --benchmark")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip)
+
 
 @pytest.fixture
 def encounter():
@@ -16,3 +46,14 @@ def event_log(encounter):
 @pytest.fixture
 def monster():
     return Monster()
+
+@pytest.fixture
+def duel():
+    """ Builds encounter files of a knight fighting two bandits.
+
+    Keyword arguments are added to the top level of the file, such as
+    `seed=3` or `grid=[5, 5]`. Every call returns a new definition.
+    """
+    def make(**changes):
+        return EncounterFile(dict(copy.deepcopy(DUEL), **changes))
+    return make
@@ -14,6 +14,7 @@ from tests.mock_dice import MockDice
 def test_acid_splash_against_single_enemy(event_log):
     print("HELLO:", repr(event_log))
     import combatsim.cantrips as cantrips  # Must go here so we can mock out dice
+    from combatsim.spells import Damage
 
     # Let's say we have a wizard fighting against a kobold. The wizard only
     # knows acid splash, and the two combatants are 60 feet from each other.
@@ -30,7 +31,7 @@ def test_acid_splash_against_single_enemy(event_log):
     # The wizard casts acid splash at the kobold, and the kobold fails its
     # dexterity save, thus receiving acid damage.
     MockDice.set_roll(kobold.saving_throw, '1d20', MockDice.value < wizard.spell_dc)
-    MockDice.set_roll(cantrips.CantripDamage.activate, '1d6', MockDice.value == 1)
+    MockDice.set_roll(Damage.activate, '1d6', MockDice.value == 1)
     wizard.cast(cantrips.acid_splash, 0, targets=[kobold])
     assert kobold.hp == 6-(1 + wizard.spellcasting)
 
@@ -43,6 +44,8 @@ def test_acid_splash_against_single_enemy(event_log):
 @MockDice.patch('combatsim.creature', 'combatsim.spells')
 def test_acid_splash_against_two_enemies(event_log):
     import combatsim.cantrips as cantrips  # Must go here so we can mock out dice
+    from combatsim.creature import roll_saving_throws
+    from combatsim.spells import Damage
 
     # Let's say we have a wizard fighting against two kobolds. The wizard
     # only knows acid splash, and the two kobolds are 60 feet from the
@@ -53,19 +56,20 @@ def test_acid_splash_against_two_enemies(event_log):
     kobold2 = Monster(level=1, max_hp=6, pos=(0,58), grid=grid)
 
     # The wizard casts acid splash at the kobolds, and one kobold passes
-    # its saving throw while the other fails.
-    MockDice.set_roll(kobold1.saving_throw, '1d20', MockDice.value > wizard.spell_dc)
-    MockDice.set_roll(kobold2.saving_throw, '1d20', MockDice.value < wizard.spell_dc)
-    MockDice.set_roll(cantrips.CantripDamage.activate, '1d6', MockDice.value == 1)
+    # its saving throw while the other fails. Saves against two targets are
+    # rolled in one batch, in target order.
+    saves = [wizard.spell_dc + 1, wizard.spell_dc - 1]
+    MockDice.set_roll(roll_saving_throws, '1d20', saves)
+    MockDice.set_roll(Damage.activate, '1d6', MockDice.value == 1)
     wizard.cast(cantrips.acid_splash, 0, targets=[kobold1, kobold2])
     assert kobold1.hp == 6
     assert kobold2.hp == 6-(1 + wizard.spellcasting)
 
     # The wizard casts acid splash at the kobolds again, and both kobolds
     # fail their dexterity saves, thus receiving acid damage.
-    MockDice.set_roll(kobold1.saving_throw, '1d20', MockDice.value < wizard.spell_dc)
-    MockDice.set_roll(kobold2.saving_throw, '1d20', MockDice.value < wizard.spell_dc)
-    MockDice.set_roll(cantrips.CantripDamage.activate, '1d6', MockDice.value == 1)
+    saves = [wizard.spell_dc - 1, wizard.spell_dc - 1]
+    MockDice.set_roll(roll_saving_throws, '1d20', saves)
+    MockDice.set_roll(Damage.activate, '1d6', MockDice.value == 1)
     wizard.cast(cantrips.acid_splash, 0, targets=[kobold1, kobold2])
     assert kobold1.hp == 6-(1 + wizard.spellcasting)
     assert kobold2.hp == 6-(2*(1 + wizard.spellcasting))
@@ -95,9 +99,32 @@ def test_acid_splash_against_three_enemies(event_log):
     with pytest.raises(RulesError):
         wizard.cast(cantrips.acid_splash, 0, targets=[kobold1, kobold2, kobold3])
 
-#
-## TODO (phillip): Write these tests.
-#def TestBladeWard(unittest.TestCase):
-#
-#    def __init__(self):
-#        pass
+def test_blade_ward_lasts_until_end_of_next_turn(event_log):
+    import combatsim.cantrips as cantrips
+    from combatsim.encounter import Encounter
+    from combatsim.timing import END, START
+
+    # A wizard and a fighter are in an encounter. The wizard acts first.
+    grid = Grid(1,10)
+    wizard = Monster(level=1, pos=(0,0), grid=grid, spells=[cantrips.blade_ward])
+    fighter = Monster(level=1, pos=(0,1), grid=grid)
+    encounter = Encounter([wizard, fighter])
+    encounter.slots = {wizard: 0, fighter: 1}
+
+    # On its first turn, the wizard casts blade ward and gains resistance to
+    # bludgeoning, piercing and slashing damage.
+    encounter.combat_round = 1
+    encounter.timing.advance(1, 0, START)
+    wizard.cast(cantrips.blade_ward, 0, targets=[wizard])
+    assert 'slashing' in wizard.resistances
+
+    # The resistance lasts through the fighter's turn, and through the
+    # wizard's next turn.
+    encounter.timing.advance(1, 1, END)
+    encounter.combat_round = 2
+    encounter.timing.advance(2, 0, START)
+    assert 'slashing' in wizard.resistances
+
+    # At the end of the wizard's next turn, the resistance ends.
+    encounter.timing.advance(2, 0, END)
+    assert wizard.resistances == []
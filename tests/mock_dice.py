@@ -68,6 +68,25 @@ class MockDice:
         return a randomized value using the default Dice class.
         """
         print("ROLL:", self._dice)
+        value = self._mocked()
+        if value is None:
+            return Dice(self._dice).roll()
+        return value
+
+    def roll_many(self, count):
+        """ Batched version of `roll`.
+
+        The attached value is used as the list of totals, so set one value
+        per roll in the batch.
+        """
+        print("ROLL MANY:", self._dice, count)
+        value = self._mocked()
+        if value is None:
+            return Dice(self._dice).roll_many(count)
+        return list(value)
+
+    def _mocked(self):
+        """ Returns the value attached to a frame in the stack, or None. """
         for f in inspect.stack():
             if 'self' in f.frame.f_locals:
                 obj_id = id(f.frame.f_locals['self'])
@@ -104,7 +123,7 @@ class MockDice:
 
         # Case: Not found
         print(f"MOCK DICE::{self._dice}::not_found")
-        return Dice(self._dice).roll()
+        return None
 
     def __add__(self, other):
         return self
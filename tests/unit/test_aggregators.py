@@ -0,0 +1,76 @@
+import random
+import statistics
+
+import pytest
+
+from combatsim.aggregators import Histogram, KillCounts, RunningMean, TDigest
+from combatsim.simulation import TrialResult
+
+
+def record(rounds=1, winner=1, kills=(0, 0)):
+    return TrialResult(0, 0, winner, rounds, (0, 0), (0, 0), kills)
+
+def test_running_mean_matches_statistics():
+    values = [1, 5, 2, 8, 3]
+    mean = RunningMean('rounds')
+    for value in values:
+        mean.add(record(rounds=value))
+    assert mean.mean == pytest.approx(statistics.mean(values))
+    assert mean.variance == pytest.approx(statistics.variance(values))
+
+def test_running_mean_merge():
+    first, second, combined = (RunningMean(lambda r: r.rounds) for _ in range(3))
+    for value in range(10):
+        (first if value < 4 else second).add(record(rounds=value))
+        combined.add(record(rounds=value))
+    first.merge(second)
+    assert first.count == combined.count
+    assert first.mean == pytest.approx(combined.mean)
+    assert first.variance == pytest.approx(combined.variance)
+
+def test_histogram_counts_values():
+    wins = Histogram('winner')
+    for winner in [1, 1, 2, None]:
+        wins.add(record(winner=winner))
+    assert wins.counts[1] == 2
+    assert wins.frequency(2) == 0.25
+
+def test_kill_counts_sum_per_creature():
+    kills = KillCounts()
+    kills.add(record(kills=(1, 0)))
+    kills.add(record(kills=(1, 1)))
+    other = KillCounts()
+    other.add(record(kills=(0, 3)))
+    kills.merge(other)
+    assert kills.kills == [2, 4]
+
+def test_tdigest_quantiles_are_close():
+    rng = random.Random(1)
+    values = [rng.random() for _ in range(20000)]
+    digest = TDigest('rounds')
+    for value in values:
+        digest.add_value(value)
+    values.sort()
+    for q in [0.01, 0.25, 0.5, 0.75, 0.99]:
+        assert digest.quantile(q) == pytest.approx(values[int(q * len(values))], abs=0.01)
+    assert len(digest.centroids) < 200
+
+def test_tdigest_merge():
+    first, second = TDigest('rounds'), TDigest('rounds')
+    for value in range(1000):
+        (first if value % 2 else second).add_value(value)
+    first.merge(second)
+    assert first.count == 1000
+    assert first.quantile(0.5) == pytest.approx(500, abs=10)
+
+def test_tdigest_merge_empty():
+    empty = TDigest('rounds')
+    empty.merge(TDigest('rounds'))
+    assert empty.count == 0
+    assert empty.quantile(0.5) is None
+
+    digest = TDigest('rounds')
+    digest.add_value(3)
+    digest.merge(empty)
+    empty.merge(digest)
+    assert digest.quantile(0.5) == empty.quantile(0.5) == 3
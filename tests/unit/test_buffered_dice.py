@@ -0,0 +1,86 @@
+import random
+import timeit
+from collections import Counter
+
+import pytest
+
+numpy = pytest.importorskip("numpy")
+
+from combatsim import dice
+from combatsim.buffered_dice import BufferedSource
+from combatsim.dice import Dice
+from combatsim.items import Weapon
+
+# Chi-squared critical values at p = 0.001 for each die's degrees of freedom
+CRITICAL = {4: 16.27, 6: 20.52, 8: 24.32, 10: 27.88, 12: 31.26, 20: 43.82}
+
+
+@pytest.fixture
+def buffered():
+    source = BufferedSource(seed=1234, size=1000)
+    previous = dice.set_source(source)
+    yield source
+    dice.set_source(previous)
+
+
+@pytest.mark.parametrize("faces", sorted(CRITICAL))
+def test_rolls_are_uniform(faces):
+    source = BufferedSource(seed=faces)
+    counts = Counter(source.roll(faces) for _ in range(60000))
+    assert set(counts) == set(range(1, faces + 1))
+    expected = 60000 / faces
+    chi_squared = sum(
+        (counts[face] - expected) ** 2 / expected
+        for face in range(1, faces + 1)
+    )
+    assert chi_squared < CRITICAL[faces]
+
+def test_buffers_refill():
+    source = BufferedSource(seed=1, size=10)
+    rolls = [source.roll(6) for _ in range(25)]
+    assert all(1 <= roll <= 6 for roll in rolls)
+    assert all(isinstance(roll, int) for roll in rolls)
+
+def test_roll_many_spans_refills():
+    source = BufferedSource(seed=1, size=10)
+    source.roll(20)
+    rolls = source.roll_many(20, 35)
+    assert len(rolls) == 35
+    assert all(1 <= roll <= 20 for roll in rolls)
+
+def test_same_seed_rolls_same_dice():
+    first, second = BufferedSource(seed=5), BufferedSource(seed=5)
+    assert [first.roll(20) for _ in range(100)] == [
+        second.roll(20) for _ in range(100)
+    ]
+
+def test_dice_use_buffered_source(buffered):
+    state = random.getstate()
+    rolls = (Dice("2d6") + 1).roll() + Dice("1d20").roll_many(5)
+    assert random.getstate() == state
+    assert 3 <= rolls[0] <= 13
+    assert all(1 <= roll <= 20 for roll in rolls[1:])
+
+def test_advantage_uses_buffered_source(buffered):
+    weapon = Weapon("Club", Dice("1d4"), "bludgeoning", attack_mod=0)
+    state = random.getstate()
+    rolls = [weapon.attack_roll(advantage=True)[0] for _ in range(2000)]
+    assert random.getstate() == state
+    # The average of the higher of two d20s is 13.825
+    assert abs(sum(rolls) / len(rolls) - 13.825) < 0.5
+
+def test_saving_throw_uses_buffered_source(buffered, monster):
+    state = random.getstate()
+    monster.saving_throw("dexterity", 10)
+    assert random.getstate() == state
+
+@pytest.mark.benchmark
+def test_buffered_rolls_are_faster_than_randint():
+    source = BufferedSource(seed=1)
+    buffered = min(timeit.repeat(
+        lambda: source.roll(20), number=20000, repeat=5
+    ))
+    randint = min(timeit.repeat(
+        lambda: random.randint(1, 20), number=20000, repeat=5
+    ))
+    assert buffered < randint
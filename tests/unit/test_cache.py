@@ -0,0 +1,78 @@
+import pytest
+
+from combatsim.aggregators import Histogram, RunningMean
+from combatsim.cache import ResultCache, fingerprint, run_cached
+from combatsim.creature import Monster
+from combatsim.dice import Dice
+from combatsim.items import Weapon
+from combatsim.monster_manual import bandit
+
+
+@pytest.fixture
+def cache():
+    with ResultCache(":memory:") as cache:
+        yield cache
+
+def test_fingerprint_is_stable_for_equal_definitions(duel):
+    assert fingerprint(duel(), 100, 1) == fingerprint(duel(), 100, 1)
+
+def test_fingerprint_changes_with_definition(duel):
+    expected = fingerprint(duel(), 100, 1)
+    stronger = duel().add(Monster, bandit, team=2, strength=18)
+    assert fingerprint(duel(grid=[5, 5]), 100, 1) != expected
+    assert fingerprint(stronger, 100, 1) != expected
+    assert fingerprint(duel(), 200, 1) != expected
+    assert fingerprint(duel(), 100, 2) != expected
+
+def test_fingerprint_includes_weapon_stats():
+    first = {'weapons': [Weapon("Sword", Dice("1d8"), "slashing")]}
+    second = {'weapons': [Weapon("Sword", Dice("1d10"), "slashing")]}
+    assert fingerprint(first) != fingerprint(second)
+
+def test_fingerprint_distinguishes_aggregator_keys():
+    assert fingerprint(RunningMean('rounds')) != fingerprint(RunningMean('winner'))
+
+def test_cache_round_trip(cache):
+    cache.put("key", {'wins': 3})
+    assert "key" in cache
+    assert cache.get("key") == {'wins': 3}
+    assert cache.get("missing") is None
+
+def test_cache_evicts_least_recently_used(cache):
+    cache.max_bytes = 250
+    cache.put("a", b"x" * 100)
+    cache.put("b", b"x" * 100)
+    cache.get("a")
+    cache.put("c", b"x" * 100)
+    assert "a" in cache
+    assert "b" not in cache
+    assert "c" in cache
+
+def test_cache_persists_on_disk(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    with ResultCache(path) as cache:
+        cache.put("key", [1, 2, 3])
+    with ResultCache(path) as cache:
+        assert cache.get("key") == [1, 2, 3]
+
+def test_run_cached_only_computes_once(cache, duel):
+    first = run_cached(cache, duel(), 20, [Histogram('winner')], seed=1)
+    assert len(cache) == 1
+    second = run_cached(cache, duel(), 20, [Histogram('winner')], seed=1)
+    assert first[0].counts == second[0].counts
+    assert len(cache) == 1
+    run_cached(cache, duel(), 21, [Histogram('winner')], seed=1)
+    assert len(cache) == 2
+
+def test_run_cached_fills_aggregators_on_hit(cache, duel):
+    first = [Histogram('winner'), RunningMean('rounds')]
+    run_cached(cache, duel(), 20, first, seed=1)
+    second = [Histogram('winner'), RunningMean('rounds')]
+    assert run_cached(cache, duel(), 20, second, seed=1) is second
+    assert second[0].counts == first[0].counts
+    assert sum(second[0].counts.values()) == 20
+    assert second[1].mean == first[1].mean
+
+def test_run_cached_requires_seed(cache, duel):
+    with pytest.raises(ValueError):
+        run_cached(cache, duel(), 20, [Histogram('winner')], seed=None)
@@ -0,0 +1,127 @@
+import csv
+import json
+import sqlite3
+
+import pytest
+
+from combatsim.catalog import MonsterCatalog, normalize_cr
+from combatsim.creature import Monster
+from combatsim.dice import Dice
+from combatsim.template import Template
+
+RECORDS = [
+    {
+        "name": "Bandit", "cr": "1/8", "type": "humanoid", "level": 2,
+        "strength": 11, "dexterity": 12, "hd": "1d8",
+        "armor": {"name": "Leather", "base_ac": 11},
+        "weapons": [{
+            "name": "Scimitar", "damage": "1d6", "damage_type": "slashing",
+            "attack_mod": 3, "damage_mod": 1
+        }]
+    },
+    {
+        "name": "Skeleton", "cr": 0.25, "type": "undead", "ac": 13,
+        "vulnerabilities": ["bludgeoning"], "resistances": []
+    },
+    {
+        "name": "Ghoul", "cr": 1, "xp": 200, "type": "undead",
+        "resistances": ["necrotic", "poison"]
+    }
+]
+
+def write_json(path):
+    path.write_text(json.dumps(RECORDS))
+    return str(path)
+
+def write_csv(path):
+    fields = sorted({key for record in RECORDS for key in record})
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fields)
+        writer.writeheader()
+        for record in RECORDS:
+            writer.writerow({
+                k: json.dumps(v) if isinstance(v, (list, dict)) else v
+                for k, v in record.items()
+            })
+    return str(path)
+
+def write_sqlite(path):
+    db = sqlite3.connect(str(path))
+    db.execute(
+        "CREATE TABLE monsters (name TEXT, cr TEXT, xp INTEGER, type TEXT, "
+        "ac INTEGER, resistances TEXT)"
+    )
+    for record in RECORDS:
+        db.execute("INSERT INTO monsters VALUES (?, ?, ?, ?, ?, ?)", (
+            record["name"], str(record["cr"]), record.get("xp"),
+            record["type"], record.get("ac"),
+            json.dumps(record.get("resistances", []))
+        ))
+    db.commit()
+    db.close()
+    return str(path)
+
+@pytest.fixture(params=[
+    ("monsters.json", write_json),
+    ("monsters.csv", write_csv),
+    ("monsters.sqlite", write_sqlite),
+])
+def catalog_path(request, tmp_path):
+    name, write = request.param
+    return write(tmp_path / name)
+
+def test_load_catalog_formats(catalog_path):
+    catalog = MonsterCatalog.load(catalog_path)
+    assert len(catalog) == 3
+    assert "ghoul" in catalog
+    assert catalog.by_type("Undead") == ["Skeleton", "Ghoul"]
+    assert catalog.resistant_to("poison") == ["Ghoul"]
+
+def test_catalog_is_cached(catalog_path):
+    MonsterCatalog.load(catalog_path)
+    cached = MonsterCatalog.load(catalog_path)
+    assert cached.by_cr("1/4") == ["Skeleton"]
+
+def test_stale_cache_is_ignored(tmp_path):
+    path = write_json(tmp_path / "monsters.json")
+    MonsterCatalog.load(path)
+    (tmp_path / "monsters.json").write_text(json.dumps(RECORDS[:1]))
+    assert len(MonsterCatalog.load(path)) == 1
+
+def test_lookup_by_cr_and_xp():
+    catalog = MonsterCatalog(RECORDS)
+    assert catalog.by_cr(0.125) == ["Bandit"]
+    assert catalog.by_cr("1") == ["Ghoul"]
+    assert catalog.by_xp(25) == ["Bandit"]
+    assert catalog.by_xp(25, 100) == ["Bandit", "Skeleton"]
+
+def test_record_is_materialized_into_template():
+    catalog = MonsterCatalog(RECORDS)
+    base = catalog["bandit"]
+    assert base['hd'] == Dice("1d8")
+    assert base['weapons'][0].attack_mod == 3
+    assert base['armor'].base_ac == 11
+    bandit = Monster.from_base(base)
+    assert bandit.ac == 12
+    assert catalog["Bandit"] is base
+
+def test_compiled_templates_are_reused():
+    catalog = MonsterCatalog(RECORDS)
+    template = catalog.template("Skeleton")
+    assert isinstance(template, Template)
+    assert catalog.template("skeleton") is template
+    assert template.stamp().vulnerabilities == ["bludgeoning"]
+
+def test_missing_monster_raises_key_error():
+    with pytest.raises(KeyError):
+        MonsterCatalog(RECORDS)["Dragon"]
+
+def test_duplicate_monster_raises_error():
+    with pytest.raises(ValueError):
+        MonsterCatalog(RECORDS + RECORDS[:1])
+
+@pytest.mark.parametrize("cr,expected", [
+    (0.125, "1/8"), ("0.5", "1/2"), ("1/4", "1/4"), (3, "3")
+])
+def test_normalize_cr(cr, expected):
+    assert normalize_cr(cr) == expected
@@ -0,0 +1,92 @@
+from collections import Counter
+import json
+import subprocess
+import sys
+
+import pytest
+
+from combatsim.aggregators import Histogram
+from combatsim.cli import main, margin
+from combatsim.simulation import read_results
+
+
+@pytest.fixture
+def encounter(tmp_path, duel):
+    path = tmp_path / "ambush.json"
+    path.write_text(json.dumps(duel(name="Ambush", seed=3, trials=50).data))
+    return str(path)
+
+
+def run_json(capsys, *args):
+    assert main(list(args) + ["--format", "json"]) == 0
+    return json.loads(capsys.readouterr().out)
+
+
+def test_table(encounter, capsys):
+    assert main([encounter]) == 0
+    out = capsys.readouterr().out
+    assert out.startswith("Ambush\n50 trials, seed 3\n")
+    assert "win rate" in out
+
+def test_json_uses_file_defaults(encounter, capsys):
+    data = run_json(capsys, encounter)
+    assert data['trials'] == 50
+    assert data['seed'] == 3
+    assert sum(data['wins'].values()) == 50
+    assert sum(data['win_rates'].values()) == pytest.approx(1)
+
+def test_workers_dont_change_results(encounter, capsys):
+    single = run_json(capsys, encounter, "-n", "120", "--chunk-size", "25")
+    pooled = run_json(
+        capsys, encounter, "-n", "120", "--chunk-size", "25", "-w", "3"
+    )
+    assert single == pooled
+
+def test_precision_stops_early(encounter, capsys):
+    data = run_json(
+        capsys, encounter, "-n", "100000", "--chunk-size", "100",
+        "--precision", "0.1"
+    )
+    assert data['trials'] < 1000
+    assert data['margin'] <= 0.1
+
+def test_binary_output(encounter, tmp_path):
+    output = str(tmp_path / "results.bin")
+    assert main([
+        encounter, "-n", "70", "-w", "2", "--chunk-size", "20",
+        "--format", "binary", "-o", output
+    ]) == 0
+    results = list(read_results(output))
+    assert [r.index for r in results] == list(range(70))
+    assert {r.seed >> 32 for r in results} == {3}
+
+def test_profile(encounter, capsys):
+    assert main([encounter, "-n", "5", "--profile"]) == 0
+    assert "cumulative" in capsys.readouterr().err
+
+def test_bad_file(tmp_path, capsys):
+    path = tmp_path / "bad.json"
+    path.write_text(json.dumps({'combatants': [{'template': "dragon"}]}))
+    with pytest.raises(SystemExit) as exit:
+        main([str(path)])
+    assert exit.value.code == 2
+    assert "combatants[0].template" in capsys.readouterr().err
+
+def test_margin():
+    histogram = Histogram('winner')
+    histogram.counts.update({1: 500, 2: 500})
+    assert margin(histogram) == pytest.approx(0.031, abs=0.001)
+    histogram.counts = Counter({1: 100})
+    assert 0 < margin(histogram) < 0.03
+
+def test_startup_skips_heavy_modules():
+    code = (
+        "import sys, combatsim.cli, combatsim.encounter_file; "
+        "print(sorted({'numpy', 'multiprocessing', 'asyncio', 'cProfile'}"
+        " & set(sys.modules)))"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True,
+        check=True
+    ).stdout
+    assert out.strip() == "[]"
@@ -109,6 +109,22 @@ def test_create_multiple_creatures_from_base_with_customizations():
     assert creature1.strength == Ability("Strength", 15)
     assert creature2.strength == Ability("Strength", 12)
 
+def test_resistances_are_not_shared_between_creatures_from_base():
+    from combatsim.cantrips import blade_ward
+    base = {'name': "Test", 'resistances': [], 'spells': [blade_ward]}
+    warded = Monster.from_base(base)
+    other = Monster.from_base(base)
+    warded.cast(blade_ward, 0, [warded])
+    assert 'slashing' in warded.resistances
+    assert base['resistances'] == []
+    assert other.resistances == []
+    other.hp = other.max_hp = 10
+    other.take_damage(4, 'slashing')
+    assert other.hp == 6
+    warded.hp = warded.max_hp = 10
+    warded.take_damage(4, 'slashing')
+    assert warded.hp == 8
+
 def test_creature_max_hp_is_at_least_1():
     creature = Creature(level=1, hd=Dice("1d1"), constitution=2)
     assert creature.max_hp == 1
@@ -155,3 +171,25 @@ def test_vulnerabilities(test_creature):
     before = test_creature.hp
     test_creature.take_damage(1, 'acid')
     assert test_creature.hp == before - 2
+
+def test_immunities(test_creature):
+    test_creature.immunities = ['poison']
+    before = test_creature.hp
+    assert test_creature.take_damage(3, 'poison') == 0
+    assert test_creature.hp == before
+
+def test_added_resistances_stack_until_removed(test_creature):
+    test_creature.hp = test_creature.max_hp = 20
+    test_creature.add_resistances(['fire'])
+    test_creature.add_resistances(['fire'])
+    test_creature.remove_resistances(['fire'])
+    test_creature.take_damage(4, 'fire')
+    assert test_creature.hp == 18
+    test_creature.remove_resistances(['fire'])
+    test_creature.take_damage(4, 'fire')
+    assert test_creature.hp == 14
+
+def test_damage_type_interned_after_creation(test_creature):
+    test_creature.hp = test_creature.max_hp = 20
+    test_creature.take_damage(3, 'brand-new-type')
+    assert test_creature.hp == 17
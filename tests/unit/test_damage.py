@@ -0,0 +1,37 @@
+from combatsim.damage import (
+    DAMAGE_TYPES, IMMUNE, NORMAL, RESISTANT, UNTYPED, VULNERABLE,
+    damage_multipliers, damage_type_id, damage_type_name
+)
+
+
+def test_damage_types_have_small_unique_ids():
+    ids = [damage_type_id(t) for t in DAMAGE_TYPES]
+    assert len(set(ids)) == len(DAMAGE_TYPES)
+    assert max(ids) == len(DAMAGE_TYPES)
+    assert damage_type_id(None) == UNTYPED
+
+def test_damage_type_name_round_trip():
+    assert damage_type_name(damage_type_id("fire")) == "fire"
+
+def test_unknown_damage_types_are_interned():
+    first = damage_type_id("homebrew-psionic")
+    assert first == damage_type_id("homebrew-psionic")
+    assert first > len(DAMAGE_TYPES)
+
+def test_multipliers():
+    multipliers = damage_multipliers(
+        resistances=["fire"], vulnerabilities=["cold"], immunities=["poison"]
+    )
+    assert multipliers[damage_type_id("fire")] == RESISTANT
+    assert multipliers[damage_type_id("cold")] == VULNERABLE
+    assert multipliers[damage_type_id("poison")] == IMMUNE
+    assert multipliers[damage_type_id("acid")] == NORMAL
+    assert multipliers[UNTYPED] == NORMAL
+
+def test_immunity_beats_resistance_beats_vulnerability():
+    multipliers = damage_multipliers(
+        resistances=["fire", "cold"], vulnerabilities=["fire"],
+        immunities=["cold"]
+    )
+    assert multipliers[damage_type_id("fire")] == RESISTANT
+    assert multipliers[damage_type_id("cold")] == IMMUNE
@@ -55,3 +55,12 @@ def test_add_int():
 def test_sub_int():
     dice = Dice("1d20") - 1
     assert dice == Dice("1d20") + Modifier(-1)
+
+def test_roll_many_returns_one_total_per_roll():
+    rolls = Dice("2d6").roll_many(500)
+    assert len(rolls) == 500
+    assert min(rolls) >= 2
+    assert max(rolls) <= 12
+
+def test_roll_many_includes_modifiers():
+    assert Dice("1d1", [Modifier(3)]).roll_many(3) == [4, 4, 4]
@@ -0,0 +1,110 @@
+import pytest
+
+from combatsim import difficulty
+from combatsim.cache import ResultCache
+from combatsim.creature import Monster
+from combatsim.difficulty import Calibration, Combatant, rate
+from combatsim.dice import Dice
+from combatsim.encounter import EncounterDefinition
+from combatsim.items import Weapon
+from combatsim import dpr
+
+
+def combatant(team, level=1, xp=0, hp=10, ac=12):
+    weapon = Weapon("Club", Dice("1d6"), "bludgeoning", attack_mod=4,
+                    damage_mod=2)
+    return Combatant("Test", team, level, xp, hp, ac,
+                     dpr.attack_profile(weapon))
+
+def ambush(bandits):
+    from combatsim.monster_manual import bandit
+    from combatsim.sample_creatures import knight
+    definition = EncounterDefinition()
+    definition.add(Monster, knight, team=1)
+    for _ in range(bandits):
+        definition.add(Monster, bandit, team=2)
+    return definition
+
+
+def test_xp_thresholds():
+    assert difficulty.xp_thresholds([1, 1, 1, 1]) == (100, 200, 300, 400)
+    assert difficulty.xp_thresholds([5, 25]) == (3050, 6200, 9250, 13800)
+
+@pytest.mark.parametrize("monsters,party,multiplier", [
+    (1, 4, 1), (2, 4, 1.5), (3, 4, 2), (6, 4, 2), (7, 4, 2.5), (15, 4, 4),
+    (1, 2, 1.5), (1, 6, 0.5), (15, 1, 5),
+])
+def test_encounter_multiplier(monsters, party, multiplier):
+    assert difficulty.encounter_multiplier(monsters, party) == multiplier
+
+def test_rate_by_xp():
+    party = [combatant(1) for _ in range(4)]
+    assert rate(party, [combatant(2, xp=50)]).rating == "trivial"
+    assert rate(party, [combatant(2, xp=200)]).rating == "medium"
+    hard = rate(party, [combatant(2, xp=100) for _ in range(2)])
+    assert hard.xp == 200
+    assert hard.adjusted_xp == 300
+    assert hard.rating == "hard"
+    assert rate(party, [combatant(2, xp=1000)]).rating == "deadly"
+
+def test_even_fight_scores_zero():
+    calibration = Calibration(0.0, 3.0)
+    even = rate([combatant(1)], [combatant(2)], calibration)
+    assert even.score == pytest.approx(0)
+    assert even.loss_chance == pytest.approx(0.5)
+
+    stronger = rate([combatant(1)], [combatant(2, hp=20)], calibration)
+    assert stronger.score > 0
+    assert stronger.loss_chance > 0.5
+
+def test_rate_needs_both_sides():
+    with pytest.raises(ValueError):
+        rate([combatant(1)], [])
+
+def test_estimate_definition():
+    estimate = difficulty.estimate(ambush(4))
+    assert estimate.xp == 100
+    assert estimate.adjusted_xp == 250
+    assert estimate.rating == "easy"
+    assert difficulty.estimate(ambush(8)).score > estimate.score
+
+def test_xp_from_challenge_rating():
+    from combatsim.encounter_file import EncounterFile
+    definition = EncounterFile({'combatants': [
+        {'template': "knight", 'team': 1},
+        {'name': "Ogre", 'cr': "2", 'team': 2},
+        {'name': "Goblin", 'cr': "1/4", 'xp': 60, 'team': 2},
+    ]})
+    assert [c.xp for c in difficulty.combatants(definition)] == [0, 450, 60]
+    assert difficulty.estimate(definition).xp == 510
+
+def test_combatants_are_worked_out_once():
+    definition = ambush(2)
+    first = difficulty.combatants(definition)
+    assert [c.team for c in first] == [1, 2, 2]
+    assert first[1].hp == 11
+    assert difficulty.combatants(definition)[0] is first[0]
+
+def test_fit_recovers_curve():
+    curve = Calibration(-0.5, 2.0)
+    samples = [(x / 4, curve.loss_chance(x / 4), 1000) for x in range(-8, 9)]
+    fitted = Calibration.fit(samples)
+    assert fitted.intercept == pytest.approx(-0.5, abs=1e-6)
+    assert fitted.slope == pytest.approx(2.0, abs=1e-6)
+
+def test_calibrate_uses_cache():
+    definitions = [ambush(n) for n in (1, 3, 6, 10)]
+    with ResultCache(":memory:") as cache:
+        calibration = difficulty.calibrate(definitions, cache, trials=50)
+        assert len(cache) == 4
+        assert calibration.slope > 0
+        assert difficulty.calibrate(definitions, cache, trials=50) == calibration
+
+def test_default_calibration_matches_simulations():
+    with ResultCache(":memory:") as cache:
+        calibration = difficulty.calibrate(
+            difficulty.calibration_encounters(), cache, trials=100
+        )
+    default = difficulty.DEFAULT_CALIBRATION
+    assert calibration.intercept == pytest.approx(default.intercept, abs=0.15)
+    assert calibration.slope == pytest.approx(default.slope, rel=0.1)
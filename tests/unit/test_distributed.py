@@ -0,0 +1,108 @@
+import os
+import threading
+import time
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client
+
+import pytest
+
+from combatsim.aggregators import Histogram, RunningMean
+from combatsim.distributed import Coordinator, WorkerError, work
+from combatsim.simulation import run_trials
+
+
+def die_once(marker, value):
+    """ Kills the worker the first time any worker runs it. """
+    try:
+        os.close(os.open(marker, os.O_CREAT | os.O_EXCL))
+    except FileExistsError:
+        return value
+    os._exit(1)
+
+def stall_once(marker, value):
+    """ Hangs the first time any worker runs it. """
+    try:
+        os.close(os.open(marker, os.O_CREAT | os.O_EXCL))
+    except FileExistsError:
+        return value
+    time.sleep(2)
+    return value
+
+def fail(value):
+    raise ValueError(value)
+
+
+@pytest.fixture
+def coordinator():
+    with Coordinator() as coordinator:
+        yield coordinator
+
+
+def test_run_matches_single_machine(coordinator, duel):
+    definition = duel()
+    coordinator.start_workers(2)
+    wins, rounds = coordinator.run(
+        definition, 60, [Histogram('winner'), RunningMean('rounds')],
+        seed=4, shard_size=7
+    )
+    expected = run_trials(
+        definition, 60, [Histogram('winner'), RunningMean('rounds')], seed=4
+    )
+    assert wins.counts == expected[0].counts
+    assert rounds.count == 60
+    assert rounds.mean == pytest.approx(expected[1].mean)
+
+def test_lost_worker_shard_is_reassigned(coordinator, tmp_path):
+    marker = str(tmp_path / "died")
+    coordinator.start_workers(2)
+    results = coordinator.map(die_once, [(marker, i) for i in range(6)])
+    assert results == list(range(6))
+    assert coordinator.lost == 1
+
+def test_stalled_worker_times_out(tmp_path):
+    marker = str(tmp_path / "stalled")
+    with Coordinator(timeout=0.5) as coordinator:
+        coordinator.start_workers(2)
+        results = coordinator.map(stall_once, [(marker, i) for i in range(4)])
+        assert results == list(range(4))
+        assert coordinator.lost == 1
+
+def test_finished_tasks_are_not_requeued(coordinator):
+    coordinator.start_workers(1)
+    assert coordinator.map(abs, [(-1,)]) == [1]
+    coordinator._requeue(0)
+    assert coordinator.lost == 0
+
+def test_closing_stops_map(coordinator):
+    closer = threading.Timer(0.2, coordinator.close)
+    closer.start()
+    with pytest.raises(RuntimeError, match="closed"):
+        coordinator.map(abs, [(-1,)])
+    closer.join()
+
+def test_task_errors_are_raised(coordinator):
+    coordinator.start_workers(1)
+    with pytest.raises(WorkerError, match="boom"):
+        coordinator.map(fail, [("boom",)])
+    assert coordinator.map(abs, [(-1,), (2,)]) == [1, 2]
+
+def test_workers_need_the_authkey(coordinator):
+    with pytest.raises(AuthenticationError):
+        Client(coordinator.address, authkey=b"wrong")
+    thread = threading.Thread(
+        target=work, args=(coordinator.address, coordinator.authkey)
+    )
+    thread.start()
+    assert coordinator.map(abs, [(-3,)]) == [3]
+    coordinator.close()
+    thread.join()
+
+def test_sweep_on_coordinator(coordinator, duel):
+    pytest.importorskip("numpy")
+    from combatsim.sweep import Sweep
+    sweep = Sweep(duel(), trials=20, seed=2)
+    sweep.vary(0, 'ac', [10, 20])
+    coordinator.start_workers(2)
+    remote = sweep.run(chunk_size=8, coordinator=coordinator)
+    local = sweep.run(workers=1, chunk_size=8)
+    assert remote.win_rate(1).tolist() == local.win_rate(1).tolist()
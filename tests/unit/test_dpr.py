@@ -0,0 +1,88 @@
+import random
+
+import pytest
+
+from combatsim import dpr
+from combatsim.creature import Monster
+from combatsim.damage import RESISTANT
+from combatsim.dice import Dice
+from combatsim.items import Weapon
+
+
+def longsword():
+    return Weapon("Longsword", Dice("1d8"), "slashing", attack_mod=5,
+                  damage_mod=3)
+
+
+def test_hit_chance():
+    assert dpr.hit_chance(5, 15) == pytest.approx((0.55, 0.05))
+    assert dpr.hit_chance(5, 15, advantage=True)[0] == pytest.approx(
+        1 - (9 / 20) ** 2
+    )
+    assert dpr.hit_chance(5, 15, disadvantage=True)[0] == pytest.approx(
+        (11 / 20) ** 2
+    )
+    assert dpr.hit_chance(5, 15, True, True) == dpr.hit_chance(5, 15)
+    assert dpr.hit_chance(5, 26) == (0.0, 0.0)
+    assert dpr.hit_chance(5, 2) == pytest.approx((1.0, 0.05))
+
+def test_d20_chances_sum_to_one():
+    for advantage, disadvantage in ((False, False), (True, False), (False, True)):
+        assert sum(dpr.d20_chances(advantage, disadvantage)) == pytest.approx(1)
+
+def test_dice_distribution():
+    lowest, probabilities = dpr.dice_distribution(((2, 6),), 1)
+    assert lowest == 3
+    assert len(probabilities) == 11
+    assert probabilities[8 - lowest] == pytest.approx(6 / 36)
+    assert sum(probabilities) == pytest.approx(1)
+
+def test_weapon_dpr():
+    # Hits on 10+, crits on 20: 0.5 * (4.5 + 3) + 0.05 * (9 + 3)
+    assert longsword().dpr(15) == pytest.approx(4.35)
+    assert longsword().dpr(30) == 0
+
+def test_distribution_matches_expected_damage():
+    weapon = longsword()
+    outcomes = weapon.damage_distribution(15, advantage=True)
+    assert sum(outcomes.values()) == pytest.approx(1)
+    mean = sum(damage * chance for damage, chance in outcomes.items())
+    assert mean == pytest.approx(weapon.dpr(15, advantage=True))
+    assert max(outcomes) == 16 + 3
+
+def test_dpr_matches_rolled_attacks():
+    weapon = longsword()
+    random.seed(1)
+    total = 0
+    trials = 20000
+    for _ in range(trials):
+        roll, crit = weapon.attack_roll(advantage=True)
+        if roll >= 14:
+            total += weapon.damage_roll(crit)[0]
+    assert total / trials == pytest.approx(weapon.dpr(14, True), rel=0.03)
+
+def test_dpr_many():
+    numpy = pytest.importorskip("numpy")
+    weapon = longsword()
+    acs = numpy.arange(5, 30).reshape(5, 5)
+    expected = [[weapon.dpr(int(ac), disadvantage=True) for ac in row]
+                for row in acs]
+    assert weapon.dpr_many(acs, disadvantage=True) == pytest.approx(
+        numpy.array(expected)
+    )
+
+def test_creature_dpr_uses_target():
+    attacker = Monster(weapons=[longsword()])
+    target = Monster(ac=15, resistances=["slashing"])
+    assert attacker.dpr(15) == pytest.approx(4.35)
+    resisted = attacker.dpr(target)
+    assert resisted < attacker.dpr(15) / 2 + 0.5
+    outcomes = dpr.damage_distribution(longsword(), 15, multiplier=RESISTANT)
+    assert resisted == pytest.approx(
+        sum(damage * chance for damage, chance in outcomes.items())
+    )
+
+def test_creature_dpr_accepts_numpy_ac():
+    numpy = pytest.importorskip("numpy")
+    attacker = Monster(weapons=[longsword()])
+    assert attacker.dpr(numpy.int64(15)) == pytest.approx(attacker.dpr(15))
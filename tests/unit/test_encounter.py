@@ -1,6 +1,11 @@
+import random
+from unittest.mock import Mock
+
 from combatsim.dice import Dice, Modifier
 from combatsim.creature import Monster
-from combatsim.encounter import Encounter
+from combatsim.encounter import Encounter, Opponents
+from combatsim.event import EventLog
+from combatsim.report import ConsoleReporter
 
 
 def test_initiative_order():
@@ -9,3 +14,133 @@ def test_initiative_order():
     slow = Monster(name="slow", initiative=Dice("d1"))
     encounter = Encounter([medium, fast, slow])
     assert encounter.roll_initiative()[0][1].name == fast.name
+
+def test_encounter_over_when_one_team_left():
+    ally = Monster(name="ally", max_hp=5, team=1)
+    enemy = Monster(name="enemy", max_hp=5, team=2)
+    encounter = Encounter([ally, enemy])
+    assert not encounter.encounter_over()
+    enemy.take_damage(5)
+    assert encounter.encounter_over()
+
+def test_creatures_without_a_team_are_their_own_side():
+    first = Monster(max_hp=5)
+    second = Monster(max_hp=5)
+    encounter = Encounter([first, second])
+    assert not encounter.encounter_over()
+    second.take_damage(5)
+    assert encounter.encounter_over()
+
+def test_healing_a_dead_creature_revives_its_side():
+    ally = Monster(max_hp=5, team=1)
+    enemy = Monster(max_hp=5, team=2)
+    encounter = Encounter([ally, enemy])
+    enemy.take_damage(5)
+    enemy.heal(1)
+    assert encounter.alive[2] == 1
+    assert not encounter.encounter_over()
+
+def test_run_returns_result_without_printing(capsys):
+    strong = Monster(name="strong", max_hp=50, ac=1, strength=20, team=1)
+    weak = Monster(name="weak", max_hp=1, ac=1, team=2)
+    result = Encounter([strong, weak]).run()
+    assert capsys.readouterr().out == ""
+    assert result.winner == 1
+    assert result.survivors == [strong]
+    assert result.rounds >= 1
+    assert result.kills.get(strong, 0) + result.kills.get(weak, 0) == 1
+
+def test_run_records_damage_dealt():
+    random.seed(3)
+    strong = Monster(name="strong", max_hp=50, ac=1, strength=20, team=1)
+    weak = Monster(name="weak", max_hp=1, ac=1, team=2)
+    result = Encounter([strong, weak]).run()
+    assert result.kills[strong] == 1
+    assert result.damage_dealt[strong] == 1
+
+def test_reporter_leaves_later_encounters_headless(capsys, monkeypatch):
+    monkeypatch.setattr(EventLog, 'encounter', None)
+    monkeypatch.setattr(EventLog, 'events', [])
+    reported = Encounter([
+        Monster(max_hp=1, ac=1, team=1), Monster(max_hp=1, ac=1, team=2)
+    ])
+    reported.run(ConsoleReporter())
+    assert "BEGIN ENCOUNTER" in capsys.readouterr().out
+    Encounter([
+        Monster(max_hp=1, ac=1, team=1), Monster(max_hp=1, ac=1, team=2)
+    ]).run()
+    assert EventLog.encounter is None
+    assert EventLog.events == []
+
+def test_run_notifies_reporter():
+    reporter = Mock()
+    first = Monster(max_hp=1, ac=1, team=1)
+    second = Monster(max_hp=1, ac=1, team=2)
+    encounter = Encounter([first, second])
+    result = encounter.run(reporter)
+    reporter.start.assert_called_with(encounter)
+    reporter.end.assert_called_with(encounter, result)
+
+def test_opponents_excludes_actor():
+    first, second, third = Monster(), Monster(), Monster()
+    encounter = Encounter([first, second, third])
+    assert list(Opponents(encounter.creatures, second)) == [first, third]
+
+def test_initiative_ties_go_to_higher_dexterity():
+    clumsy = Monster(name="clumsy", dexterity=6, initiative=Dice("d1"))
+    nimble = Monster(name="nimble", dexterity=18, initiative=Dice("d1"))
+    encounter = Encounter([clumsy, nimble])
+    assert encounter.roll_initiative()[0][1] is nimble
+
+def test_dead_creatures_leave_the_turn_order():
+    first = Monster(name="first", max_hp=50, ac=1, strength=20, team=1)
+    second = Monster(name="second", max_hp=1, ac=1, team=2)
+    third = Monster(name="third", max_hp=50, ac=30, team=2)
+    encounter = Encounter([first, second, third])
+    second.take_damage(1)
+    assert second not in encounter.turns
+    encounter.turns.add(first, 10)
+    encounter.turns.add(third, 5)
+    third.take_damage(50)
+    assert encounter.turns.creatures() == [first]
+
+def test_summoned_creature_joins_turn_order():
+    summoner = Monster(name="summoner", max_hp=50, ac=30, team=1)
+    enemy = Monster(name="enemy", max_hp=50, ac=30, team=2)
+    summon = Monster(name="summon", max_hp=1, ac=1, team=1)
+    encounter = Encounter([summoner, enemy])
+    encounter.turns.add(summoner, 10)
+    encounter.turns.add(enemy, 5)
+    encounter.combat_round = 1
+    encounter.add(summon)
+    assert summon in encounter.turns
+    assert summon.encounter is encounter
+
+def test_readied_action_is_taken_after_trigger():
+    guard = Monster(name="guard", max_hp=10, team=1)
+    intruder = Monster(name="intruder", max_hp=10, team=2)
+    encounter = Encounter([guard, intruder])
+    reactions = []
+    encounter.ready(
+        guard, "DamageTaken",
+        lambda target, **data: reactions.append((target, data['damage'])),
+        trigger=intruder
+    )
+    intruder.take_damage(3)
+    assert reactions == []
+    encounter.take_reactions()
+    assert reactions == [(intruder, 3)]
+
+    # Readied actions are only taken once
+    intruder.take_damage(3)
+    encounter.take_reactions()
+    assert len(reactions) == 1
+
+def test_readied_action_expires_at_start_of_next_turn():
+    guard = Monster(name="guard", max_hp=10, team=1)
+    intruder = Monster(name="intruder", max_hp=10, team=2)
+    encounter = Encounter([guard, intruder])
+    encounter.slots[guard] = 0
+    subscription = encounter.ready(guard, "DamageTaken", Mock())
+    encounter.timing.advance(1, 0, 0)
+    assert not subscription.active
@@ -0,0 +1,145 @@
+import json
+import pickle
+
+import pytest
+
+from combatsim.creature import Character, Monster
+from combatsim.encounter_file import (
+    EncounterFile, EncounterFileError, load, parse, validate
+)
+from combatsim.tactics import Healer
+
+
+AMBUSH = {
+    'name': "Ambush",
+    'trials': 100,
+    'seed': 4,
+    'grid': [20, 20],
+    'weapons': {
+        'shortbow': {'damage': "1d6", 'type': "piercing", 'melee': False}
+    },
+    'armor': {
+        'leather': {'name': "Leather", 'base_ac': 11}
+    },
+    'combatants': [
+        {'template': "knight", 'class': "character", 'team': 1,
+         'pos': [0, 0]},
+        {'template': "simple_cleric", 'team': 1, 'tactics': "Healer",
+         'spells': ["cure_wounds"]},
+        {'template': "bandit", 'team': 2, 'count': 3,
+         'weapons': ["shortbow", {'damage': "1d4", 'type': "slashing"}],
+         'armor': "leather", 'resistances': ["fire"]},
+        {'name': "Wolf", 'team': 2, 'hd': "2d8", 'strength': 12},
+    ]
+}
+
+
+def test_file_builds_definition():
+    definition = EncounterFile(AMBUSH)
+    assert definition.name == "Ambush"
+    assert definition.trials == 100
+    assert definition.seed == 4
+    assert definition.grid == (20, 20)
+    assert len(definition.combatants) == 6
+
+    cls, base, overrides = definition.combatants[0]
+    assert cls is Character
+    assert base['name'] == "Knight"
+    assert overrides == {'team': 1, 'pos': (0, 0)}
+
+    cls, base, overrides = definition.combatants[1]
+    assert overrides['tactics'] is Healer
+    assert overrides['spells'][0].name == "Cure Wounds"
+
+    cls, base, overrides = definition.combatants[2]
+    assert cls is Monster
+    assert [w.name for w in overrides['weapons']] == ["shortbow", "Weapon"]
+    assert overrides['armor'].base_ac == 11
+
+def test_file_builds_encounters_on_grid():
+    encounter = EncounterFile(AMBUSH)()
+    knight = encounter.creatures[0]
+    assert (knight.x, knight.y) == (0, 0)
+    assert knight.grid[0, 0] is knight
+    wolf = encounter.creatures[-1]
+    assert wolf.name == "Wolf"
+    assert wolf.strength.value == 12
+    bandit = encounter.creatures[2]
+    assert bandit.ac == 12
+    assert bandit.resistances == ["fire"]
+
+def test_each_encounter_gets_its_own_grid():
+    definition = EncounterFile(AMBUSH)
+    first, second = definition(), definition()
+    assert first.creatures[0].grid is not second.creatures[0].grid
+
+def test_pickles_as_data():
+    definition = EncounterFile(AMBUSH)
+    definition()
+    copy = pickle.loads(pickle.dumps(definition))
+    assert copy.data == AMBUSH
+    assert len(copy.combatants) == 6
+    assert len(pickle.dumps(definition)) < 2000
+
+@pytest.mark.parametrize("change,location", [
+    ({'combatants': []}, "combatants"),
+    ({'grid': [10]}, "grid"),
+    ({'trials': "many"}, "trials"),
+    ({'weapons': {'bow': {'damage': "1x6", 'type': "piercing"}}},
+     "weapons.bow.damage"),
+    ({'combatants': [{'template': "dragon"}]}, "combatants[0].template"),
+    ({'combatants': [{'strength': "high"}]}, "combatants[0].strength"),
+    ({'combatants': [{'level': True}]}, "combatants[0].level"),
+    ({'combatants': [{'weapons': ["axe"]}]}, "combatants[0].weapons[0]"),
+    ({'armor': {'hide': {'ac': 12}}}, "armor.hide"),
+    ({'combatants': [{'armor': {'ac': 12}}]}, "combatants[0].armor"),
+    ({'combatants': [{'spells': ["wish"]}]}, "combatants[0].spells[0]"),
+    ({'combatants': [{'tactics': "Berserk"}]}, "combatants[0].tactics"),
+    ({'combatants': [{'pos': [1]}]}, "combatants[0].pos"),
+    ({'grid': None, 'combatants': [{'pos': [0, 0]}]}, "combatants[0].pos"),
+    ({'grid': [3, 3], 'combatants': [{'pos': [9, 9]}]},
+     "combatants[0].pos[0]"),
+    ({'grid': [3, 3], 'combatants': [{'pos': [0, -1]}]},
+     "combatants[0].pos[1]"),
+    ({'combatants': [{'tactics': "BaseTactics"}]}, "combatants[0].tactics"),
+    ({'combatants': [{'spells': ["partial"]}]}, "combatants[0].spells[0]"),
+    ({'combatants': [{'spells': ["Spell"]}]}, "combatants[0].spells[0]"),
+    ({'combatants': [{'template': "Healer"}]}, "combatants[0].template"),
+    ({'combatants': [{'count': 0}]}, "combatants[0].count"),
+    ({'combatants': [{'wings': 2}]}, "combatants[0]"),
+    ({'monsters': []}, "encounter"),
+])
+def test_invalid_files_report_location(change, location):
+    data = dict(AMBUSH, **change)
+    with pytest.raises(EncounterFileError) as error:
+        validate(data)
+    assert str(error.value).startswith(location + ":")
+
+def test_parse_json():
+    definition = parse(json.dumps(AMBUSH))
+    assert len(definition.combatants) == 6
+    with pytest.raises(EncounterFileError):
+        parse("{not json")
+
+def test_parse_yaml():
+    pytest.importorskip("yaml")
+    definition = parse(
+        "combatants:\n"
+        "  - template: knight\n"
+        "    team: 1\n"
+        "  - template: bandit\n"
+        "    team: 2\n",
+        "yaml"
+    )
+    assert len(definition.combatants) == 2
+
+def test_load_caches_until_file_changes(tmp_path):
+    path = tmp_path / "ambush.json"
+    path.write_text(json.dumps(AMBUSH))
+    first = load(str(path))
+    assert load(str(path)) is first
+
+    path.write_text(json.dumps(dict(AMBUSH, name="Changed", trials=12345)))
+    changed = load(str(path))
+    assert changed is not first
+    assert changed.name == "Changed"
@@ -0,0 +1,102 @@
+from unittest.mock import Mock
+
+from combatsim.creature import Monster
+from combatsim.encounter import Encounter
+from combatsim.events import (
+    DAMAGE_TAKEN, FORCED_MOVEMENT, WILLING_MOVEMENT, EventBus
+)
+from combatsim.timing import START
+
+
+def test_emit_calls_handler_for_creature():
+    bus = EventBus()
+    creature, other = object(), object()
+    handler = Mock()
+    bus.subscribe(WILLING_MOVEMENT, creature, handler)
+    bus.emit(WILLING_MOVEMENT, other)
+    bus.emit(FORCED_MOVEMENT, creature)
+    handler.assert_not_called()
+    bus.emit(WILLING_MOVEMENT, creature, end=(1, 1))
+    handler.assert_called_once_with(creature, end=(1, 1))
+
+def test_subscribe_to_every_creature():
+    bus = EventBus()
+    handler = Mock()
+    bus.subscribe(DAMAGE_TAKEN, None, handler)
+    bus.emit(DAMAGE_TAKEN, "a")
+    bus.emit(DAMAGE_TAKEN, "b")
+    assert handler.call_count == 2
+
+def test_cancel_subscription():
+    bus = EventBus()
+    handler = Mock()
+    subscription = bus.subscribe(WILLING_MOVEMENT, "a", handler)
+    subscription.cancel()
+    subscription.cancel()
+    bus.emit(WILLING_MOVEMENT, "a")
+    handler.assert_not_called()
+    assert bus.subscribers(WILLING_MOVEMENT, "a") == 0
+
+def test_once_subscription_ends_after_first_event():
+    bus = EventBus()
+    handler = Mock()
+    bus.subscribe(WILLING_MOVEMENT, "a", handler, once=True)
+    bus.emit(WILLING_MOVEMENT, "a")
+    bus.emit(WILLING_MOVEMENT, "a")
+    assert handler.call_count == 1
+
+def test_subscription_expires_after_duration():
+    bus = EventBus()
+    bus.start_round(3)
+    handler = Mock()
+    subscription = bus.subscribe(WILLING_MOVEMENT, "a", handler, duration=1)
+    bus.emit(WILLING_MOVEMENT, "a")
+    bus.start_round(4)
+    bus.emit(WILLING_MOVEMENT, "a")
+    assert handler.call_count == 1
+    assert not subscription.active
+
+def test_encounter_expires_subscriptions_on_its_scheduler():
+    encounter = Encounter([Monster()])
+    subscription = encounter.events.subscribe(
+        WILLING_MOVEMENT, "a", Mock(), duration=1
+    )
+    assert len(encounter.timing) == 1
+    encounter.timing.advance(1, 0, START)
+    assert not subscription.active
+    assert encounter.events.subscribers(WILLING_MOVEMENT, "a") == 0
+
+def test_cancelling_subscription_cancels_its_timer():
+    bus = EventBus()
+    subscription = bus.subscribe(WILLING_MOVEMENT, "a", Mock(), duration=2)
+    subscription.cancel()
+    assert len(bus.timing) == 0
+
+def test_handler_can_cancel_other_subscriptions():
+    bus = EventBus()
+    second = Mock()
+    bus.subscribe(WILLING_MOVEMENT, "a", lambda c: subscription.cancel())
+    subscription = bus.subscribe(WILLING_MOVEMENT, "a", second)
+    bus.emit(WILLING_MOVEMENT, "a")
+    second.assert_not_called()
+
+def test_creature_movement_emits_events():
+    grid = {(0, 0): None, (1, 1): None, (2, 2): None}
+    creature = Monster(grid=grid, pos=(0, 0))
+    encounter = Encounter([creature])
+    handler = Mock()
+    encounter.events.subscribe(WILLING_MOVEMENT, creature, handler)
+    forced = Mock()
+    encounter.events.subscribe(FORCED_MOVEMENT, creature, forced)
+    creature.move((1, 1))
+    handler.assert_called_once_with(creature, start=(0, 0), end=(1, 1))
+    creature.move((2, 2), forced=True)
+    forced.assert_called_once_with(creature, start=(1, 1), end=(2, 2))
+
+def test_taking_damage_emits_event():
+    creature = Monster(max_hp=10)
+    encounter = Encounter([creature])
+    handler = Mock()
+    encounter.events.subscribe(DAMAGE_TAKEN, creature, handler)
+    creature.take_damage(3, "fire")
+    handler.assert_called_once_with(creature, damage=3, type_="fire")
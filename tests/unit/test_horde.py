@@ -0,0 +1,115 @@
+import random
+
+import pytest
+
+numpy = pytest.importorskip("numpy")
+
+from combatsim.creature import Monster
+from combatsim.dice import Dice
+from combatsim.encounter import Encounter
+from combatsim.horde import RANDOM, Horde, roll_dice
+from combatsim.items import Weapon
+from combatsim.monster_manual import bandit
+
+
+GUARD = {
+    'name': "Guard",
+    'ac': 12,
+    'max_hp': 10,
+    'weapons': [Weapon("Spear", Dice("1d6"), "piercing")]
+}
+
+
+def make_guard(**kwargs):
+    options = GUARD.copy()
+    options.update(kwargs)
+    return Monster(**options)
+
+
+def test_roll_dice_matches_dice_range():
+    rng = numpy.random.default_rng(1)
+    dice = Dice(["2d6", "1d4"]) + 1
+    totals = roll_dice(rng, dice, 10000)
+    assert totals.min() >= 5
+    assert totals.max() <= 18
+    assert abs(totals.mean() - dice.average) < 0.2
+
+def test_horde_rolls_hp_for_every_member():
+    horde = Horde(Monster.compile(bandit), 100, seed=1)
+    assert len(horde) == 100
+    assert horde.alive == 100
+    assert (horde.hps == horde.max_hps).all()
+    assert horde.hps.min() >= 4
+    assert horde.hps.max() <= 18
+    assert len(set(horde.hps.tolist())) > 1
+
+def test_attacks_hit_the_weakest_member():
+    horde = Horde(Monster.compile(GUARD, max_hp=None), 3, seed=1)
+    horde.hps[:] = [5, 2, 7]
+    assert horde.hp == 2
+    assert horde.take_damage(4, "piercing") == 2
+    assert horde.hps.tolist() == [5, 0, 7]
+    assert horde.alive == 2
+    assert horde.hp == 5
+
+def test_horde_uses_damage_multipliers():
+    template = Monster.compile(GUARD, resistances=["fire"])
+    horde = Horde(template, 2, seed=1)
+    assert horde.take_damage(5, "fire") == 2
+    assert horde.total_hp == 18
+
+def test_focus_fire_moves_to_next_weakest_target():
+    template = Monster.compile(GUARD, max_hp=100)
+    horde = Horde(template, 20, seed=3)
+    first = make_guard(name="First", ac=0, max_hp=1)
+    second = make_guard(name="Second", ac=0, max_hp=5)
+    third = make_guard(name="Third", ac=0, max_hp=1000)
+
+    dealt = horde.attack_round([third, second, first])
+
+    # Every attack hits, so the first two guards drop and the rest of the
+    # attacks go to the third.
+    assert not first.is_alive()
+    assert not second.is_alive()
+    assert third.hp < third.max_hp
+    assert dealt == 6 + (third.max_hp - third.hp)
+
+def test_random_targeting_scatters_damage_over_horde():
+    template = Monster.compile(GUARD, max_hp=1000)
+    attackers = Horde(template, 500, team=1, targeting=RANDOM, seed=1)
+    defenders = Horde(Monster.compile(GUARD, ac=0), 50, team=2, seed=2)
+    dealt = attackers.attack_round([defenders])
+    assert dealt == 500 - defenders.total_hp
+    assert defenders.alive < 50
+
+def test_horde_fights_in_encounter():
+    random.seed(1)
+    template = Monster.compile(bandit)
+    bandits = Horde(template, 200, team=1)
+    guards = [make_guard(team=2) for _ in range(4)]
+    encounter = Encounter([bandits] + guards)
+    result = encounter.run()
+    assert result.winner == 1
+    assert encounter.kills[bandits] == 4
+    assert not any(guard.is_alive() for guard in guards)
+
+def test_horde_death_ends_encounter():
+    random.seed(2)
+    template = Monster.compile(GUARD, max_hp=1)
+    horde = Horde(template, 5, team=1)
+    knight = make_guard(team=2, max_hp=1000, ac=30)
+    result = Encounter([horde, knight]).run()
+    assert result.winner == 2
+    assert horde.alive == 0
+    assert result.rounds >= 5
+
+def test_horde_is_reproducible_from_random_seed():
+    template = Monster.compile(bandit)
+    random.seed(5)
+    first = Horde(template, 50).hps.tolist()
+    random.seed(5)
+    assert Horde(template, 50).hps.tolist() == first
+
+def test_unknown_targeting_raises():
+    with pytest.raises(ValueError):
+        Horde(Monster.compile(bandit), 1, targeting="closest")
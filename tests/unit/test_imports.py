@@ -0,0 +1,58 @@
+import subprocess
+import sys
+
+import pytest
+
+import combatsim
+
+# Generous enough for a slow CI machine. A cold import of the whole
+# simulator takes around 25ms on a laptop.
+STARTUP_BUDGET = 0.5
+
+
+def run_python(code):
+    return subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True,
+        check=True
+    ).stdout.strip()
+
+
+def loaded_after(statement):
+    return run_python(
+        f"import sys; {statement}; "
+        "print(' '.join(sorted(m for m in sys.modules "
+        "if m.startswith('combatsim'))))"
+    ).split()
+
+
+def test_package_import_loads_nothing_else():
+    assert loaded_after("import combatsim") == ["combatsim"]
+
+def test_submodule_import_loads_only_its_dependencies():
+    assert loaded_after("import combatsim.dice") == [
+        "combatsim", "combatsim.dice"
+    ]
+    assert "combatsim.creature" not in loaded_after("import combatsim.cli")
+
+def test_exports_load_on_first_use():
+    assert "combatsim.creature" in loaded_after(
+        "import combatsim; combatsim.Monster"
+    )
+    from combatsim.creature import Monster
+    assert combatsim.Monster is Monster
+    assert "Monster" in dir(combatsim)
+
+def test_submodules_load_on_first_use():
+    from combatsim import grid
+    assert combatsim.grid is grid
+    with pytest.raises(AttributeError):
+        combatsim.no_such_module
+
+def test_cold_startup_is_within_budget():
+    seconds = float(run_python(
+        "import time; start = time.perf_counter(); "
+        "import combatsim.sample_creatures, combatsim.monster_manual, "
+        "combatsim.encounter_file; "
+        "print(time.perf_counter() - start)"
+    ))
+    assert seconds < STARTUP_BUDGET
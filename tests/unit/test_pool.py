@@ -0,0 +1,59 @@
+import pickle
+
+import pytest
+
+from combatsim import pool
+from combatsim.aggregators import Histogram, RunningMean
+from combatsim.pool import WorkerPool, pack, run_chunk, unpack
+from combatsim.simulation import run_trials
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    definitions = pool.OrderedDict()
+    monkeypatch.setattr(pool, "_definitions", definitions)
+    return definitions
+
+
+def aggregators():
+    return [Histogram('winner'), RunningMean('rounds')]
+
+
+def test_pack_is_keyed_by_contents(duel):
+    first = pack(duel())
+    second = pack(duel())
+    assert first == second
+    assert pickle.loads(first[1]).data == duel().data
+    assert pack(duel(grid=[5, 5]))[0] != first[0]
+
+def test_unpack_compiles_once(cache, duel):
+    packed = pack(duel())
+    definition = unpack(packed)
+    assert definition._templates is not None
+    assert unpack(packed) is definition
+
+def test_unpack_evicts_oldest(cache, duel, monkeypatch):
+    monkeypatch.setattr(pool, "CACHE_SIZE", 2)
+    packs = [pack(duel(seed=i)) for i in range(3)]
+    for packed in packs:
+        unpack(packed)
+    assert list(cache) == [packs[1][0], packs[2][0]]
+
+def test_run_chunk_matches_run_trials(cache, duel):
+    definition = duel()
+    wins, rounds = run_chunk(pack(definition), 5, 10, 20, aggregators())
+    expected = run_trials(definition, 20, aggregators(), seed=5, start=10)
+    assert wins.counts == expected[0].counts
+    assert rounds.mean == expected[1].mean
+
+def test_pool_is_reused_and_reproducible(duel):
+    definition = duel()
+    expected = run_trials(definition, 60, aggregators(), seed=9)
+    with WorkerPool(2, definitions=[definition]) as workers:
+        for _ in range(2):
+            wins, rounds = workers.run(
+                definition, 60, aggregators(), seed=9, chunk_size=15
+            )
+            assert wins.counts == expected[0].counts
+            assert rounds.count == 60
+            assert rounds.mean == pytest.approx(expected[1].mean)
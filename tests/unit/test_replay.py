@@ -0,0 +1,109 @@
+import pytest
+
+from combatsim import dice
+from combatsim.creature import Monster
+from combatsim.encounter import EncounterDefinition
+from combatsim.event import EventLog
+from combatsim.monster_manual import bandit
+from combatsim.replay import (
+    ReplayDivergence, ReplaySource, TrialRecord, decode_draws, diff,
+    encode_draws, first_divergence, record, record_trial, replay
+)
+from combatsim.simulation import simulate
+
+
+def test_draws_round_trip():
+    draws = [(20, 1), (20, 20), (6, 3), (6, 6), (100, 100), (4, 2), (20, 7)]
+    assert decode_draws(encode_draws(draws)) == draws
+
+def test_draws_of_the_same_die_take_one_byte_each():
+    draws = [(20, 1 + i % 20) for i in range(1000)]
+    assert len(encode_draws(draws)) == 1001
+
+def test_record_matches_simulation(duel):
+    definition = duel()
+    trials = list(simulate(definition, 5, seed=7))
+    trial = record_trial(definition, 7, 3)
+    result, _ = replay(definition, trial)
+    assert trial.seed == trials[3].seed
+    assert result.rounds == trials[3].rounds
+    assert result.winner == trials[3].winner
+
+def test_record_matches_simulation_with_batched_saves(monkeypatch):
+    from combatsim.sample_creatures import mage
+    from combatsim.spells import SavingThrow
+    monkeypatch.setattr(SavingThrow, 'batch_size', 1)
+    definition = EncounterDefinition()
+    definition.add(Monster, mage, team=1)
+    definition.add(Monster, mage, team=1)
+    definition.add(Monster, bandit, team=2)
+    definition.add(Monster, bandit, team=2)
+    trials = list(simulate(definition, 20, seed=3))
+    for index, expected in enumerate(trials):
+        trial = record_trial(definition, 3, index)
+        result, _ = replay(definition, trial)
+        assert result.rounds == expected.rounds
+        assert result.winner == expected.winner
+        assert sum(result.damage_dealt.values()) == sum(expected.damage)
+
+def test_replay_reproduces_events(duel):
+    definition = duel()
+    first, trial = record(definition, 11)
+    result, events = replay(definition, TrialRecord(11, trial.draws))
+    assert events == trial.events
+    assert result.rounds == first.rounds
+    assert len(trial) > 0
+
+def test_save_and_load(tmp_path, duel):
+    _, trial = record(duel(), 3)
+    path = str(tmp_path / "trial.replay")
+    trial.save(path)
+    loaded = TrialRecord.load(path)
+    assert loaded.seed == trial.seed
+    assert loaded.draws == trial.draws
+    assert loaded.events == trial.events
+
+def test_load_rejects_other_files(tmp_path):
+    path = tmp_path / "other"
+    path.write_bytes(b"x" * 64)
+    with pytest.raises(ValueError):
+        TrialRecord.load(str(path))
+
+def test_replay_source_raises_on_divergence():
+    source = ReplaySource([(20, 5)])
+    assert source.roll(20) == 5
+    with pytest.raises(ReplayDivergence):
+        source.roll(20)
+    source = ReplaySource([(20, 5)])
+    with pytest.raises(ReplayDivergence) as error:
+        source.roll(6)
+    assert error.value.draw == 0
+
+def test_lenient_replay_source_keeps_rolling():
+    source = ReplaySource([(20, 5)], strict=False)
+    assert 1 <= source.roll(8) <= 8
+    assert source.diverged == 0
+
+def test_recording_restores_dice_source_and_event_log(encounter, duel):
+    log = EventLog(encounter)
+    record(duel(), 1)
+    assert dice._source is None
+    assert EventLog.encounter is encounter
+
+def test_first_divergence():
+    assert first_divergence(["a", "b"], ["a", "b"]) is None
+    assert first_divergence(["a", "b"], ["a", "c"]) == (1, "b", "c")
+    assert first_divergence(["a"], ["a", "c"]) == (1, None, "c")
+
+def test_diff_finds_no_divergence_for_same_code(duel):
+    definition = duel()
+    _, trial = record(definition, 5)
+    assert diff(definition, trial) is None
+
+def test_diff_finds_first_changed_event(duel):
+    definition = duel()
+    _, trial = record(definition, 5)
+    trial.events[2] = "something else"
+    index, expected, actual = diff(definition, trial)
+    assert index == 2
+    assert expected == "something else"
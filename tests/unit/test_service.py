@@ -0,0 +1,120 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from combatsim.creature import Character, Monster
+from combatsim.service import (
+    CANCELLED, DONE, FAILED, SimulationService, definition_from_json
+)
+
+
+REQUEST = {
+    'trials': 40,
+    'seed': 3,
+    'combatants': [
+        {'template': "knight", 'team': 1},
+        {'template': "bandit", 'team': 2, 'count': 2},
+    ]
+}
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+def test_definition_from_json():
+    definition = definition_from_json(
+        '{"combatants": [{"template": "knight", "class": "character", '
+        '"team": 1}, {"template": "blood_hawk", "count": 3, "ac": 15}]}'
+    )
+    assert len(definition.combatants) == 4
+    cls, base, overrides = definition.combatants[0]
+    assert cls is Character
+    assert base['name'] == "Knight"
+    assert overrides == {'team': 1}
+    assert definition.combatants[3][0] is Monster
+    assert definition.combatants[3][2] == {'ac': 15}
+
+@pytest.mark.parametrize("request_", [
+    {'combatants': []},
+    {'combatants': [{'template': "knight", 'strength': "high"}]},
+    {'combatants': [{'template': "dragon"}]},
+    {'combatants': [{'template': "knight", 'class': "wizard"}]},
+])
+def test_definition_from_json_rejects_bad_requests(request_):
+    with pytest.raises(ValueError):
+        definition_from_json(request_)
+
+def test_job_streams_progress_until_done():
+    async def main():
+        async with SimulationService(workers=2, chunk_size=10) as service:
+            job = await service.submit(REQUEST)
+            return [update async for update in service.updates(job)]
+
+    updates = run(main())
+    assert updates[-1]['status'] == DONE
+    assert updates[-1]['completed'] == 40
+    completed = [update['completed'] for update in updates]
+    assert completed == sorted(completed)
+    assert any(0 < count < 40 for count in completed)
+    assert abs(sum(updates[-1]['win_rates'].values()) - 1) < 1e-9
+
+def test_results_are_reproducible_with_seed():
+    async def main():
+        async with SimulationService(2, 10) as service:
+            first = await service.submit(REQUEST)
+            second = await service.submit(REQUEST)
+            return await asyncio.gather(
+                service.result(first), service.result(second)
+            )
+
+    first, second = run(main())
+    assert first['win_rates'] == second['win_rates']
+    assert first['mean_rounds'] == second['mean_rounds']
+
+def test_cancel_stops_job():
+    async def main():
+        executor = ThreadPoolExecutor(1)
+        async with SimulationService(1, 10, max_jobs=1, executor=executor) as service:
+            running = await service.submit(dict(REQUEST, trials=100000))
+            queued = await service.submit(REQUEST)
+            assert service.cancel(queued)
+            await asyncio.sleep(0.05)
+            assert service.cancel(running)
+            assert not service.cancel(running)
+            results = await service.result(running), await service.result(queued)
+        executor.shutdown()
+        return results
+
+    running, queued = run(main())
+    assert running['status'] == CANCELLED
+    assert running['completed'] < 100000
+    assert queued['status'] == CANCELLED
+    assert queued['completed'] == 0
+
+def test_invalid_request_is_rejected():
+    async def main():
+        async with SimulationService(1, executor=ThreadPoolExecutor(1)) as service:
+            with pytest.raises(ValueError):
+                await service.submit(dict(REQUEST, seed="not a seed"))
+            assert service.jobs == {}
+
+    run(main())
+
+def test_failed_job_reports_error(monkeypatch):
+    def fail(*args):
+        raise RuntimeError("worker crashed")
+
+    monkeypatch.setattr("combatsim.service._run_chunk", fail)
+
+    async def main():
+        executor = ThreadPoolExecutor(1)
+        async with SimulationService(1, 10, executor=executor) as service:
+            job = await service.submit(REQUEST)
+            result = await service.result(job)
+        executor.shutdown()
+        return result
+
+    result = run(main())
+    assert result['status'] == FAILED
+    assert "worker crashed" in result['error']
@@ -0,0 +1,63 @@
+import pickle
+import random
+
+import pytest
+
+numpy = pytest.importorskip("numpy")
+
+from combatsim.aggregators import Histogram, RunningMean
+from combatsim.shared_results import SharedResults, run_shared
+from combatsim.simulation import TrialResult, run_trials
+
+
+@pytest.fixture
+def results():
+    results = SharedResults(4, 2, start=10)
+    yield results
+    results.unlink()
+
+
+def test_rows_start_empty(results):
+    assert len(results.completed) == 0
+    assert results.win_counts() == {}
+    assert results.win_rate(1) == 0.0
+
+def test_add_writes_row(results):
+    results.add(TrialResult(12, 7, 2, 3, (0, 5), (4, 9), (0, 1)))
+    results.add(TrialResult(10, 8, None, 1, (1, 1, 9), (2, 2, 9), (0, 0, 9)))
+    assert results.win_counts() == {None: 1, 2: 1}
+    assert results.win_rate(2) == 0.5
+    assert results.rounds.tolist() == [1, 3]
+    assert list(results.results()) == [
+        TrialResult(10, 8, None, 1, (1, 1), (2, 2), (0, 0)),
+        TrialResult(12, 7, 2, 3, (0, 5), (4, 9), (0, 1)),
+    ]
+
+def test_pickles_as_a_view(results):
+    assert len(pickle.dumps(results)) < 200
+    assert pickle.loads(pickle.dumps(results)) is results
+
+def test_other_processes_write_into_the_same_memory():
+    results = SharedResults(1, 1)
+    try:
+        view = SharedResults(1, 1, name=results.name)
+        view.add(TrialResult(0, 1, 1, 2, (3,), (4,), (5,)))
+        view.close()
+        assert results.win_counts() == {1: 1}
+        assert results.hp.tolist() == [[3]]
+    finally:
+        results.unlink()
+
+def test_run_shared_matches_run_trials(duel):
+    definition = duel()
+    expected = run_trials(
+        definition, 50, [Histogram('winner'), RunningMean('rounds')], seed=3
+    )
+    state = random.getstate()
+    with run_shared(definition, 50, seed=3, workers=2, chunk_size=8) as results:
+        assert random.getstate() == state
+        assert len(results.completed) == 50
+        assert results.win_counts() == dict(expected[0].counts)
+        assert results.rounds.mean() == pytest.approx(expected[1].mean)
+        assert results.damage.shape == (50, 3)
+        assert [r.index for r in results.results()] == list(range(50))
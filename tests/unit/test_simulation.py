@@ -0,0 +1,63 @@
+import random
+
+from combatsim.aggregators import Histogram, KillCounts, RunningMean
+from combatsim.simulation import (
+    ResultWriter, TrialResult, read_results, run_trials, simulate, trial_seed
+)
+
+
+def test_simulate_yields_one_result_per_trial(duel):
+    results = list(simulate(duel(), 5, seed=1))
+    assert [r.index for r in results] == [0, 1, 2, 3, 4]
+    assert all(r.winner in (1, 2) for r in results)
+    assert all(len(r.hp) == 3 for r in results)
+
+def test_simulate_is_reproducible_with_seed(duel):
+    first = list(simulate(duel(), 10, seed=7))
+    second = list(simulate(duel(), 10, seed=7))
+    assert first == second
+
+def test_simulate_leaves_global_random_state_alone(duel):
+    random.seed(9)
+    expected = random.random()
+    random.seed(9)
+    for result in simulate(duel(), 3, seed=7):
+        pass
+    assert random.random() == expected
+
+def test_simulate_shards_match_full_run(duel):
+    full = list(simulate(duel(), 10, seed=3))
+    shards = (
+        list(simulate(duel(), 4, seed=3)) +
+        list(simulate(duel(), 6, seed=3, start=4))
+    )
+    assert full == shards
+
+def test_trial_seed_differs_between_trials():
+    assert trial_seed(1, 0) != trial_seed(1, 1)
+    assert trial_seed(1, 0) != trial_seed(2, 0)
+
+def test_run_trials_feeds_aggregators(duel):
+    wins = Histogram('winner')
+    rounds = RunningMean('rounds')
+    kills = KillCounts()
+    run_trials(duel(), 20, [wins, rounds, kills], seed=2)
+    assert wins.total == 20
+    assert rounds.count == 20
+    deaths = sum(r.hp.count(0) for r in simulate(duel(), 20, seed=2))
+    assert sum(kills.kills) == deaths
+
+def test_results_round_trip_through_binary_file(tmp_path, duel):
+    path = str(tmp_path / "results.bin")
+    results = list(simulate(duel(), 7, seed=5, output=path, flush_every=3))
+    assert list(read_results(path)) == results
+
+def test_writer_appends_to_existing_file(tmp_path):
+    path = str(tmp_path / "results.bin")
+    record = TrialResult(0, 1, None, 3, (0, 1), (2, 3), (0, 1))
+    with ResultWriter(path) as writer:
+        writer.write(record)
+    with ResultWriter(path) as writer:
+        writer.write(record._replace(index=1))
+    assert [r.index for r in read_results(path)] == [0, 1]
+    assert list(read_results(path))[0] == record
@@ -2,12 +2,13 @@ import pytest
 from unittest.mock import Mock, patch
 import unittest
 
-from combatsim.creature import Creature
+from combatsim.creature import Creature, roll_saving_throws
 from combatsim.dice import Dice
 from combatsim.event import EventLog
 from combatsim.spells import (
     Spell, Effect, Heal, Damage, CantripDamage, Sphere, TargetGeometry,
-    TargetList, SavingThrow, Effect
+    TargetList, SavingThrow, Effect, EffectGraph, Resistance, cure_wounds,
+    drain
 )
 from combatsim.rules_error import RulesError
 
@@ -60,20 +61,21 @@ def test_default_initialization():
     assert spell.effects == []
 
 def test_full_initialization():
+    effect = Heal()
     spell = Spell(
         "test",
         casting_time="bonus",
         school="evocation",
         level=1,
         range_=5,
-        effects=["Test"]
+        effects=[effect]
     )
     assert spell.name == "test"
     assert spell.casting_time == "bonus"
     assert spell.school == "evocation"
     assert spell.level == 1
     assert spell.range == 5
-    assert spell.effects == ["Test"]
+    assert spell.effects == [effect]
 
 def test_cast_spell_at_lower_level_fails():
     spell = Spell("test", level=2)
@@ -124,31 +126,105 @@ def test_cantrip_damage_effect_scales_by_level(event_log):
     acid.activate(creature, 0, [creature])
     creature.take_damage.assert_called_with(4, 'acid')
 
-def test_saving_throw_defaults_to_all_or_nothing_effect():
-    effect = Mock()
-    creature = Mock()
-    saving_throw = SavingThrow("dexterity", effect)
-
-    creature.saving_throw.return_value = True
-    saving_throw.activate(Mock(), 1, [creature])
-    effect.activate.asset_not_called()
-
-def test_saving_throw_applies_effect_on_failed_save():
-    caster = Mock()
-    effect = Mock()
-    creature = Mock()
-    saving_throw = SavingThrow("dexterity", effect)
-
-    creature.saving_throw.return_value = False
-    saving_throw.activate(caster, 1, [creature])
-    effect.activate.assert_called_with(caster, 1, [creature])
-
-def test_saving_throw_applies_multiplier_on_save():
-    caster = Mock()
-    effect = Mock()
-    creature = Mock()
-    saving_throw = SavingThrow("dexterity", effect, multiplier=0.5)
-
-    creature.saving_throw.return_value = True
-    saving_throw.activate(caster, 1, [creature])
-    effect.activate.assert_called_with(caster, 1, [creature], multiplier=0.5)
+def test_effect_graph_orders_pipes_before_consumers():
+    damage = Damage("1d4")
+    heal = Heal(pipe=damage, target="caster")
+    save = SavingThrow("constitution", heal)
+    graph = EffectGraph([save])
+    assert [step[0] for step in graph.steps] == [save, damage, heal]
+    assert graph.steps[1] == (damage, 0, None)
+    assert graph.steps[2] == (heal, 0, 1)
+
+@pytest.mark.parametrize("effects", [
+    ["Test"],
+    [SavingThrow("dexterity", Resistance(["fire"]), multiplier=0.5)],
+    [Heal(pipe=SavingThrow("dexterity", Damage()))],
+])
+def test_invalid_effects_fail_at_definition(effects):
+    with pytest.raises(ValueError):
+        Spell("broken", effects=effects)
+
+def test_effect_piped_into_itself_fails_at_definition():
+    heal = Heal()
+    heal.pipe = heal
+    with pytest.raises(ValueError):
+        Spell("broken", effects=[heal])
+
+def test_unknown_effect_target_fails():
+    with pytest.raises(ValueError):
+        Heal(target="everyone")
+
+@patch("combatsim.dice.random.randint")
+def test_saving_throw_halves_damage_for_creatures_that_save(randint, event_log):
+    randint.return_value = 4
+    caster = Creature(spells=[], level=1)
+    saver = Creature(max_hp=20, team=2)
+    failer = Creature(max_hp=20, team=2)
+    saver.save_bonus = Mock(return_value=100)
+    failer.save_bonus = Mock(return_value=-100)
+    spell = Spell("burn", targeting=TargetGeometry(), effects=[
+        SavingThrow("dexterity", Damage("1d4", "fire"), multiplier=0.5)
+    ])
+    spell.cast(caster, 1, [saver, failer])
+    assert failer.hp == 16
+    assert saver.hp == 18
+
+@patch("combatsim.dice.random.randint")
+def test_drain_heals_caster_by_damage_dealt(randint, event_log):
+    randint.return_value = 5
+    caster = Creature(max_hp=20, hp=10, level=1, spells=[drain], spell_slots=[1])
+    target = Creature(max_hp=20, team=2)
+    target.saving_throw = Mock(return_value=False)
+    caster.cast(drain, 1, [target])
+    assert target.hp == 15
+    assert caster.hp == 15
+
+@patch("combatsim.dice.random.randint")
+def test_drain_does_nothing_when_target_saves(randint, event_log):
+    randint.return_value = 5
+    caster = Creature(max_hp=20, hp=10, level=1, spells=[drain], spell_slots=[1])
+    target = Creature(max_hp=20, team=2)
+    target.saving_throw = Mock(return_value=True)
+    caster.cast(drain, 1, [target])
+    assert target.hp == 20
+    assert caster.hp == 10
+
+@patch("combatsim.dice.random.randint")
+def test_cure_wounds_scales_with_slot_level(randint, event_log):
+    randint.return_value = 3
+    cleric = Creature(wisdom=14, spells=[cure_wounds], spell_slots=[0, 1])
+    patient = Creature(max_hp=20, hp=1)
+    cleric.cast(cure_wounds, 2, [patient])
+    assert patient.hp == 1 + 3 + 3 + 2
+
+def test_spells_can_be_cast_without_a_grid(event_log):
+    cleric = Creature(spells=[cure_wounds], spell_slots=[1])
+    patient = Creature(max_hp=20, hp=1)
+    cleric.cast(cure_wounds, 1, [patient])
+    assert patient.hp > 1
+
+def test_too_many_targets_without_a_grid_raises_error(event_log):
+    cleric = Creature(spells=[cure_wounds], spell_slots=[1])
+    with pytest.raises(RulesError):
+        cleric.cast(cure_wounds, 1, [Creature(), Creature()])
+
+@patch("combatsim.dice.random.choices")
+def test_roll_saving_throws_uses_save_bonus(choices, event_log):
+    choices.return_value = [10, 10]
+    weak, nimble = Creature(dexterity=6), Creature(dexterity=18)
+    assert roll_saving_throws([weak, nimble], "dexterity", 12) == [False, True]
+
+@patch("combatsim.dice.random.randint")
+def test_area_spell_rolls_saves_in_one_batch(randint, event_log):
+    randint.return_value = 6
+    caster = Creature(level=1, wisdom=10)
+    horde = [Creature(max_hp=10, team=2) for _ in range(200)]
+    for goblin in horde:
+        goblin.saving_throw = Mock(side_effect=AssertionError)
+    randint.reset_mock()
+    fireball = Spell("Fireball", level=1, targeting=TargetGeometry(), effects=[
+        SavingThrow("dexterity", Damage("1d6", "fire"), multiplier=0.5)
+    ])
+    fireball.cast(caster, 1, horde)
+    assert {goblin.hp for goblin in horde} <= {4, 7}
+    assert randint.call_count == 1
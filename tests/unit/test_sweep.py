@@ -0,0 +1,60 @@
+import pytest
+
+numpy = pytest.importorskip("numpy")
+
+from combatsim.aggregators import RunningMean
+from combatsim.sweep import Sweep
+
+
+def make_sweep(duel, trials=20):
+    sweep = Sweep(duel(), trials, seed=3)
+    sweep.vary(0, 'strength', [6, 20])
+    sweep.vary(1, 'ac', [8, 10, 12])
+    return sweep
+
+def test_result_is_indexed_by_axes(duel):
+    result = make_sweep(duel).run(workers=1)
+    assert result.shape == (2, 3)
+    assert all(h.total == 20 for h in result.aggregators.flat)
+    win_rates = result.win_rate(1)
+    assert win_rates.shape == (2, 3)
+    assert ((win_rates >= 0) & (win_rates <= 1)).all()
+
+def test_better_armored_knight_wins_more_often(duel):
+    sweep = Sweep(duel(), 200, seed=1)
+    sweep.vary(0, 'ac', [5, 25])
+    win_rates = sweep.run(workers=1).win_rate(1)
+    assert win_rates[1] > win_rates[0]
+
+def test_chunks_match_single_run(duel):
+    sweep = make_sweep(duel, trials=25)
+    chunked = sweep.run(workers=1, chunk_size=7)
+    whole = sweep.run(workers=1, chunk_size=25)
+    for a, b in zip(chunked.aggregators.flat, whole.aggregators.flat):
+        assert a.counts == b.counts
+
+def test_worker_pool_matches_single_process(duel):
+    sweep = make_sweep(duel)
+    pooled = sweep.run(workers=2, chunk_size=5)
+    local = sweep.run(workers=1, chunk_size=5)
+    for a, b in zip(pooled.aggregators.flat, local.aggregators.flat):
+        assert a.counts == b.counts
+
+def test_templates_are_shared_between_cells(duel):
+    sweep = make_sweep(duel)
+    for cell in sweep.cells():
+        sweep.make_encounter(cell)
+    # Two knights, three bandits and one bandit that isn't varied
+    assert len(sweep._templates) == 2 + 3 + 1
+
+def test_custom_aggregator(duel):
+    sweep = Sweep(duel(), 10, RunningMean('rounds'), seed=2)
+    sweep.vary(0, 'max_hp', [1, 100])
+    rounds = sweep.run(workers=1).map(lambda mean: mean.mean)
+    assert rounds.shape == (2,)
+    assert rounds[0] < 2
+    assert rounds[1] > rounds[0]
+
+def test_vary_unknown_combatant_raises(duel):
+    with pytest.raises(ValueError):
+        Sweep(duel(), 10).vary(5, 'strength', [10])
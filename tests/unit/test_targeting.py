@@ -0,0 +1,96 @@
+from combatsim.creature import Creature
+from combatsim.encounter import Encounter
+from combatsim.targeting import TargetIndex
+from combatsim.tactics import TargetWeakest
+
+
+def make_creature(name, hp, team):
+    return Creature(name=name, max_hp=hp, team=team)
+
+def test_best_is_lowest_hp_on_side():
+    index = TargetIndex()
+    first, second = make_creature("A", 10, 1), make_creature("B", 5, 1)
+    index.add(first, 1)
+    index.add(second, 1)
+    assert index.best(1) is second
+    assert index.best(2) is None
+
+def test_ties_go_to_first_creature_added():
+    index = TargetIndex()
+    first, second = make_creature("A", 5, 1), make_creature("B", 5, 1)
+    index.add(first, 1)
+    index.add(second, 1)
+    assert index.best(1) is first
+
+def test_update_moves_creature():
+    index = TargetIndex()
+    first, second = make_creature("A", 10, 1), make_creature("B", 5, 1)
+    index.add(first, 1)
+    index.add(second, 1)
+    first.hp = 2
+    index.update(first)
+    assert index.best(1) is first
+
+def test_dead_creatures_are_skipped():
+    index = TargetIndex()
+    first, second = make_creature("A", 10, 1), make_creature("B", 5, 1)
+    index.add(first, 1)
+    index.add(second, 1)
+    second.hp = 0
+    index.update(second)
+    assert index.best(1) is first
+    first.hp = 0
+    assert index.best(1) is None
+
+def test_changes_the_index_was_not_told_about_are_fixed_on_lookup():
+    index = TargetIndex()
+    first, second = make_creature("A", 3, 1), make_creature("B", 5, 1)
+    index.add(first, 1)
+    index.add(second, 1)
+    first.hp = 8
+    assert index.best(1) is second
+
+def test_best_enemy_skips_own_side():
+    index = TargetIndex()
+    ally, enemy, other = (
+        make_creature("A", 1, 1), make_creature("B", 9, 2),
+        make_creature("C", 4, 3)
+    )
+    for creature in (ally, enemy, other):
+        index.add(creature, creature.team)
+    assert index.best_enemy(1) is other
+    assert index.best_enemy(3) is ally
+
+def test_heap_is_compacted():
+    index = TargetIndex()
+    creature = make_creature("A", 1000, 1)
+    index.add(creature, 1)
+    for _ in range(500):
+        creature.hp -= 1
+        index.update(creature)
+    assert len(index._heaps[1]) <= 64
+    assert index.best(1) is creature
+
+def test_encounter_keeps_index_up_to_date():
+    creatures = [make_creature(str(i), 10 + i, 2) for i in range(5)]
+    attacker = make_creature("Attacker", 10, 1)
+    encounter = Encounter([attacker] + creatures)
+    opponents = encounter._opponents[attacker]
+    assert opponents.weakest_enemy() is creatures[0]
+
+    creatures[0].take_damage(100)
+    creatures[3].take_damage(12)
+    assert opponents.weakest_enemy() is creatures[3]
+
+    creatures[3].heal(20)
+    assert opponents.weakest_enemy() is creatures[1]
+
+def test_target_weakest_matches_scan():
+    creatures = [make_creature(str(i), 20 - (i % 7), 2) for i in range(30)]
+    attacker = make_creature("Attacker", 10, 1)
+    encounter = Encounter([attacker] + creatures)
+    tactics = TargetWeakest(attacker)
+    for i, creature in enumerate(creatures):
+        creature.take_damage(i % 5)
+        opponents = encounter._opponents[attacker]
+        assert tactics.weakest(opponents) is tactics.weakest(list(opponents))
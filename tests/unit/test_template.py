@@ -0,0 +1,78 @@
+import random
+
+from combatsim.creature import Character, Monster
+from combatsim.dice import Dice
+from combatsim.grid import Grid
+from combatsim.items import Weapon
+from combatsim.monster_manual import bandit, blood_hawk
+from combatsim.template import Template
+
+
+KNIGHT = {
+    'name': "Knight",
+    'ac': 14,
+    'level': 5,
+    'strength': 14,
+    'weapons': [Weapon("Longsword", Dice("1d8"), "slashing")]
+}
+
+def test_compile_returns_template():
+    template = Monster.compile(bandit)
+    assert isinstance(template, Template)
+    assert template.cls is Monster
+
+def test_stamped_creature_matches_from_base():
+    template = Monster.compile(bandit, team=2)
+    stamped = template.stamp()
+    built = Monster.from_base(bandit, team=2)
+    assert isinstance(stamped, Monster)
+    assert stamped.name == built.name
+    assert stamped.ac == built.ac == template.ac
+    assert stamped.strength == built.strength
+    assert stamped.team == 2
+    assert stamped.tactics.actor is stamped
+
+def test_template_precomputes_stat_block():
+    template = Character.compile(KNIGHT)
+    assert template.ac == 14
+    assert template.saves['strength'] == 2
+    name, attack_bonus, damage, damage_bonus, damage_type = template.attacks[0]
+    assert name == "Longsword"
+    assert attack_bonus == 2 + template.prototype.proficiency
+    assert damage_bonus == 2
+    assert damage_type == "slashing"
+
+def test_stamped_creatures_have_independent_state():
+    template = Monster.compile(bandit, spell_slots=[2])
+    first, second = template.stamp(), template.stamp()
+    first.take_damage(1)
+    first.spell_slots[0] -= 1
+    assert second.hp == second.max_hp
+    assert second.spell_slots == [2]
+    assert first.weapons is not second.weapons
+
+def test_stamp_overrides_team_position_and_name():
+    grid = Grid(5, 5)
+    template = Monster.compile(blood_hawk, team=1)
+    hawk = template.stamp(team=3, pos=(1, 2), grid=grid, name="Hawk 2")
+    assert hawk.team == 3
+    assert grid[1, 2] is hawk
+    assert hawk.name == "Hawk 2"
+
+def test_fixed_max_hp_is_not_rolled():
+    template = Monster.compile(bandit, max_hp=11)
+    assert template.stamp().max_hp == 11
+    assert template.stamp(hp=3).hp == 3
+
+def test_compiling_does_not_consume_random_numbers():
+    random.seed(5)
+    expected = random.random()
+    random.seed(5)
+    Monster.compile(bandit)
+    assert random.random() == expected
+
+def test_compiled_weapons_do_not_depend_on_owner():
+    template = Character.compile(KNIGHT)
+    weapon = template.stamp().weapons[0]
+    weapon.owner = None
+    assert weapon.attack_bonus == template.attacks[0][1]
@@ -0,0 +1,76 @@
+from unittest.mock import Mock
+
+from combatsim.creature import Monster
+from combatsim.encounter import Encounter
+from combatsim.spells import Condition, Resistance
+from combatsim.timing import END, START, EffectScheduler
+
+
+def test_timer_fires_when_due():
+    scheduler = EffectScheduler()
+    callback = Mock()
+    scheduler.schedule((2, 1, END), callback)
+    scheduler.advance(2, 1, START)
+    callback.assert_not_called()
+    assert scheduler.advance(2, 1, END) == 1
+    callback.assert_called_once_with()
+
+def test_timers_fire_in_order_when_skipping_ahead():
+    scheduler = EffectScheduler()
+    fired = []
+    scheduler.schedule((3, 0, START), lambda: fired.append("late"))
+    scheduler.schedule((1, 2, END), lambda: fired.append("early"))
+    scheduler.advance(5, 0, START)
+    assert fired == ["early", "late"]
+    assert len(scheduler) == 0
+
+def test_cancelled_timer_does_not_fire():
+    scheduler = EffectScheduler()
+    callback = Mock()
+    timer = scheduler.schedule((1, 0, END), callback)
+    timer.cancel()
+    assert scheduler.advance(1, 0, END) == 0
+    callback.assert_not_called()
+
+def test_advance_only_touches_due_buckets():
+    scheduler = EffectScheduler()
+    for round_ in range(1, 1001):
+        scheduler.schedule((round_, 0, END), Mock())
+    assert scheduler.advance(10, 0, END) == 10
+    assert len(scheduler) == 990
+
+def test_next_turn_skips_a_turn_that_already_started():
+    scheduler = EffectScheduler()
+    scheduler.advance(2, 1, START)
+    assert scheduler.next_turn(2, 1, END) == (3, 1, END)
+    assert scheduler.next_turn(2, 3, START) == (2, 3, START)
+
+def test_encounter_next_turn_counts_turns():
+    creature = Monster()
+    encounter = Encounter([creature])
+    encounter.slots = {creature: 2}
+    encounter.combat_round = 4
+    encounter.timing.advance(4, 0, END)
+    assert encounter.next_turn(creature) == (4, 2, END)
+    assert encounter.next_turn(creature, START, turns=3) == (6, 2, START)
+
+def test_ongoing_effects_without_encounter_last_until_removed():
+    caster = Monster()
+    effect = Condition("blinded")
+    effect.activate(caster, 0, [caster])
+    assert caster.conditions == ["blinded"]
+    effect.remove(caster)
+    assert caster.conditions == []
+
+def test_overlapping_resistances_stack():
+    caster = Monster()
+    target = Monster()
+    encounter = Encounter([caster, target])
+    encounter.slots = {caster: 0, target: 1}
+    encounter.combat_round = 1
+    Resistance(['fire'], duration=1).activate(caster, 0, [target])
+    Resistance(['fire'], duration=2).activate(caster, 0, [target])
+    encounter.timing.advance(1, 0, END)
+    assert target.resistances == ['fire']
+    encounter.timing.advance(2, 0, END)
+    assert target.resistances == []
@@ -0,0 +1,66 @@
+import pytest
+
+from combatsim.creature import Monster
+from combatsim.turns import TurnOrder
+
+
+def make_order(*initiatives):
+    order = TurnOrder()
+    creatures = [Monster(name=str(i)) for i in range(len(initiatives))]
+    for creature, initiative in zip(creatures, initiatives):
+        order.add(creature, initiative)
+    return order, creatures
+
+def test_creatures_are_ordered_by_initiative():
+    order, (a, b, c) = make_order(10, 15, 5)
+    assert order.creatures() == [b, a, c]
+    assert len(order) == 3
+
+def test_slots_increase_along_order():
+    order, creatures = make_order(20, 15, 10, 5)
+    assert [order.slots[c] for c in order.creatures()] == [0, 1, 2, 3]
+
+def test_ties_are_broken_by_dexterity():
+    order = TurnOrder()
+    slow = Monster(name="slow", dexterity=8)
+    quick = Monster(name="quick", dexterity=18)
+    order.add(slow, 12)
+    order.add(quick, 12)
+    assert order.creatures() == [quick, slow]
+
+def test_full_ties_keep_insertion_order():
+    order, (a, b) = make_order(10, 10)
+    assert order.creatures() == [a, b]
+
+def test_added_creature_gets_slot_between_neighbours():
+    order, (a, b) = make_order(20, 10)
+    summoned = Monster(name="summoned")
+    order.add(summoned, 15)
+    assert order.creatures() == [a, summoned, b]
+    assert order.slots[a] < order.slots[summoned] < order.slots[b]
+
+def test_remove_during_walk():
+    order, (a, b, c) = make_order(30, 20, 10)
+    taken = []
+    for turn in order:
+        taken.append(turn.creature)
+        if turn.creature is a:
+            order.remove(b)
+        if turn.creature is c:
+            order.remove(c)
+    assert taken == [a, c]
+    assert order.creatures() == [a]
+    assert c not in order
+
+def test_restore_keeps_old_slot():
+    order, (a, b, c) = make_order(30, 20, 10)
+    slot = order.slots[b]
+    order.remove(b)
+    order.restore(b)
+    assert order.creatures() == [a, b, c]
+    assert order.slots[b] == slot
+
+def test_add_twice_raises():
+    order, (a,) = make_order(10)
+    with pytest.raises(ValueError):
+        order.add(a, 5)